@@ -1,18 +1,22 @@
 from __future__ import annotations
 
+import asyncio
+import dataclasses
 import enum
 import logging
-from collections.abc import AsyncGenerator, AsyncIterator
+import math
+import time
+from collections.abc import AsyncIterator
 from contextlib import AbstractAsyncContextManager, asynccontextmanager
 from pathlib import Path
+from typing import Any, Optional
 
 from chia.rpc.full_node_rpc_client import FullNodeRpcClient
 from chia.rpc.rpc_client import RpcClient
 from chia.rpc.wallet_rpc_client import WalletRpcClient
 from chia.util.config import load_config
-from chia.util.default_root import DEFAULT_ROOT_PATH
 from chia.util.ints import uint16
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.config import settings
 from app.db.session import get_session_local_cls
@@ -20,21 +24,21 @@ from app.db.session import get_session_local_cls
 logger = logging.getLogger("ClimateToken")
 
 
-def get_db_session_context() -> AbstractAsyncContextManager[Session]:
+def get_db_session_context() -> AbstractAsyncContextManager[AsyncSession]:
     return asynccontextmanager(get_db_session)()
 
 
-async def get_db_session() -> Session:
+async def get_db_session() -> AsyncIterator[AsyncSession]:
     SessionLocal = await get_session_local_cls()
 
     db = SessionLocal()
     try:
         yield db
     except Exception:
-        db.rollback()
+        await db.rollback()
         raise
     finally:
-        db.close()
+        await db.close()
 
 
 class NodeType(str, enum.Enum):
@@ -42,54 +46,155 @@ class NodeType(str, enum.Enum):
     WALLET = "WALLET"
 
 
+@dataclasses.dataclass
+class RpcClientPool:
+    """Long-lived full node and wallet RPC clients shared by the routes and the background tasks.
+
+    `config.yaml` is read once. A client is health-checked with `healthz` before it is handed
+    out if it has not been checked for `health_check_interval` seconds, or if a call through it
+    failed, and it is recreated when the check fails. Clients are bound to the event loop they
+    were created on and are recreated if used from a different loop.
+    """
+
+    root_path: Path
+    health_check_interval: float
+
+    _config: Optional[dict[str, Any]] = dataclasses.field(default=None, init=False, repr=False)
+    _clients: dict[NodeType, RpcClient] = dataclasses.field(default_factory=dict, init=False, repr=False)
+    _checked_at: dict[NodeType, float] = dataclasses.field(default_factory=dict, init=False, repr=False)
+    _lock: Optional[asyncio.Lock] = dataclasses.field(default=None, init=False, repr=False)
+    _loop: Optional[asyncio.AbstractEventLoop] = dataclasses.field(default=None, init=False, repr=False)
+
+    @classmethod
+    def from_settings(cls) -> RpcClientPool:
+        return cls(
+            root_path=settings.CHIA_ROOT,
+            health_check_interval=settings.RPC_HEALTH_CHECK_INTERVAL,
+        )
+
+    @property
+    def config(self) -> dict[str, Any]:
+        if self._config is None:
+            self._config = load_config(self.root_path, "config.yaml")
+
+        return self._config
+
+    @property
+    def lock(self) -> asyncio.Lock:
+        loop = asyncio.get_running_loop()
+        if self._lock is None or self._loop is not loop:
+            # clients created on another loop can neither be used nor closed from this one
+            self._clients.clear()
+            self._checked_at.clear()
+            self._lock = asyncio.Lock()
+            self._loop = loop
+
+        return self._lock
+
+    async def get(self, node_type: NodeType, self_hostname: str, rpc_port: int) -> RpcClient:
+        rpc_client_cls = {
+            NodeType.FULL_NODE: FullNodeRpcClient,
+            NodeType.WALLET: WalletRpcClient,
+        }.get(node_type)
+
+        if rpc_client_cls is None:
+            raise ValueError(f"Invalid node_type: {node_type}")
+
+        async with self.lock:
+            client = self._clients.get(node_type)
+            if client is not None and time.monotonic() - self._checked_at[node_type] >= self.health_check_interval:
+                try:
+                    await client.healthz()
+                    self._checked_at[node_type] = time.monotonic()
+                except Exception as e:
+                    logger.warning(f"{node_type.value} RPC client failed health check, reconnecting: {e!r}")
+                    await self._close(node_type)
+                    client = None
+
+            if client is None:
+                client = await rpc_client_cls.create(
+                    self_hostname=self_hostname,
+                    port=uint16(rpc_port),
+                    root_path=self.root_path,
+                    net_config=self.config,
+                )
+                self._clients[node_type] = client
+                self._checked_at[node_type] = time.monotonic()
+
+        return client
+
+    def mark_unhealthy(self, node_type: NodeType) -> None:
+        if node_type in self._checked_at:
+            self._checked_at[node_type] = -math.inf
+
+    async def _close(self, node_type: NodeType) -> None:
+        client = self._clients.pop(node_type, None)
+        self._checked_at.pop(node_type, None)
+        if client is not None:
+            client.close()
+            await client.await_closed()
+
+    async def close(self) -> None:
+        if self._loop is not asyncio.get_running_loop():
+            return
+
+        for node_type in list(self._clients):
+            await self._close(node_type)
+
+
+_rpc_client_pool: Optional[RpcClientPool] = None
+
+
+def get_rpc_client_pool() -> RpcClientPool:
+    global _rpc_client_pool
+
+    if _rpc_client_pool is None:
+        _rpc_client_pool = RpcClientPool.from_settings()
+
+    return _rpc_client_pool
+
+
+async def close_rpc_client_pool() -> None:
+    if _rpc_client_pool is not None:
+        await _rpc_client_pool.close()
+
+
+@asynccontextmanager
 async def _get_rpc_client(
     node_type: NodeType,
     self_hostname: str,
     rpc_port: int,
-    root_path: Path = DEFAULT_ROOT_PATH,
-) -> AsyncGenerator[RpcClient, None]:
-    rpc_client_cls = {
-        NodeType.FULL_NODE: FullNodeRpcClient,
-        NodeType.WALLET: WalletRpcClient,
-    }.get(node_type)
-
-    if rpc_client_cls is None:
-        raise ValueError(f"Invalid node_type: {node_type}")
-
-    config = load_config(root_path, "config.yaml")
-
-    client = await rpc_client_cls.create(
-        self_hostname=self_hostname,
-        port=uint16(rpc_port),
-        root_path=root_path,
-        net_config=config,
-    )
+) -> AsyncIterator[Any]:
+    pool = get_rpc_client_pool()
+    client = await pool.get(node_type=node_type, self_hostname=self_hostname, rpc_port=rpc_port)
 
     try:
         yield client
     except Exception as e:
-        logger.warning(f"Error in wallet: {e}")
-    finally:
-        client.close()
-        await client.await_closed()
+        logger.warning(f"Error in {node_type.value} RPC client: {e}")
+        # the next user health-checks the client before relying on it
+        pool.mark_unhealthy(node_type)
+        raise
+
+
+def get_wallet_rpc_client_context() -> AbstractAsyncContextManager[WalletRpcClient]:
+    return asynccontextmanager(get_wallet_rpc_client)()
 
 
 async def get_wallet_rpc_client() -> AsyncIterator[WalletRpcClient]:
-    async for _ in _get_rpc_client(
+    async with _get_rpc_client(
         node_type=NodeType.WALLET,
         self_hostname=settings.CHIA_WALLET_HOSTNAME if settings.CHIA_WALLET_HOSTNAME else settings.CHIA_HOSTNAME,
         rpc_port=settings.CHIA_WALLET_RPC_PORT,
-        root_path=settings.CHIA_ROOT,
-    ):
-        yield _
+    ) as client:
+        yield client
 
 
 @asynccontextmanager
 async def get_full_node_rpc_client() -> AsyncIterator[FullNodeRpcClient]:
-    async for _ in _get_rpc_client(
+    async with _get_rpc_client(
         node_type=NodeType.FULL_NODE,
         self_hostname=settings.CHIA_FULL_NODE_HOSTNAME if settings.CHIA_FULL_NODE_HOSTNAME else settings.CHIA_HOSTNAME,
         rpc_port=settings.CHIA_FULL_NODE_RPC_PORT,
-        root_path=settings.CHIA_ROOT,
-    ):
-        yield _
+    ) as client:
+        yield client
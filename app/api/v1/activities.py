@@ -2,13 +2,17 @@
 # ignore the required import["from __future__ import annotations"]
 # This import breaks everything - seems something to do with pydantic
 
+import base64
+import json
 import logging
+import re
 from typing import Any, Optional
 
 from fastapi import APIRouter, Depends
 from fastapi.encoders import jsonable_encoder
 from pydantic import ValidationError
-from sqlalchemy.orm import Session
+from sqlalchemy import column, or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from app import crud, models, schemas
 from app.api import dependencies as deps
@@ -21,6 +25,72 @@ router = APIRouter()
 logger = logging.getLogger("ClimateToken")
 
 
+async def _combine_climate_units_and_metadata(db_crud: crud.DBCrud, search: dict[str, Any]) -> list[dict[str, Any]]:
+    # serve from the local CADT mirror once it is populated, CADT otherwise
+    if settings.CADT_MIRROR_ENABLED and db_crud.is_cadt_mirror_ready():
+        return await db_crud.combine_climate_units_and_metadata(search=search)
+
+    return await crud.ClimateWareHouseCrud(
+        url=settings.CADT_API_SERVER_HOST,
+        api_key=settings.CADT_API_KEY,
+    ).combine_climate_units_and_metadata(search=search)
+
+
+# the tokens of the full-text index, words of letters and digits
+_SEARCH_TOKEN = re.compile(r"[^\W_]+")
+
+
+def _search_beneficiary_filter(search: str) -> Any:
+    """Filter the activities whose beneficiary has words starting with each word of `search`.
+
+    A search without any word, e.g. only punctuation, falls back to a substring match.
+    """
+
+    terms = []
+    for token in _SEARCH_TOKEN.findall(search.lower()):
+        # puzzle hashes are indexed without their hex prefix
+        if token.startswith("0x") and len(token) > 2:
+            terms.append(f'("{token}"* OR "{token[2:]}"*)')
+        else:
+            terms.append(f'"{token}"*')
+
+    if len(terms) == 0:
+        return or_(
+            models.Activity.beneficiary_name.like(f"%{search}%"),
+            models.Activity.beneficiary_address.like(f"%{search}%"),
+            models.Activity.beneficiary_puzzle_hash.like(f"%{search}%"),
+        )
+
+    matches = (
+        select(models.activity_search.c.rowid)
+        .select_from(models.activity_search)
+        .where(column(models.activity_search.name).match(" AND ".join(terms)))
+    )
+    return models.Activity.id.in_(matches)
+
+
+_CURSOR_NEXT = "n"
+_CURSOR_PREV = "p"
+
+
+def _encode_cursor(direction: str, activity: models.Activity) -> str:
+    # opaque to clients, the position of `activity` in the (height, coin_id) order
+    data = json.dumps([direction, activity.height, activity.coin_id], separators=(",", ":"))
+    return base64.urlsafe_b64encode(data.encode()).decode().rstrip("=")
+
+
+def _decode_cursor(cursor: str) -> tuple[str, tuple[int, str]]:
+    try:
+        (direction, height, coin_id) = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        if direction not in {_CURSOR_NEXT, _CURSOR_PREV} or not isinstance(height, int) or not isinstance(coin_id, str):
+            raise ValueError(f"Invalid cursor content {direction, height, coin_id}")
+    except (TypeError, ValueError) as e:
+        logger.warning(f"Invalid cursor {cursor}: {e!s}")
+        raise ErrorCode().bad_request_error(message="cursor is invalid")
+
+    return (direction, (height, coin_id))
+
+
 @router.get("/", response_model=schemas.ActivitiesResponse)
 @disallow_route([ExecutionMode.REGISTRY, ExecutionMode.CLIENT])
 async def get_activity(
@@ -32,10 +102,17 @@ async def get_activity(
     limit: int = 10,
     org_uid: Optional[str] = None,
     sort: str = "desc",
-    db: Session = Depends(deps.get_db_session),
+    cursor: Optional[str] = None,
+    include_total: bool = True,
+    db: AsyncSession = Depends(deps.get_db_session),
 ) -> schemas.ActivitiesResponse:
     """Get activity.
 
+    Pages are selected either by `page`, or by a `cursor` taken from the `next_cursor` or
+    `prev_cursor` of a previous response, in which case `page` is ignored. Every cursor page
+    costs the same however deep it is. Set `include_total` to false to skip counting every
+    matching activity, the response `total` is then null.
+
     This endpoint is to be called by the explorer.
     """
 
@@ -46,13 +123,7 @@ async def get_activity(
     match search_by:
         case schemas.ActivitySearchBy.ONCHAIN_METADATA:
             if search is not None:
-                activity_filters["or"].extend(
-                    [
-                        models.Activity.beneficiary_name.like(f"%{search}%"),
-                        models.Activity.beneficiary_address.like(f"%{search}%"),
-                        models.Activity.beneficiary_puzzle_hash.like(f"%{search}%"),
-                    ]
-                )
+                activity_filters["and"].append(_search_beneficiary_filter(search))
         case schemas.ActivitySearchBy.CLIMATE_WAREHOUSE:
             if search is not None:
                 cw_filters["search"] = search
@@ -67,42 +138,66 @@ async def get_activity(
     if org_uid is not None:
         cw_filters["orgUid"] = org_uid
 
-    climate_data = crud.ClimateWareHouseCrud(
-        url=settings.CADT_API_SERVER_HOST,
-        api_key=settings.CADT_API_KEY,
-    ).combine_climate_units_and_metadata(search=cw_filters)
+    climate_data = await _combine_climate_units_and_metadata(db_crud, search=cw_filters)
     if len(climate_data) == 0:
         logger.warning(f"No data to get from climate warehouse. search:{cw_filters}")
-        return schemas.ActivitiesResponse()
+        return schemas.ActivitiesResponse(total=0 if include_total else None)
 
     units = {unit["marketplaceIdentifier"]: unit for unit in climate_data}
     if len(units) != 0:
         activity_filters["and"].append(models.Activity.asset_id.in_(units.keys()))
 
     if mode is not None:
-        activity_filters["and"].append(models.Activity.mode.ilike(mode.name))
+        # modes are stored by name, an equality keeps the filter on the index
+        activity_filters["and"].append(models.Activity.mode == mode.name)
 
     activities: list[models.Activity]
-    total: int
-
-    order_by_clause = []
-    if sort.lower() == "desc":
-        order_by_clause.append(models.Activity.height.desc())
-        order_by_clause.append(models.Activity.coin_id.desc())
+    total: Optional[int]
+    has_next: bool
+    has_prev: bool
+
+    descending = sort.lower() == "desc"
+    if cursor is not None:
+        (direction, position) = _decode_cursor(cursor)
+        (activities, has_more, total) = await db_crud.select_activity_with_cursor(
+            model=models.Activity,
+            filters=activity_filters,
+            keys=[models.Activity.height, models.Activity.coin_id],
+            descending=descending,
+            limit=limit,
+            after=position if direction == _CURSOR_NEXT else None,
+            before=position if direction == _CURSOR_PREV else None,
+            count=include_total,
+        )
+        # the page next to a cursor is always there, it is where the cursor came from
+        (has_next, has_prev) = (has_more, True) if direction == _CURSOR_NEXT else (True, has_more)
     else:
-        order_by_clause.append(models.Activity.height.asc())
-        order_by_clause.append(models.Activity.coin_id.asc())
+        order_by_clause = []
+        if descending:
+            order_by_clause.append(models.Activity.height.desc())
+            order_by_clause.append(models.Activity.coin_id.desc())
+        else:
+            order_by_clause.append(models.Activity.height.asc())
+            order_by_clause.append(models.Activity.coin_id.asc())
+
+        (activities, total) = await db_crud.select_activity_with_pagination(
+            model=models.Activity,
+            filters=activity_filters,
+            order_by=order_by_clause,
+            page=page,
+            limit=limit,
+            count=include_total,
+        )
+        if total is None:
+            # without a count, the row past the page tells whether there is a next one
+            (has_next, has_prev) = (len(activities) > limit, page > 1)
+            activities = activities[:limit]
+        else:
+            (has_next, has_prev) = (page * limit < total, page > 1)
 
-    (activities, total) = db_crud.select_activity_with_pagination(
-        model=models.Activity,
-        filters=activity_filters,
-        order_by=order_by_clause,
-        page=page,
-        limit=limit,
-    )
     if len(activities) == 0:
         logger.warning(f"No data to get from activities. filters:{activity_filters} page:{page} limit:{limit}")
-        return schemas.ActivitiesResponse()
+        return schemas.ActivitiesResponse(total=0 if include_total else None)
 
     activities_with_cw: list[schemas.ActivityWithCW] = []
     for activity in activities:
@@ -131,7 +226,12 @@ async def get_activity(
         )
         activities_with_cw.append(activity_with_cw)
 
-    return schemas.ActivitiesResponse(activities=activities_with_cw, total=total)
+    return schemas.ActivitiesResponse(
+        activities=activities_with_cw,
+        total=total,
+        next_cursor=_encode_cursor(_CURSOR_NEXT, activities[-1]) if has_next else None,
+        prev_cursor=_encode_cursor(_CURSOR_PREV, activities[0]) if has_prev else None,
+    )
 
 
 @router.get("/activity-record", response_model=schemas.ActivityRecordResponse)
@@ -140,7 +240,7 @@ async def get_activity_by_cw_unit_id(
     cw_unit_id: str,
     coin_id: str,
     action_mode: str,
-    db: Session = Depends(deps.get_db_session),
+    db: AsyncSession = Depends(deps.get_db_session),
 ) -> schemas.ActivityRecordResponse:
     """Get a single activity based on the unit's unitWarehouseId.
 
@@ -152,10 +252,7 @@ async def get_activity_by_cw_unit_id(
     # fetch unit and related data from CADT
     cw_filters: dict[str, str] = {"warehouseUnitId": cw_unit_id}
 
-    climate_data = crud.ClimateWareHouseCrud(
-        url=settings.CADT_API_SERVER_HOST,
-        api_key=settings.CADT_API_KEY,
-    ).combine_climate_units_and_metadata(search=cw_filters)
+    climate_data = await _combine_climate_units_and_metadata(db_crud, search=cw_filters)
     if len(climate_data) == 0:
         logger.warning(f"Failed to retrieve unit from climate warehouse. search:{cw_filters}")
         return schemas.ActivityRecordResponse()
@@ -174,10 +271,10 @@ async def get_activity_by_cw_unit_id(
     activity_filters["and"].append(models.Activity.coin_id == coin_id)
 
     activities = [models.Activity]
-    _total: int
+    _total: Optional[int]
 
     # fetch activities with filters, 'total' var ignored
-    (activities, _total) = db_crud.select_activity_with_pagination(
+    (activities, _total) = await db_crud.select_activity_with_pagination(
         model=models.Activity,
         filters=activity_filters,
         order_by=[models.Activity.height.asc()],
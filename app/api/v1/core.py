@@ -1,8 +1,11 @@
 from __future__ import annotations
 
+from typing import Any
+
 from fastapi import APIRouter
 
 from app.api.v1 import activities, cron, keys, organizations, tokens, transactions
+from app.metrics import metrics
 
 router = APIRouter(
     prefix="/v1",
@@ -18,6 +21,11 @@ async def get_info() -> dict[str, str]:
     }
 
 
+@router.get("/metrics")
+async def get_metrics() -> dict[str, Any]:
+    return metrics.snapshot()
+
+
 router.include_router(cron.router)
 router.include_router(
     tokens.router,
@@ -14,18 +14,24 @@ from fastapi.encoders import jsonable_encoder
 from fastapi_utils.tasks import repeat_every
 from sqlalchemy_utils import create_database, database_exists
 
-from app import crud, schemas
+from app import crud
 from app.api import dependencies as deps
 from app.config import ExecutionMode, settings
+from app.core.climate_wallet.coin_reservations import COIN_RESERVATION_POLL_INTERVAL, coin_reservations
+from app.crud.db import cadt_mirror_synced_resources
 from app.db.base import Base
+from app.db.migrations import ensure_activity_search, ensure_indexes, update_statistics
 from app.db.session import get_engine_cls
+from app.decoder import get_gateway_decoder
 from app.errors import ErrorCode
 from app.models import State
+from app.scanner import ActivityScanner, AdaptiveWindow, ScanToken
 from app.utils import disallow_startup
 
 router = APIRouter()
 errorcode = ErrorCode()
 lock = asyncio.Lock()
+scan_window = AdaptiveWindow.from_settings()
 logger = logging.getLogger("ClimateToken")
 
 
@@ -41,43 +47,34 @@ async def init_db() -> None:
     logger.info(f"Database {Engine.url} exists: {database_exists(Engine.url)}")
 
     Base.metadata.create_all(Engine)
+    ensure_indexes(Engine)
+    ensure_activity_search(Engine)
+    update_statistics(Engine)
 
     async with deps.get_db_session_context() as db:
         state = State(id=1, current_height=settings.BLOCK_START, peak_height=None)
         db_state = [jsonable_encoder(state)]
 
         db_crud = crud.DBCrud(db=db)
-        db_crud.batch_insert_ignore_db(table=State.__tablename__, models=db_state)
+        await db_crud.batch_insert_ignore_db(table=State.__tablename__, models=db_state)
 
+        indexed = await db_crud.index_activity_search()
+        if indexed > 0:
+            logger.info(f"Indexed {indexed} activities for search")
 
-async def _scan_token_activity(
-    db_crud: crud.DBCrud,
-    climate_warehouse: crud.ClimateWareHouseCrud,
-    blockchain: crud.BlockChainCrud,
-) -> bool:
-    state = db_crud.select_block_state_first()
-    if state.peak_height is None:
-        logger.warning("Full node state has not been retrieved.")
-        return False
+        # a mirror synced by a previous run can be served right away
+        for sync_state in await db_crud.select_cadt_sync_states():
+            cadt_mirror_synced_resources.add(sync_state.resource)
 
-    start_height = state.current_height
-    end_height = min(start_height + settings.BLOCK_RANGE, state.peak_height + 1)
-
-    # make sure
-    # - shallow records (<`MIN_DEPTH`) are revisited
-    # - lookback 36 hours to compensate for CW metadata delay
-    target_start_height = end_height - settings.MIN_DEPTH - settings.LOOKBACK_DEPTH
-
-    if state.current_height == target_start_height:
-        logger.info("Activity synced.")
-        return False
-
-    logger.info(f"Scanning blocks {start_height} - {end_height} for activity")
 
+async def _get_scan_tokens(
+    climate_warehouse: crud.ClimateWareHouseCrud,
+    blockchain: crud.BlockChainCrud,
+) -> list[ScanToken]:
     # Check if SCAN_ALL_ORGANIZATIONS is defined and True, otherwise treat as False
     scan_all = getattr(settings, "SCAN_ALL_ORGANIZATIONS", False)
 
-    all_organizations = climate_warehouse.get_climate_organizations()
+    all_organizations = await climate_warehouse.get_climate_organizations()
     if not scan_all:
         # Convert to a list of organizations where `isHome` is True
         climate_organizations = [org for org in all_organizations.values() if org.get("isHome", False)]
@@ -85,11 +82,16 @@ async def _scan_token_activity(
         # Convert to a list of all organizations
         climate_organizations = list(all_organizations.values())
 
+    metadata_by_org_uid = await climate_warehouse.get_climate_organizations_metadata_bulk(
+        [org["orgUid"] for org in climate_organizations]
+    )
+
+    tokens: list[ScanToken] = []
     for org in climate_organizations:
         org_uid = org["orgUid"]
         org_name = org["name"]
 
-        org_metadata = climate_warehouse.get_climate_organizations_metadata(org_uid)
+        org_metadata = metadata_by_org_uid.get(org_uid)
         if not org_metadata:
             logger.warning(f"Cannot get metadata in CADT organization: {org_name}")
             continue
@@ -114,22 +116,14 @@ async def _scan_token_activity(
                     continue
 
                 public_key = G1Element.from_bytes(hexstr_to_bytes(tokenization_dict["public_key"]))
-                activities: list[schemas.Activity] = await blockchain.get_activities(
+                wallet = blockchain.get_observer_wallet(
                     org_uid=tokenization_dict["org_uid"],
                     warehouse_project_id=tokenization_dict["warehouse_project_id"],
                     vintage_year=tokenization_dict["vintage_year"],
                     sequence_num=tokenization_dict["sequence_num"],
                     public_key=public_key,
-                    start_height=state.current_height,
-                    end_height=end_height,
-                    peak_height=state.peak_height,
                 )
-
-                if len(activities) == 0:
-                    continue
-
-                db_crud.batch_insert_ignore_activity(activities)
-                logger.info(f"Activities for {org_name} and asset id: {key} added to the database.")
+                tokens.append(ScanToken(org_name=org_name, key=key, wallet=wallet))
 
             # This is causing logging for benign errors, so commenting out for now
             # except json.JSONDecodeError as e:
@@ -137,7 +131,83 @@ async def _scan_token_activity(
             except Exception as e:
                 logger.error(f"An error occurred for organization {org_name} under key {key}: {e!s}")
 
-    db_crud.update_block_state(current_height=target_start_height)
+    return tokens
+
+
+async def _scan_token_activity(
+    db_crud: crud.DBCrud,
+    climate_warehouse: crud.ClimateWareHouseCrud,
+    blockchain: crud.BlockChainCrud,
+) -> bool:
+    state = await db_crud.select_block_state_first()
+    if state.peak_height is None:
+        logger.warning("Full node state has not been retrieved.")
+        return False
+
+    # shallow records (<`MIN_DEPTH`) are not recorded yet, cursors stop short of them so they are revisited
+    confirmable_height = state.peak_height + 1 - settings.MIN_DEPTH
+
+    tokens = await _get_scan_tokens(climate_warehouse=climate_warehouse, blockchain=blockchain)
+    cursors = await db_crud.select_scan_cursors([token.asset_id for token in tokens])
+
+    # known tokens resume from their cursor, newly discovered ones are backfilled from `BLOCK_START`
+    start_height_by_asset_id: dict[str, int] = {
+        token.asset_id: cursors[token.asset_id].last_confirmed_height
+        if token.asset_id in cursors
+        else settings.BLOCK_START
+        for token in tokens
+    }
+
+    pending_heights = [height for height in start_height_by_asset_id.values() if height < confirmable_height]
+    if len(pending_heights) == 0:
+        logger.info("Activity synced.")
+        return False
+
+    # scan from the token furthest behind, tokens whose cursor falls in the window join it
+    start_height = min(pending_heights)
+    end_height = min(start_height + scan_window.size, state.peak_height + 1)
+    last_confirmed_height = min(end_height, confirmable_height)
+    window_tokens = [token for token in tokens if start_height_by_asset_id[token.asset_id] < last_confirmed_height]
+
+    logger.info(f"Scanning blocks {start_height} - {end_height} for activity of {len(window_tokens)} tokens")
+
+    scanner = ActivityScanner(
+        db_crud=db_crud,
+        blockchain=blockchain,
+        decoder=get_gateway_decoder(),
+        fetch_workers=settings.FULL_NODE_MAX_CONCURRENT_REQUESTS,
+        decode_workers=settings.SCAN_DECODE_WORKERS,
+        batch_size=settings.SCAN_WRITE_BATCH_SIZE,
+        queue_size=settings.SCAN_QUEUE_SIZE,
+    )
+    result = await scanner.scan(
+        tokens=window_tokens,
+        start_height=start_height,
+        end_height=end_height,
+        peak_height=state.peak_height,
+    )
+    logger.info(f"Scanned {len(window_tokens)} tokens, {result.written} activities added to the database.")
+    scan_window.update(coin_records=result.coin_records, latency=result.latency)
+
+    # tokens with a coin that failed to scan keep their cursor, so the window is scanned again for them
+    scanned_tokens = [token for token in window_tokens if token.asset_id not in result.failed_asset_ids]
+    if len(scanned_tokens) > 0:
+        await db_crud.update_scan_cursors(
+            asset_ids=[token.asset_id for token in scanned_tokens],
+            last_scanned_height=end_height,
+            last_confirmed_height=last_confirmed_height,
+        )
+    for token in scanned_tokens:
+        start_height_by_asset_id[token.asset_id] = last_confirmed_height
+
+    # the global height is where the furthest behind token is at
+    await db_crud.update_block_state(current_height=min(start_height_by_asset_id.values()))
+
+    if len(result.failed_asset_ids) > 0:
+        # retry on the next pass rather than right away, the full node may need some time
+        logger.error(f"Failed to scan blocks {start_height} - {end_height} for {len(result.failed_asset_ids)} tokens")
+        return False
+
     return True
 
 
@@ -178,6 +248,54 @@ async def scan_token_activity() -> None:
             raise errorcode.internal_server_error(message="Get Retire Token Failure")
 
 
+async def _sync_cadt_mirror(
+    db_crud: crud.DBCrud,
+    climate_warehouse: crud.ClimateWareHouseCrud,
+) -> None:
+    units = await climate_warehouse.get_climate_units(search={})
+    changed_count = await db_crud.sync_cadt_units(units)
+    await db_crud.update_cadt_sync_state(resource="units", record_count=len(units), changed_count=changed_count)
+
+    projects = await climate_warehouse.get_climate_projects()
+    changed_count = await db_crud.sync_cadt_projects(projects)
+    await db_crud.update_cadt_sync_state(resource="projects", record_count=len(projects), changed_count=changed_count)
+
+    organization_by_id = await climate_warehouse.get_climate_organizations()
+    changed_count = await db_crud.sync_cadt_organizations(organization_by_id)
+    await db_crud.update_cadt_sync_state(
+        resource="organizations",
+        record_count=len(organization_by_id),
+        changed_count=changed_count,
+    )
+
+    metadata_by_id = await climate_warehouse.get_climate_organizations_metadata_bulk(organization_by_id.keys())
+    changed_count = await db_crud.sync_cadt_organizations_metadata(metadata_by_id, org_uids=organization_by_id.keys())
+    await db_crud.update_cadt_sync_state(
+        resource="organizations_metadata",
+        record_count=len(metadata_by_id),
+        changed_count=changed_count,
+    )
+
+
+@router.on_event("startup")
+@repeat_every(seconds=settings.CADT_SYNC_INTERVAL, logger=logger)
+@disallow_startup([ExecutionMode.REGISTRY, ExecutionMode.CLIENT])
+async def sync_cadt_mirror() -> None:
+    if not settings.CADT_MIRROR_ENABLED:
+        return
+
+    async with deps.get_db_session_context() as db:
+        db_crud = crud.DBCrud(db=db)
+        climate_warehouse = crud.ClimateWareHouseCrud(url=settings.CADT_API_SERVER_HOST, api_key=settings.CADT_API_KEY)
+
+        try:
+            await _sync_cadt_mirror(db_crud=db_crud, climate_warehouse=climate_warehouse)
+
+        except HTTPException as e:
+            logger.error("Sync CADT Mirror Failure, ErrorMessage: " + str(e))
+            raise errorcode.internal_server_error(message="Sync CADT Mirror Failure")
+
+
 async def _scan_blockchain_state(
     db_crud: crud.DBCrud,
     full_node_client: FullNodeRpcClient,
@@ -189,7 +307,7 @@ async def _scan_blockchain_state(
         logger.warning("Full node is not synced")
         return
 
-    db_crud.update_block_state(peak_height=peak_block_record.height)
+    await db_crud.update_block_state(peak_height=peak_block_record.height)
 
 
 @router.on_event("startup")
@@ -211,3 +329,17 @@ async def scan_blockchain_state() -> None:
         except HTTPException as e:
             logger.error("Update DB Failure, ErrorMessage: " + str(e))
             raise errorcode.internal_server_error(message="Update DB Failure")
+
+
+@router.on_event("startup")
+@repeat_every(seconds=COIN_RESERVATION_POLL_INTERVAL, logger=logger)
+@disallow_startup([ExecutionMode.EXPLORER])
+async def release_settled_coin_reservations() -> None:
+    if len(coin_reservations.transaction_ids()) == 0:
+        return
+
+    async with deps.get_wallet_rpc_client_context() as wallet_client:
+        settled = await coin_reservations.release_settled(wallet_client)
+
+    if settled > 0:
+        logger.info(f"Released the coins of {settled} settled transactions")
@@ -17,7 +17,7 @@ router = APIRouter()
 @router.get("/", response_model=Any)
 @disallow_route([ExecutionMode.REGISTRY, ExecutionMode.CLIENT])
 async def get_organizations() -> Any:
-    all_organizations = crud.ClimateWareHouseCrud(
+    all_organizations = await crud.ClimateWareHouseCrud(
         url=settings.CADT_API_SERVER_HOST,
         api_key=settings.CADT_API_KEY,
     ).get_climate_organizations()
@@ -16,9 +16,9 @@ from fastapi import APIRouter, Depends
 
 from app import schemas
 from app.api import dependencies as deps
-from app.config import ExecutionMode
+from app.config import ExecutionMode, settings
 from app.core import utils
-from app.core.climate_wallet.wallet import ClimateWallet
+from app.core.climate_wallet.wallet import ClimateWallet, TokenizationPayment
 from app.core.types import ClimateTokenIndex, GatewayMode
 from app.utils import disallow_route
 
@@ -45,14 +45,8 @@ async def create_tokenization_tx(
     token = request.token
     payment = request.payment
 
-    token_index = ClimateTokenIndex(
-        org_uid=token.org_uid,
-        warehouse_project_id=token.warehouse_project_id,
-        vintage_year=token.vintage_year,
-        sequence_num=token.sequence_num,
-    )
     wallet = await ClimateWallet.create(
-        token_index=token_index,
+        token_index=_create_token_index(token),
         root_secret_key=climate_secret_key,
         wallet_client=wallet_rpc_client,
     )
@@ -63,47 +57,77 @@ async def create_tokenization_tx(
     )
     (transaction_record, *_) = result["transaction_records"]
 
-    token_obj: dict[str, Any] = {
-        "index": wallet.token_index.name(),
-        "public_key": bytes(wallet.root_public_key),
-        "asset_id": wallet.tail_program_hash,
-        **token.dict(),
-    }
+    token_on_chain = _create_token_on_chain(token=token, wallet=wallet)
+    return schemas.TokenizationTxResponse(
+        token=token_on_chain,
+        token_hexstr=token_on_chain.hexstr(),
+        tx=schemas.Transaction(id=transaction_record.name, record=transaction_record.to_json_dict()),
+    )
 
-    for mode in GatewayMode:
-        if wallet.mode_to_public_key is None:
-            raise ValueError("Wallet mode to public key is None!")
 
-        public_key: G1Element = wallet.mode_to_public_key[mode]
+@router.post(
+    "/batch",
+    response_model=schemas.TokenizationTxBatchResponse,
+)
+@disallow_route([ExecutionMode.EXPLORER, ExecutionMode.CLIENT])
+async def create_tokenization_txs(
+    request: schemas.TokenizationTxBatchRequest,
+    wallet_rpc_client: WalletRpcClient = Depends(deps.get_wallet_rpc_client),
+) -> schemas.TokenizationTxBatchResponse:
+    """Create and send tokenization txs for many tokens.
 
-        mod_hash: bytes
-        signature: G2Element
-        (mod_hash, signature) = wallet.mode_to_message_and_signature[mode]
+    Tokens are tokenized together in spend bundles of up to `TOKENIZATION_BATCH_BUNDLE_SIZE`.
+    Every item gets its own result, in the order of the request; an item that could not be
+    tokenized gets an `error` instead of a tx.
 
-        if mode == GatewayMode.TOKENIZATION:
-            token_obj["tokenization"] = schemas.TokenizationTailMetadata(
-                mod_hash=mod_hash,
-                public_key=bytes(public_key),
-            )
+    This endpoint is to be called by the registry.
+    """
 
-        elif mode == GatewayMode.DETOKENIZATION:
-            token_obj["detokenization"] = schemas.DetokenizationTailMetadata(
-                mod_hash=mod_hash,
-                public_key=bytes(public_key),
-                signature=bytes(signature),
+    climate_secret_key = await utils.get_climate_secret_key(wallet_client=wallet_rpc_client)
+    constants = await utils.get_constants(wallet_client=wallet_rpc_client)
+
+    results: dict[int, schemas.TokenizationTxBatchItemResponse] = {}
+    payments: dict[int, TokenizationPayment] = {}
+    for index, item in enumerate(request.items):
+        try:
+            wallet = await ClimateWallet.create(
+                token_index=_create_token_index(item.token),
+                root_secret_key=climate_secret_key,
+                wallet_client=wallet_rpc_client,
+                constants=constants,
             )
-        elif mode == GatewayMode.PERMISSIONLESS_RETIREMENT:
-            token_obj["permissionless_retirement"] = schemas.PermissionlessRetirementTailMetadata(
-                mod_hash=mod_hash,
-                signature=bytes(signature),
+            payments[index] = TokenizationPayment(
+                wallet=wallet,
+                to_puzzle_hash=item.payment.to_puzzle_hash,
+                amount=item.payment.amount,
+                fee=item.payment.fee,
+            )
+        except Exception as e:
+            logger.error(f"Cannot create tokenization payment for item {index}: {e!s}")
+            results[index] = schemas.TokenizationTxBatchItemResponse(error=str(e))
+
+    for bundle in _group_tokenization_payments(payments, bundle_size=max(1, settings.TOKENIZATION_BATCH_BUNDLE_SIZE)):
+        try:
+            result = await ClimateWallet.send_tokenization_transactions(
+                payments=[payments[index] for index in bundle],
+            )
+        except Exception as e:
+            logger.error(f"Cannot send tokenization transaction for items {bundle}: {e!s}")
+            for index in bundle:
+                results[index] = schemas.TokenizationTxBatchItemResponse(error=str(e))
+            continue
+
+        (transaction_record, *_) = result["transaction_records"]
+        tx = schemas.Transaction(id=transaction_record.name, record=transaction_record.to_json_dict())
+        for index in bundle:
+            token_on_chain = _create_token_on_chain(token=request.items[index].token, wallet=payments[index].wallet)
+            results[index] = schemas.TokenizationTxBatchItemResponse(
+                token=token_on_chain,
+                token_hexstr=token_on_chain.hexstr(),
+                tx=tx,
             )
 
-    token_on_chain = schemas.TokenOnChain(**token_obj)
-    return schemas.TokenizationTxResponse(
-        token=token_on_chain,
-        token_hexstr=token_on_chain.hexstr(),
-        tx=schemas.Transaction(id=transaction_record.name, record=transaction_record.to_json_dict()),
-    )
+    return schemas.TokenizationTxBatchResponse(items=[results[index] for index in range(len(request.items))])
 
 
 @router.put(
@@ -333,3 +357,70 @@ async def create_permissionless_retirement_tx(
         token=token,
         tx=schemas.Transaction(id=transaction_record.name, record=transaction_record.to_json_dict()),
     )
+
+
+def _create_token_index(token: schemas.Token) -> ClimateTokenIndex:
+    return ClimateTokenIndex(
+        org_uid=token.org_uid,
+        warehouse_project_id=token.warehouse_project_id,
+        vintage_year=token.vintage_year,
+        sequence_num=token.sequence_num,
+    )
+
+
+def _create_token_on_chain(token: schemas.Token, wallet: ClimateWallet) -> schemas.TokenOnChain:
+    token_obj: dict[str, Any] = {
+        "index": wallet.token_index.name(),
+        "public_key": bytes(wallet.root_public_key),
+        "asset_id": wallet.tail_program_hash,
+        **token.dict(),
+    }
+
+    for mode in GatewayMode:
+        if wallet.mode_to_public_key is None:
+            raise ValueError("Wallet mode to public key is None!")
+
+        public_key: G1Element = wallet.mode_to_public_key[mode]
+
+        mod_hash: bytes
+        signature: G2Element
+        (mod_hash, signature) = wallet.mode_to_message_and_signature[mode]
+
+        if mode == GatewayMode.TOKENIZATION:
+            token_obj["tokenization"] = schemas.TokenizationTailMetadata(
+                mod_hash=mod_hash,
+                public_key=bytes(public_key),
+            )
+
+        elif mode == GatewayMode.DETOKENIZATION:
+            token_obj["detokenization"] = schemas.DetokenizationTailMetadata(
+                mod_hash=mod_hash,
+                public_key=bytes(public_key),
+                signature=bytes(signature),
+            )
+        elif mode == GatewayMode.PERMISSIONLESS_RETIREMENT:
+            token_obj["permissionless_retirement"] = schemas.PermissionlessRetirementTailMetadata(
+                mod_hash=mod_hash,
+                signature=bytes(signature),
+            )
+
+    return schemas.TokenOnChain(**token_obj)
+
+
+def _group_tokenization_payments(payments: dict[int, TokenizationPayment], bundle_size: int) -> list[list[int]]:
+    # every gateway coin of a bundle is created by the same coin, so tokenizing the same
+    # amount of the same token twice in a bundle would create the same coin twice
+    bundles: list[list[int]] = []
+    bundle_keys: list[set[tuple[bytes32, int]]] = []
+    for index, payment in payments.items():
+        key = (payment.wallet.tail_program_hash, payment.amount)
+        for bundle, keys in zip(bundles, bundle_keys):
+            if len(bundle) < bundle_size and key not in keys:
+                bundle.append(index)
+                keys.add(key)
+                break
+        else:
+            bundles.append([index])
+            bundle_keys.append({key})
+
+    return bundles
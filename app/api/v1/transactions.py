@@ -6,12 +6,10 @@ from typing import Optional
 
 from chia.rpc.wallet_rpc_client import WalletRpcClient
 from chia.types.blockchain_format.coin import Coin
-from chia.types.blockchain_format.program import Program
 from chia.types.blockchain_format.sized_bytes import bytes32
 from chia.types.coin_spend import CoinSpend
 from chia.util.byte_types import hexstr_to_bytes
 from chia.wallet.cat_wallet.cat_info import CATInfo
-from chia.wallet.cat_wallet.cat_utils import CAT_MOD, construct_cat_puzzle
 from chia.wallet.transaction_record import TransactionRecord
 from chia.wallet.transaction_sorting import SortKey
 from chia.wallet.util.wallet_types import WalletType
@@ -21,7 +19,7 @@ from fastapi import APIRouter, Depends
 from app import schemas
 from app.api import dependencies as deps
 from app.config import ExecutionMode
-from app.core.chialisp.gateway import create_gateway_puzzle, parse_gateway_spend
+from app.core.chialisp.gateway import GATEWAY_MOD_HASH, extract_gateway_spend, get_gateway_cat_puzzle_hash
 from app.core.types import CLIMATE_WALLET_INDEX, GatewayMode
 from app.schemas.types import ChiaJsonObject
 from app.utils import disallow_route
@@ -106,14 +104,8 @@ async def get_transactions(
         )
     if cat_info is None:
         raise ValueError(f"Wallet {wallet_id} is not a CAT wallet")
-    gateway_puzzle: Program = create_gateway_puzzle()
-    gateway_puzzle_hash: bytes32 = gateway_puzzle.get_tree_hash()
-    gateway_cat_puzzle: Program = construct_cat_puzzle(
-        mod_code=CAT_MOD,
-        limitations_program_hash=cat_info.limitations_program_hash,
-        inner_puzzle_or_hash=gateway_puzzle,
-    )
-    gateway_cat_puzzle_hash: bytes32 = gateway_cat_puzzle.get_tree_hash()
+    gateway_puzzle_hash: bytes32 = GATEWAY_MOD_HASH
+    gateway_cat_puzzle_hash: bytes32 = get_gateway_cat_puzzle_hash(cat_info.limitations_program_hash)
 
     transactions = []
     for transaction_record in transaction_records:
@@ -134,7 +126,7 @@ async def get_transactions(
             raise ValueError(f"No coin with puzzle hash {gateway_cat_puzzle_hash.hex()}")
 
         mode: GatewayMode
-        (mode, _tail_spend) = parse_gateway_spend(coin_spend=coin_spend, is_cat=True)
+        (mode, _tail_spend) = extract_gateway_spend(coin_spend=coin_spend, is_cat=True)
 
         transaction = transaction_record.to_json_dict()
         transaction["type"] = CLIMATE_WALLET_INDEX + mode.to_int()
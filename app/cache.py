@@ -0,0 +1,110 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from collections.abc import Awaitable, Callable, Hashable
+from typing import Any, Generic, TypeVar
+
+logger = logging.getLogger("ClimateToken")
+
+K = TypeVar("K", bound=Hashable)
+V = TypeVar("V")
+
+
+class TTLCache(Generic[K, V]):
+    """In-process cache with per-entry expiry and LRU eviction.
+
+    Concurrent misses on the same key are deduplicated: the first caller runs the loader,
+    the others await its result. Failed loads are not cached. A `ttl` of 0 disables caching.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        ttl: float,
+        max_size: int,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.name = name
+        self.ttl = ttl
+        self.max_size = max_size
+        self.clock = clock
+
+        self.hits = 0
+        self.misses = 0
+
+        self._entries: OrderedDict[K, tuple[float, V]] = OrderedDict()
+        self._inflight: dict[K, asyncio.Future[V]] = {}
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: K) -> tuple[bool, V | None]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return (False, None)
+
+        (expires_at, value) = entry
+        if expires_at <= self.clock():
+            del self._entries[key]
+            return (False, None)
+
+        self._entries.move_to_end(key)
+        return (True, value)
+
+    def set(self, key: K, value: V) -> None:
+        if self.ttl <= 0 or self.max_size <= 0:
+            return
+
+        self._entries[key] = (self.clock() + self.ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    async def get_or_load(self, key: K, loader: Callable[[], Awaitable[V]]) -> V:
+        (found, value) = self.get(key)
+        if found:
+            self.hits += 1
+            return value  # type: ignore[return-value]
+
+        inflight = self._inflight.get(key)
+        if inflight is not None:
+            self.hits += 1
+            return await asyncio.shield(inflight)
+
+        self.misses += 1
+        future: asyncio.Future[V] = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            value = await loader()
+        except Exception as e:
+            future.set_exception(e)
+            # mark the exception as retrieved in case nobody else was waiting
+            future.exception()
+            raise
+        except BaseException:
+            future.cancel()
+            raise
+        else:
+            self.set(key, value)
+            future.set_result(value)
+            return value
+        finally:
+            del self._inflight[key]
+
+    def invalidate(self, key: K | None = None) -> None:
+        if key is None:
+            self._entries.clear()
+        else:
+            self._entries.pop(key, None)
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "size": len(self._entries),
+            "max_size": self.max_size,
+            "ttl": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+        }
@@ -41,23 +41,62 @@ class Settings(BaseSettings):
     # Visible configs: configurable through config.yaml
     LOG_PATH: Path = Path("climate_token/log/debug.log")
     DB_PATH: Path = Path("climate_explorer/db/climate_activity_CHALLENGE.sqlite")
+    DB_POOL_SIZE: int = 5
+    DB_MAX_OVERFLOW: int = 10
+    # SQLite profile applied to every database connection, see https://www.sqlite.org/pragma.html
+    DB_JOURNAL_MODE: str = "WAL"
+    DB_SYNCHRONOUS: str = "NORMAL"
+    DB_BUSY_TIMEOUT: int = 15_000
+    # in KiB when negative, in pages otherwise
+    DB_CACHE_SIZE: int = -65_536
+    DB_MMAP_SIZE: int = 268_435_456
+    DB_TEMP_STORE: str = "MEMORY"
 
     CLIMATE_EXPLORER_SERVER_HOST: str = "0.0.0.0"
     BLOCK_START: int = 1_500_000
     BLOCK_RANGE: int = 10_000
     MIN_DEPTH: int = 4
-    # we always look back ~36 hours since the climate warehouse waits 24 hours before
-    # setting metadata to be readable
+    # no longer used: tokens are scanned from their own cursor, and tokens that show up late
+    # in the climate warehouse metadata are backfilled, so no window needs to be rescanned.
+    # kept so existing configuration files still load
     LOOKBACK_DEPTH: int = 6_912
+    # bounds of the adaptive scan window, `BLOCK_RANGE` is the initial size
+    SCAN_WINDOW_MIN_SIZE: int = 500
+    SCAN_WINDOW_MAX_SIZE: int = 200_000
+    SCAN_WINDOW_TARGET_COIN_RECORDS: int = 2_000
+    SCAN_WINDOW_TARGET_LATENCY: float = 5.0
+    SCAN_DECODE_WORKERS: int = 4
+    DECODE_PROCESSES: Optional[int] = 0
+    SCAN_WRITE_BATCH_SIZE: int = 200
+    SCAN_QUEUE_SIZE: int = 1_000
     # fee is in mojos
     DEFAULT_FEE: int = 1_000_000_000
+    TOKENIZATION_BATCH_BUNDLE_SIZE: int = 25
     CADT_API_SERVER_HOST: str = "https://observer.climateactiondata.org/api"
     CADT_API_KEY: Optional[str] = None
+    CADT_PAGE_SIZE: int = 10
+    CADT_MAX_CONCURRENT_REQUESTS: int = 8
+    CADT_TIMEOUT: float = 30.0
+    CADT_CONNECT_TIMEOUT: float = 10.0
+    CADT_MAX_RETRIES: int = 3
+    CADT_RETRY_BACKOFF: float = 0.5
+    CADT_MAX_CONNECTIONS: int = 20
+    # time-to-live of cached CADT responses, in seconds (0 disables caching)
+    CADT_CACHE_UNITS_TTL: int = 60
+    CADT_CACHE_PROJECTS_TTL: int = 300
+    CADT_CACHE_ORGANIZATIONS_TTL: int = 300
+    CADT_CACHE_METADATA_TTL: int = 120
+    CADT_CACHE_MAX_SIZE: int = 256
+    # mirror CADT into the explorer database and serve activities from the local copy
+    CADT_MIRROR_ENABLED: bool = True
+    CADT_SYNC_INTERVAL: int = 300
     CHIA_HOSTNAME: str = "localhost"
     CHIA_WALLET_HOSTNAME: Optional[str] = None
     CHIA_FULL_NODE_HOSTNAME: Optional[str] = None
     CHIA_FULL_NODE_RPC_PORT: int = 8555
     CHIA_WALLET_RPC_PORT: int = 9256
+    RPC_HEALTH_CHECK_INTERVAL: float = 30.0
+    FULL_NODE_MAX_CONCURRENT_REQUESTS: int = 16
     CLIMATE_EXPLORER_PORT: Optional[int] = None
     CLIMATE_TOKEN_CLIENT_PORT: Optional[int] = None
     CLIMATE_TOKEN_REGISTRY_PORT: Optional[int] = None
@@ -87,6 +126,13 @@ class Settings(BaseSettings):
 
         return values
 
+    @validator("DB_JOURNAL_MODE", "DB_SYNCHRONOUS", "DB_TEMP_STORE")
+    def check_pragma_value(cls, v: str) -> str:
+        # interpolated into the PRAGMA statements
+        if not v.isalnum():
+            raise ValueError(f"Invalid SQLite pragma value {v}")
+        return v.upper()
+
     @validator("CHIA_ROOT", pre=True)
     def expand_root(cls, v: str) -> Path:
         return Path(v).expanduser()
@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+import logging
 from typing import Optional
 
 from chia.types.blockchain_format.coin import Coin
@@ -7,7 +8,9 @@ from chia.types.blockchain_format.program import Program
 from chia.types.blockchain_format.sized_bytes import bytes32
 from chia.types.coin_spend import CoinSpend, make_spend
 from chia.types.condition_opcodes import ConditionOpcode
+from chia.wallet.cat_wallet.cat_utils import CAT_MOD_HASH
 from chia.wallet.conditions import CreateCoinAnnouncement
+from chia.wallet.util.curry_and_treehash import calculate_hash_of_quoted_mod_hash, curry_and_treehash, shatree_atom
 
 from app.core.chialisp.load_clvm import load_clvm_locally
 from app.core.chialisp.tail import (
@@ -18,7 +21,12 @@ from app.core.chialisp.tail import (
 )
 from app.core.types import GatewayMode
 
+logger = logging.getLogger("ClimateToken")
+
 GATEWAY_MOD = load_clvm_locally("gateway_with_conditions.clsp")
+GATEWAY_MOD_HASH: bytes32 = GATEWAY_MOD.get_tree_hash()
+CAT_MOD_HASH_HASH: bytes32 = calculate_hash_of_quoted_mod_hash(CAT_MOD_HASH)
+DELEGATED_TAIL_MOD_HASH_HASH: bytes32 = calculate_hash_of_quoted_mod_hash(DELEGATED_TAIL_MOD.get_tree_hash())
 
 
 def create_gateway_puzzle() -> Program:
@@ -57,8 +65,133 @@ def parse_gateway_spend(
         solution = solution.at("f")
 
     conditions: Program = puzzle.run(solution)
+    (tail_program, tail_solution) = _find_tail(conditions)
+
+    (tail_program_mod, _) = tail_program.uncurry()
+    if tail_program_mod != DELEGATED_TAIL_MOD:
+        raise ValueError("TAIL mod {tail_program_mod.get_tree_hash().hex()} invalid!")
+
+    mode: GatewayMode = _parse_delegated_puzzle_mode(tail_solution)
+    tail_spend = make_spend(
+        coin=coin,
+        puzzle_reveal=tail_program,
+        solution=tail_solution,
+    )
+
+    return (mode, tail_spend)
+
+
+def extract_gateway_spend(
+    coin_spend: CoinSpend,
+    is_cat: bool = True,
+) -> tuple[GatewayMode, CoinSpend]:
+    """Same as `parse_gateway_spend`, without running the gateway puzzle.
+
+    See `extract_gateway_activity`. Spends it cannot read go through `parse_gateway_spend`.
+    """
+
+    extracted = _extract_gateway_tail(coin_spend=coin_spend, is_cat=is_cat)
+    if extracted is None:
+        return parse_gateway_spend(coin_spend=coin_spend, is_cat=is_cat)
+
+    (mode, tail_program, tail_solution) = extracted
+    tail_spend = make_spend(
+        coin=coin_spend.coin,
+        puzzle_reveal=tail_program,
+        solution=tail_solution,
+    )
+
+    return (mode, tail_spend)
+
+
+def extract_gateway_activity(
+    coin_spend: CoinSpend,
+) -> tuple[GatewayMode, dict[str, str]]:
+    """Read the mode and metadata of a gateway CAT spend straight from its solution.
+
+    The gateway puzzle only prepends an announcement to the conditions it is given, so once the
+    coin is known to be a gateway CAT, the tail and its solution are read from the conditions in
+    the solution instead of running the puzzle. The tail mod is checked by hashing its curried
+    arguments against the asset id rather than comparing whole programs. Both checks rely on
+    the puzzle reveal hashing to the coin puzzle hash, as it does for any valid spend.
+
+    Spends it cannot read go through `parse_gateway_spend`.
+    """
+
+    extracted = _extract_gateway_tail(coin_spend=coin_spend, is_cat=True)
+    if extracted is None:
+        (mode, tail_spend) = parse_gateway_spend(coin_spend=coin_spend, is_cat=True)
+        return (mode, parse_gateway_metadata(tail_spend=tail_spend))
+
+    (mode, _, tail_solution) = extracted
+
+    return (mode, _parse_key_value_pairs(coin=coin_spend.coin, tail_solution=tail_solution))
+
+
+def parse_gateway_metadata(
+    tail_spend: CoinSpend,
+) -> dict[str, str]:
+    return _parse_key_value_pairs(coin=tail_spend.coin, tail_solution=tail_spend.solution.to_program())
+
 
-    tail_program: Optional[Program] = None
+def decode_gateway_spend(
+    coin_spend_bytes: bytes,
+) -> tuple[GatewayMode, dict[str, str]]:
+    """Decode the mode and metadata of a serialized gateway CAT spend.
+
+    Takes and returns plain picklable values so it can run on a worker process.
+    """
+
+    return extract_gateway_activity(coin_spend=CoinSpend.from_bytes(coin_spend_bytes))
+
+
+def get_gateway_cat_puzzle_hash(tail_program_hash: bytes32) -> bytes32:
+    return curry_and_treehash(
+        CAT_MOD_HASH_HASH,
+        shatree_atom(CAT_MOD_HASH),
+        shatree_atom(tail_program_hash),
+        GATEWAY_MOD_HASH,
+    )
+
+
+def _extract_gateway_tail(
+    coin_spend: CoinSpend,
+    is_cat: bool = True,
+) -> Optional[tuple[GatewayMode, Program, Program]]:
+    solution: Program = coin_spend.solution.to_program()
+
+    tail_program_hash: Optional[bytes32] = None
+    if is_cat:
+        (_, puzzle_args) = coin_spend.puzzle_reveal.to_program().uncurry()
+        tail_program_hash = bytes32(puzzle_args.at("rf").as_atom())
+        if coin_spend.coin.puzzle_hash != get_gateway_cat_puzzle_hash(tail_program_hash):
+            return None
+
+        solution = solution.at("f")
+
+    elif coin_spend.puzzle_reveal.get_tree_hash() != GATEWAY_MOD_HASH:
+        return None
+
+    # the gateway conditions are its only argument
+    conditions: Program = solution.at("f")
+    (tail_program, tail_solution) = _find_tail(conditions)
+
+    (tail_program_mod, tail_program_args) = tail_program.uncurry()
+    if tail_program_hash is None:
+        if tail_program_mod != DELEGATED_TAIL_MOD:
+            return None
+
+    elif tail_program_hash != curry_and_treehash(
+        DELEGATED_TAIL_MOD_HASH_HASH, *(arg.get_tree_hash() for arg in tail_program_args.as_iter())
+    ):
+        return None
+
+    return (_parse_delegated_puzzle_mode(tail_solution), tail_program, tail_solution)
+
+
+def _find_tail(
+    conditions: Program,
+) -> tuple[Program, Program]:
     for condition in conditions.as_iter():
         opcode: bytes = condition.at("f").as_atom()
         if opcode != ConditionOpcode.CREATE_COIN:
@@ -67,37 +200,52 @@ def parse_gateway_spend(
         amount: int = condition.at("rrf").as_int()
 
         if amount == -113:
-            tail_program = condition.at("rrrf")
-            tail_solution: Program = condition.at("rrrrf")
-            break
-    else:
-        raise ValueError("No TAIL found!")
+            return (condition.at("rrrf"), condition.at("rrrrf"))
 
-    if tail_program is None:
-        raise ValueError("No TAIL found!")
+    raise ValueError("No TAIL found!")
 
-    (tail_program_mod, _) = tail_program.uncurry()
-    if tail_program_mod != DELEGATED_TAIL_MOD:
-        raise ValueError("TAIL mod {tail_program_mod.get_tree_hash().hex()} invalid!")
 
+def _parse_delegated_puzzle_mode(
+    tail_solution: Program,
+) -> GatewayMode:
     delegated_puzzle: Program = tail_solution.at("f")
     (delegated_puzzle_mod, _) = delegated_puzzle.uncurry()
 
-    mode: Optional[GatewayMode] = None
     if delegated_puzzle_mod == MINT_WITH_SIGNATURE_MOD:
-        mode = GatewayMode.TOKENIZATION
+        return GatewayMode.TOKENIZATION
     elif delegated_puzzle_mod == MELT_ALL_BY_ANYONE_MOD:
-        mode = GatewayMode.PERMISSIONLESS_RETIREMENT
+        return GatewayMode.PERMISSIONLESS_RETIREMENT
     elif delegated_puzzle_mod == MELT_ALL_WITH_SIGNATURE_MOD:
-        mode = GatewayMode.DETOKENIZATION
-    else:
-        puzzle_hash: bytes32 = delegated_puzzle_mod.get_tree_hash()
-        raise ValueError(f"Invalid delegated puzzle with hash {puzzle_hash.hex()}")
+        return GatewayMode.DETOKENIZATION
 
-    tail_spend = make_spend(
-        coin=coin,
-        puzzle_reveal=tail_program,
-        solution=tail_solution,
-    )
+    puzzle_hash: bytes32 = delegated_puzzle_mod.get_tree_hash()
+    raise ValueError(f"Invalid delegated puzzle with hash {puzzle_hash.hex()}")
 
-    return (mode, tail_spend)
+
+def _parse_key_value_pairs(
+    coin: Coin,
+    tail_solution: Program,
+) -> dict[str, str]:
+    delegated_solution: Program = tail_solution.at("r")
+    key_value_pairs: Program = delegated_solution.at("f")
+
+    metadata: dict[str, str] = {}
+    for key_value_pair in key_value_pairs.as_iter():
+        if (not key_value_pair.listp()) or (key_value_pair.at("r").listp()):
+            logger.warning(f"Coin {coin.name()} has incorrect metadata structure")
+            continue
+
+        key_bytes = key_value_pair.at("f").as_atom()
+        value_bytes = key_value_pair.at("r").as_atom()
+
+        key = key_bytes.decode()
+        if key in {"bp"}:
+            value = f"0x{value_bytes.hex()}"
+        elif key in {"ba", "bn"}:
+            value = value_bytes.decode()
+        else:
+            raise ValueError(f"Unknown key '{key}'!")
+
+        metadata[key] = value
+
+    return metadata
@@ -0,0 +1,202 @@
+from __future__ import annotations
+
+import asyncio
+import dataclasses
+import logging
+import time
+from collections.abc import AsyncIterator, Callable, Iterable
+from contextlib import asynccontextmanager
+from typing import Any
+
+from chia.rpc.wallet_rpc_client import WalletRpcClient
+from chia.types.blockchain_format.coin import Coin
+from chia.types.blockchain_format.sized_bytes import bytes32
+from chia.types.mempool_inclusion_status import MempoolInclusionStatus
+from chia.util.errors import Err
+from chia.wallet.transaction_record import TransactionRecord
+from chia.wallet.util.tx_config import DEFAULT_TX_CONFIG, TXConfig
+
+logger = logging.getLogger("ClimateToken")
+
+COIN_RESERVATION_TTL = 600
+# how often, in seconds, the transactions of the leased coins are checked
+COIN_RESERVATION_POLL_INTERVAL = 10
+
+# mempool errors the wallet retries from, so the transaction is still pending
+_TEMPORARY_ERRORS = {Err.INVALID_FEE_LOW_FEE.name, Err.INVALID_FEE_TOO_CLOSE_TO_ZERO.name}
+
+
+def is_transaction_settled(transaction_record: TransactionRecord) -> bool:
+    """Whether the coins of a pushed transaction are no longer waiting on it.
+
+    That is once the transaction is confirmed, which the wallet also marks the transactions it
+    gave up on as, or once the mempool last rejected it or removed it, e.g. for a conflict.
+    """
+
+    if transaction_record.confirmed:
+        return True
+
+    if len(transaction_record.sent_to) == 0:
+        return False
+
+    (_, status, error) = transaction_record.sent_to[-1]
+    return MempoolInclusionStatus(status) == MempoolInclusionStatus.FAILED and error not in _TEMPORARY_ERRORS
+
+
+class CoinReservations:
+    """Lease table of the coins spent by the transactions of this process.
+
+    Coins are leased as soon as they are selected, and are excluded from every other
+    selection until they are released: because the transaction could not be created or
+    pushed, or, once it is pushed, by `release_settled` when the wallet reports it confirmed
+    or rejected. Leases also expire after `ttl` seconds, in case the wallet never does.
+    """
+
+    def __init__(
+        self,
+        ttl: float,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.ttl = ttl
+        self.clock = clock
+
+        self.reserved = 0
+        self.released = 0
+
+        self._leases: dict[bytes32, float] = {}
+        # coins leased to each pushed transaction, until it is settled
+        self._transactions: dict[bytes32, set[bytes32]] = {}
+        self._lock = asyncio.Lock()
+
+    def __len__(self) -> int:
+        return len(self.excluded_coin_ids())
+
+    def excluded_coin_ids(self) -> list[bytes32]:
+        now = self.clock()
+        self._leases = {coin_id: expires_at for (coin_id, expires_at) in self._leases.items() if expires_at > now}
+        return list(self._leases)
+
+    def reserve(self, coin_ids: Iterable[bytes32]) -> None:
+        expires_at = self.clock() + self.ttl
+        for coin_id in coin_ids:
+            self._leases[coin_id] = expires_at
+            self.reserved += 1
+
+    def release(self, coin_ids: Iterable[bytes32]) -> None:
+        for coin_id in coin_ids:
+            if self._leases.pop(coin_id, None) is not None:
+                self.released += 1
+
+    def track(self, transaction_records: Iterable[TransactionRecord], coin_ids: Iterable[bytes32]) -> None:
+        """Keep `coin_ids` leased until the pushed transactions spending them are settled."""
+
+        coin_ids = set(coin_ids)
+        for transaction_record in transaction_records:
+            spent_coin_ids = coin_ids.intersection(coin.name() for coin in transaction_record.removals)
+            if len(spent_coin_ids) > 0:
+                self._transactions[transaction_record.name] = spent_coin_ids
+                coin_ids -= spent_coin_ids
+
+        # coins none of the transactions spend
+        self.release(coin_ids)
+
+    def transaction_ids(self) -> list[bytes32]:
+        return list(self._transactions)
+
+    async def release_settled(self, wallet_client: WalletRpcClient) -> int:
+        """Release the coins of the tracked transactions the wallet reports settled.
+
+        Returns the number of settled transactions.
+        """
+
+        leased_coin_ids = set(self.excluded_coin_ids())
+        settled = 0
+        for transaction_id in self.transaction_ids():
+            coin_ids = self._transactions[transaction_id]
+            if leased_coin_ids.isdisjoint(coin_ids):
+                # the leases expired already
+                del self._transactions[transaction_id]
+                continue
+
+            try:
+                transaction_record = await wallet_client.get_transaction(transaction_id)
+            except ValueError as e:
+                # the wallet no longer knows the transaction, e.g. it was deleted as unconfirmed
+                logger.warning(f"Cannot get transaction {transaction_id.hex()}: {e!s}")
+            else:
+                if not is_transaction_settled(transaction_record):
+                    continue
+
+            logger.info(f"Releasing {len(coin_ids)} coins reserved by settled transaction {transaction_id.hex()}")
+            self.release(coin_ids)
+            del self._transactions[transaction_id]
+            settled += 1
+
+        return settled
+
+    @asynccontextmanager
+    async def lease(self) -> AsyncIterator[CoinLease]:
+        """Lease coins for a transaction, released if the block raises."""
+
+        lease = CoinLease(reservations=self)
+        try:
+            yield lease
+        except BaseException:
+            logger.info(f"Releasing {len(lease.coin_ids)} reserved coins")
+            self.release(lease.coin_ids)
+            raise
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "size": len(self),
+            "reserved": self.reserved,
+            "released": self.released,
+        }
+
+
+@dataclasses.dataclass
+class CoinLease:
+    reservations: CoinReservations
+    coin_ids: set[bytes32] = dataclasses.field(default_factory=set)
+
+    def track(self, transaction_records: Iterable[TransactionRecord]) -> None:
+        """Keep the coins leased until the pushed `transaction_records` are settled."""
+
+        self.reservations.track(transaction_records, self.coin_ids)
+
+    @asynccontextmanager
+    async def selecting(self) -> AsyncIterator[None]:
+        """Select and reserve coins without another transaction of this process selecting at once.
+
+        The wallet picks coins, including the ones paying the fee, from the coins not leased when
+        it is called, so the leases of a transaction need to be taken before the next one selects.
+        """
+
+        async with self.reservations._lock:
+            yield
+
+    @property
+    def tx_config(self) -> TXConfig:
+        # only the coins leased to other transactions are excluded
+        excluded_coin_ids = [
+            coin_id for coin_id in self.reservations.excluded_coin_ids() if coin_id not in self.coin_ids
+        ]
+        return dataclasses.replace(DEFAULT_TX_CONFIG, excluded_coin_ids=excluded_coin_ids)
+
+    async def select_coins(self, wallet_client: WalletRpcClient, amount: int, wallet_id: int) -> list[Coin]:
+        coins: list[Coin] = await wallet_client.select_coins(
+            amount=amount,
+            wallet_id=wallet_id,
+            coin_selection_config=self.tx_config.coin_selection_config,
+        )
+        self.reserve(coin.name() for coin in coins)
+
+        return coins
+
+    def reserve(self, coin_ids: Iterable[bytes32]) -> None:
+        coin_ids = set(coin_ids) - self.coin_ids
+        self.reservations.reserve(coin_ids)
+        self.coin_ids |= coin_ids
+
+
+coin_reservations = CoinReservations(ttl=COIN_RESERVATION_TTL)
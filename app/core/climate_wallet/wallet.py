@@ -1,6 +1,8 @@
 from __future__ import annotations
 
+import asyncio
 import dataclasses
+import functools
 import logging
 import time
 from collections.abc import Iterator
@@ -29,13 +31,15 @@ from chia.wallet.payment import Payment
 from chia.wallet.transaction_record import TransactionRecord
 from chia.wallet.uncurried_puzzle import uncurry_puzzle
 from chia.wallet.util.compute_memos import compute_memos
-from chia.wallet.util.tx_config import DEFAULT_TX_CONFIG
+from chia.wallet.util.tx_config import DEFAULT_TX_CONFIG, TXConfig
 from chia.wallet.util.wallet_types import WalletType
 from chia.wallet.wallet_spend_bundle import WalletSpendBundle
 from chia_rs import AugSchemeMPL, G1Element, G2Element, PrivateKey
 
-from app.core.chialisp.gateway import create_gateway_puzzle, parse_gateway_spend
+from app.cache import TTLCache
+from app.core.chialisp.gateway import create_gateway_puzzle, extract_gateway_spend, parse_gateway_metadata
 from app.core.chialisp.tail import create_delegated_puzzle, create_tail_program
+from app.core.climate_wallet.coin_reservations import CoinLease, coin_reservations
 from app.core.climate_wallet.wallet_utils import create_gateway_request_and_spend, create_gateway_signature
 from app.core.derive_keys import root_sk_to_gateway_sk
 from app.core.types import CLIMATE_WALLET_INDEX, ClimateTokenIndex, GatewayMode, TransactionRequest
@@ -43,6 +47,96 @@ from app.core.utils import get_constants, get_created_signed_transactions, get_f
 
 logger = logging.getLogger("ClimateToken")
 
+TOKEN_PUZZLES_CACHE_SIZE = 4096
+REGISTRY_KEYS_CACHE_SIZE = 4096
+REGISTRY_KEYS_CACHE_TTL = 3600
+
+
+@dataclasses.dataclass(frozen=True)
+class ClimateTokenPuzzles:
+    tail_program: Program
+    tail_program_hash: bytes32
+    gateway_cat_puzzle: Program
+    gateway_cat_puzzle_hash: bytes32
+
+
+@functools.lru_cache(maxsize=TOKEN_PUZZLES_CACHE_SIZE)
+def get_climate_token_puzzles(root_public_key: G1Element, token_index_hash: bytes32) -> ClimateTokenPuzzles:
+    """Curry and hash the puzzles of a token once, as they only depend on the key and the token index."""
+
+    tail_program: Program = create_tail_program(
+        public_key=root_public_key,
+        index=Program.to(token_index_hash),
+    )
+    tail_program_hash: bytes32 = tail_program.get_tree_hash()
+    gateway_cat_puzzle: Program = construct_cat_puzzle(
+        mod_code=CAT_MOD,
+        limitations_program_hash=tail_program_hash,
+        inner_puzzle_or_hash=create_gateway_puzzle(),
+    )
+
+    return ClimateTokenPuzzles(
+        tail_program=tail_program,
+        tail_program_hash=tail_program_hash,
+        gateway_cat_puzzle=gateway_cat_puzzle,
+        gateway_cat_puzzle_hash=gateway_cat_puzzle.get_tree_hash(),
+    )
+
+
+@dataclasses.dataclass(frozen=True)
+class ClimateRegistryKeys:
+    mode_to_public_key: dict[GatewayMode, G1Element]
+    mode_to_secret_key: dict[GatewayMode, PrivateKey]
+    mode_to_message_and_signature: dict[GatewayMode, tuple[bytes, G2Element]]
+
+
+def create_climate_registry_keys(root_secret_key: PrivateKey, token_index_hash: bytes32) -> ClimateRegistryKeys:
+    # the gateway key is the same for every mode
+    secret_key: PrivateKey = root_sk_to_gateway_sk(root_secret_key)
+    public_key: G1Element = secret_key.get_g1()
+
+    gateway_puzzle: Program = create_gateway_puzzle()
+    gateway_puzzle_hash: bytes32 = gateway_puzzle.get_tree_hash()
+
+    mode_to_public_key: dict[GatewayMode, G1Element] = {}
+    mode_to_secret_key: dict[GatewayMode, PrivateKey] = {}
+    mode_to_message_and_signature: dict[GatewayMode, tuple[bytes, G2Element]] = {}
+    for mode in GatewayMode:
+        delegated_puzzle: Program = create_delegated_puzzle(
+            mode=mode,
+            gateway_puzzle_hash=gateway_puzzle_hash,
+            public_key=public_key,
+        )
+        delegated_puzzle_hash: bytes32 = delegated_puzzle.get_tree_hash()
+        message: bytes32 = Program.to([token_index_hash, delegated_puzzle]).get_tree_hash()
+        signature: G2Element = AugSchemeMPL.sign(root_secret_key, message)
+
+        mode_to_public_key[mode] = public_key
+        mode_to_secret_key[mode] = secret_key
+        mode_to_message_and_signature[mode] = (message, signature)
+
+        logger.info(f"Signing delegated tail for mode `{mode.name}`:")
+        logger.info(f"  - Public key: {bytes(public_key).hex()}")
+        logger.info(f"  - Delegated puzzle hash: {delegated_puzzle_hash.hex()}")
+        logger.info(f"  - Message: {message.hex()}")
+        logger.info(f"  - Signature: {bytes(signature).hex()}")
+
+    return ClimateRegistryKeys(
+        mode_to_public_key=mode_to_public_key,
+        mode_to_secret_key=mode_to_secret_key,
+        mode_to_message_and_signature=mode_to_message_and_signature,
+    )
+
+
+# gateway keys and delegated signatures by root key fingerprint and token index, so that
+# registry requests for a token only derive and sign once; they expire to bound how long
+# secret keys stay in memory
+registry_keys_cache: TTLCache[tuple[int, bytes32], ClimateRegistryKeys] = TTLCache(
+    name="registry_keys",
+    ttl=REGISTRY_KEYS_CACHE_TTL,
+    max_size=REGISTRY_KEYS_CACHE_SIZE,
+)
+
 
 @dataclasses.dataclass
 class ClimateWalletBase:
@@ -53,16 +147,33 @@ class ClimateWalletBase:
     def token_index_hash(self) -> bytes32:
         return self.token_index.name()
 
+    @property
+    def puzzles(self) -> ClimateTokenPuzzles:
+        return get_climate_token_puzzles(self.root_public_key, self.token_index_hash)
+
     @property
     def tail_program(self) -> Program:
-        return create_tail_program(
-            public_key=self.root_public_key,
-            index=Program.to(self.token_index_hash),
-        )
+        return self.puzzles.tail_program
 
     @property
     def tail_program_hash(self) -> bytes32:
-        return self.tail_program.get_tree_hash()
+        return self.puzzles.tail_program_hash
+
+    @property
+    def gateway_cat_puzzle(self) -> Program:
+        return self.puzzles.gateway_cat_puzzle
+
+    @property
+    def gateway_cat_puzzle_hash(self) -> bytes32:
+        return self.puzzles.gateway_cat_puzzle_hash
+
+
+@dataclasses.dataclass(frozen=True)
+class TokenizationPayment:
+    wallet: ClimateWallet
+    to_puzzle_hash: bytes32
+    amount: int
+    fee: int = 0
 
 
 @dataclasses.dataclass
@@ -80,53 +191,29 @@ class ClimateWallet(ClimateWalletBase):
         token_index: ClimateTokenIndex,
         root_secret_key: PrivateKey,
         wallet_client: WalletRpcClient,
+        constants: Optional[ConsensusConstants] = None,
     ) -> ClimateWallet:
         root_public_key: G1Element = root_secret_key.get_g1()
         token_index_hash: bytes32 = token_index.name()
-        tail_program = create_tail_program(public_key=root_public_key, index=Program.to(token_index_hash))
-        tail_program_hash: bytes32 = tail_program.get_tree_hash()
+        tail_program_hash: bytes32 = get_climate_token_puzzles(root_public_key, token_index_hash).tail_program_hash
 
         logger.info("Creating climate wallet for")
         logger.info(f"  - Token index: {token_index_hash.hex()}")
         logger.info(f"  - Asset ID: {tail_program_hash.hex()}")
 
-        mode_to_public_key: dict[GatewayMode, G1Element] = {}
-        mode_to_secret_key: dict[GatewayMode, PrivateKey] = {}
-        mode_to_message_and_signature: dict[GatewayMode, tuple[bytes, G2Element]] = {}
-        for mode in GatewayMode:
-            secret_key: PrivateKey = root_sk_to_gateway_sk(root_secret_key)
-            public_key: G1Element = secret_key.get_g1()
-
-            gateway_puzzle: Program = create_gateway_puzzle()
-            gateway_puzzle_hash: bytes32 = gateway_puzzle.get_tree_hash()
-
-            delegated_puzzle: Program = create_delegated_puzzle(
-                mode=mode,
-                gateway_puzzle_hash=gateway_puzzle_hash,
-                public_key=public_key,
-            )
-            delegated_puzzle_hash: bytes32 = delegated_puzzle.get_tree_hash()
-            message: bytes32 = Program.to([token_index_hash, delegated_puzzle]).get_tree_hash()
-            signature: G2Element = AugSchemeMPL.sign(root_secret_key, message)
-
-            mode_to_public_key[mode] = secret_key.get_g1()
-            mode_to_secret_key[mode] = secret_key
-            mode_to_message_and_signature[mode] = (message, signature)
+        async def load_keys() -> ClimateRegistryKeys:
+            return create_climate_registry_keys(root_secret_key=root_secret_key, token_index_hash=token_index_hash)
 
-            logger.info(f"Signing delegated tail for mode `{mode.name}`:")
-            logger.info(f"  - Public key: {bytes(public_key).hex()}")
-            logger.info(f"  - Delegated puzzle hash: {delegated_puzzle_hash.hex()}")
-            logger.info(f"  - Message: {message.hex()}")
-            logger.info(f"  - Signature: {bytes(signature).hex()}")
-
-        constants = await get_constants(wallet_client=wallet_client)
+        keys = await registry_keys_cache.get_or_load((root_public_key.get_fingerprint(), token_index_hash), load_keys)
+        if constants is None:
+            constants = await get_constants(wallet_client=wallet_client)
 
         return ClimateWallet(
             token_index=token_index,
             root_public_key=root_public_key,
-            mode_to_public_key=mode_to_public_key,
-            mode_to_secret_key=mode_to_secret_key,
-            mode_to_message_and_signature=mode_to_message_and_signature,
+            mode_to_public_key=dict(keys.mode_to_public_key),
+            mode_to_secret_key=dict(keys.mode_to_secret_key),
+            mode_to_message_and_signature=dict(keys.mode_to_message_and_signature),
             wallet_client=wallet_client,
             constants=constants,
         )
@@ -182,7 +269,7 @@ class ClimateWallet(ClimateWalletBase):
         if wallet_info.type != wallet_type.value:
             raise ValueError(f"Incorrect wallet type {wallet_info.type}!")
 
-    async def _create_transaction(
+    def _create_gateway_spend(
         self,
         mode: GatewayMode,
         coins: list[Coin],
@@ -195,8 +282,7 @@ class ClimateWallet(ClimateWalletBase):
         gateway_public_key: Optional[G1Element] = None,
         public_key_to_secret_key: Optional[dict[G1Element, PrivateKey]] = None,
         allow_missing_signature: bool = False,
-        wallet_id: int = 1,
-    ) -> dict[str, Any]:
+    ) -> tuple[TransactionRequest, SpendBundle]:
         unsigned_gateway_coin_spend: CoinSpend
         signature: G2Element
         memos: list[bytes] = []
@@ -229,20 +315,31 @@ class ClimateWallet(ClimateWalletBase):
             aggregated_signature=signature,
         )
 
+        return (transaction_request, gateway_spend_bundle)
+
+    async def _create_gateway_transactions(
+        self,
+        mode: GatewayMode,
+        transaction_request: TransactionRequest,
+        gateway_spend_bundle: SpendBundle,
+        wallet_id: int = 1,
+        tx_config: TXConfig = DEFAULT_TX_CONFIG,
+    ) -> dict[str, Any]:
+        gateway_coins: set[Coin] = {coin_spend.coin for coin_spend in gateway_spend_bundle.coin_spends}
+
         transactions = await get_created_signed_transactions(
             transaction_request=transaction_request,
             wallet_id=wallet_id,
             wallet_client=self.wallet_client,
+            tx_config=tx_config,
         )
         new_txs = []
         for tx in transactions:
-            if unsigned_gateway_coin_spend.coin in tx.additions:
+            if any(addition in gateway_coins for addition in tx.additions):
                 spend_bundle = WalletSpendBundle.aggregate(
                     [gateway_spend_bundle] + ([] if tx.spend_bundle is None else [tx.spend_bundle])
                 )
-                additions = [
-                    add for add in tx.additions if add != unsigned_gateway_coin_spend.coin
-                ] + gateway_spend_bundle.additions()
+                additions = [add for add in tx.additions if add not in gateway_coins] + gateway_spend_bundle.additions()
             else:
                 spend_bundle = WalletSpendBundle.aggregate([] if tx.spend_bundle is None else [tx.spend_bundle])
                 additions = tx.additions
@@ -264,10 +361,49 @@ class ClimateWallet(ClimateWalletBase):
             "spend_bundle": SpendBundle.aggregate([tx.spend_bundle for tx in new_txs if tx.spend_bundle is not None]),
         }
 
+    async def _create_transaction(
+        self,
+        mode: GatewayMode,
+        coins: list[Coin],
+        origin_coin: Coin,
+        amount: int,
+        fee: int = 0,
+        from_puzzle_hash: Optional[bytes32] = None,
+        to_puzzle_hash: Optional[bytes32] = None,
+        key_value_pairs: Optional[list[tuple[Any, Any]]] = None,
+        gateway_public_key: Optional[G1Element] = None,
+        public_key_to_secret_key: Optional[dict[G1Element, PrivateKey]] = None,
+        allow_missing_signature: bool = False,
+        wallet_id: int = 1,
+        tx_config: TXConfig = DEFAULT_TX_CONFIG,
+    ) -> dict[str, Any]:
+        (transaction_request, gateway_spend_bundle) = self._create_gateway_spend(
+            mode=mode,
+            coins=coins,
+            origin_coin=origin_coin,
+            amount=amount,
+            fee=fee,
+            from_puzzle_hash=from_puzzle_hash,
+            to_puzzle_hash=to_puzzle_hash,
+            key_value_pairs=key_value_pairs,
+            gateway_public_key=gateway_public_key,
+            public_key_to_secret_key=public_key_to_secret_key,
+            allow_missing_signature=allow_missing_signature,
+        )
+
+        return await self._create_gateway_transactions(
+            mode=mode,
+            transaction_request=transaction_request,
+            gateway_spend_bundle=gateway_spend_bundle,
+            wallet_id=wallet_id,
+            tx_config=tx_config,
+        )
+
     async def _create_client_transaction(
         self,
         mode: GatewayMode,
         amount: int,
+        lease: CoinLease,
         fee: int = 0,
         gateway_public_key: Optional[G1Element] = None,
         gateway_key_values: Optional[dict[str, Any]] = None,
@@ -276,10 +412,10 @@ class ClimateWallet(ClimateWalletBase):
         self.check_user(is_registry=False)
         await self.check_wallet(wallet_id=wallet_id, wallet_type=WalletType.CAT)
 
-        coins: list[Coin] = await self.wallet_client.select_coins(
+        coins: list[Coin] = await lease.select_coins(
+            wallet_client=self.wallet_client,
             amount=amount,
             wallet_id=wallet_id,
-            coin_selection_config=DEFAULT_TX_CONFIG.coin_selection_config,
         )
         if not len(coins):
             raise ValueError("Insufficient balance!")
@@ -332,7 +468,7 @@ class ClimateWallet(ClimateWalletBase):
         if gateway_key_values:
             key_value_pairs = [(key, value) for (key, value) in gateway_key_values.items()]
 
-        return await self._create_transaction(
+        result = await self._create_transaction(
             mode=mode,
             coins=coins,
             origin_coin=origin_coin,
@@ -343,7 +479,13 @@ class ClimateWallet(ClimateWalletBase):
             gateway_public_key=gateway_public_key,
             allow_missing_signature=(mode == GatewayMode.DETOKENIZATION),
             wallet_id=wallet_id,
+            tx_config=lease.tx_config,
         )
+        # the fee is paid by coins the wallet selected itself
+        transaction_records: list[TransactionRecord] = result["transaction_records"]
+        lease.reserve(coin.name() for tx in transaction_records for coin in tx.removals)
+
+        return result
 
     async def send_tokenization_transaction(
         self,
@@ -352,50 +494,119 @@ class ClimateWallet(ClimateWalletBase):
         fee: int = 0,
         wallet_id: int = 1,
     ) -> dict[str, Any]:
-        self.check_user(is_registry=True)
-        await self.check_wallet(wallet_id=wallet_id, wallet_type=WalletType.STANDARD_WALLET)
+        return await ClimateWallet.send_tokenization_transactions(
+            payments=[TokenizationPayment(wallet=self, to_puzzle_hash=to_puzzle_hash, amount=amount, fee=fee)],
+            wallet_id=wallet_id,
+        )
 
-        mode = GatewayMode.TOKENIZATION
-        if self.mode_to_secret_key is None:
-            raise ValueError("No secret keys provided for the registry!")
-        if self.mode_to_public_key is None:
-            raise ValueError("No public keys provided for the registry!")
+    @staticmethod
+    async def send_tokenization_transactions(
+        payments: list[TokenizationPayment],
+        wallet_id: int = 1,
+    ) -> dict[str, Any]:
+        """Tokenize several tokens in a single spend bundle.
+
+        The coins for every payment are selected once, and every gateway coin is created by the
+        same origin coin, so two payments of the same token and amount cannot share a bundle.
+        """
+
+        if not len(payments):
+            raise ValueError("No payments provided!")
+
+        wallet: ClimateWallet = payments[0].wallet
+        for payment in payments:
+            payment.wallet.check_user(is_registry=True)
+        await wallet.check_wallet(wallet_id=wallet_id, wallet_type=WalletType.STANDARD_WALLET)
+
+        async with coin_reservations.lease() as lease:
+            async with lease.selecting():
+                result = await ClimateWallet._create_tokenization_transaction(
+                    payments=payments,
+                    lease=lease,
+                    wallet_id=wallet_id,
+                )
+            transaction_records: list[TransactionRecord] = result["transaction_records"]
 
-        gateway_secret_key: PrivateKey = self.mode_to_secret_key[mode]
-        gateway_public_key: G1Element = self.mode_to_public_key[mode]
-        public_key_to_secret_key = {gateway_public_key: gateway_secret_key}
+            await wallet.wallet_client.push_transactions(
+                PushTransactions(transactions=transaction_records, sign=False), DEFAULT_TX_CONFIG
+            )
+            lease.track(transaction_records)
+
+        return result
+
+    @staticmethod
+    async def _create_tokenization_transaction(
+        payments: list[TokenizationPayment],
+        lease: CoinLease,
+        wallet_id: int = 1,
+    ) -> dict[str, Any]:
+        wallet: ClimateWallet = payments[0].wallet
+        mode = GatewayMode.TOKENIZATION
+        amount: int = sum(payment.amount for payment in payments)
+        fee: int = sum(payment.fee for payment in payments)
 
-        coins: list[Coin] = await self.wallet_client.select_coins(
+        coins: list[Coin] = await lease.select_coins(
+            wallet_client=wallet.wallet_client,
             amount=amount + fee,
             wallet_id=wallet_id,
-            coin_selection_config=DEFAULT_TX_CONFIG.coin_selection_config,
         )
         if not len(coins):
             raise ValueError("Insufficient balance!")
 
         origin_coin: Coin = coins[0]
 
-        logger.info(f"Creating transaction for mode {mode.name}:")
-        logger.info(f"  - Recipient: {to_puzzle_hash.hex()}")
-        logger.info(f"  - Amount: {amount}")
-        logger.info(f"  - Fee: {fee}")
+        transaction_requests: list[TransactionRequest] = []
+        gateway_spend_bundles: list[SpendBundle] = []
+        for payment in payments:
+            if payment.wallet.mode_to_secret_key is None:
+                raise ValueError("No secret keys provided for the registry!")
+            if payment.wallet.mode_to_public_key is None:
+                raise ValueError("No public keys provided for the registry!")
 
-        result = await self._create_transaction(
-            mode=mode,
+            gateway_secret_key: PrivateKey = payment.wallet.mode_to_secret_key[mode]
+            gateway_public_key: G1Element = payment.wallet.mode_to_public_key[mode]
+
+            logger.info(f"Creating transaction for mode {mode.name}:")
+            logger.info(f"  - Asset ID: {payment.wallet.tail_program_hash.hex()}")
+            logger.info(f"  - Recipient: {payment.to_puzzle_hash.hex()}")
+            logger.info(f"  - Amount: {payment.amount}")
+            logger.info(f"  - Fee: {payment.fee}")
+
+            (transaction_request, gateway_spend_bundle) = payment.wallet._create_gateway_spend(
+                mode=mode,
+                coins=coins,
+                origin_coin=origin_coin,
+                amount=payment.amount,
+                fee=payment.fee,
+                to_puzzle_hash=payment.to_puzzle_hash,
+                gateway_public_key=gateway_public_key,
+                public_key_to_secret_key={gateway_public_key: gateway_secret_key},
+            )
+            transaction_requests.append(transaction_request)
+            gateway_spend_bundles.append(gateway_spend_bundle)
+
+        gateway_spend_bundle = SpendBundle.aggregate(gateway_spend_bundles)
+        gateway_coin_names = {coin_spend.coin.name() for coin_spend in gateway_spend_bundle.coin_spends}
+        if len(gateway_coin_names) != len(payments):
+            raise ValueError("Payments of the same token and amount cannot be sent in the same transaction!")
+
+        transaction_request = TransactionRequest(
             coins=coins,
-            origin_coin=origin_coin,
-            amount=amount,
-            fee=fee,
-            to_puzzle_hash=to_puzzle_hash,
-            gateway_public_key=gateway_public_key,
-            public_key_to_secret_key=public_key_to_secret_key,
+            payments=[payment for request in transaction_requests for payment in request.payments],
+            coin_announcements=[
+                announcement for request in transaction_requests for announcement in request.coin_announcements
+            ],
+            fee=uint64(fee),
+        )
+        result = await wallet._create_gateway_transactions(
+            mode=mode,
+            transaction_request=transaction_request,
+            gateway_spend_bundle=gateway_spend_bundle,
             wallet_id=wallet_id,
+            tx_config=lease.tx_config,
         )
         transaction_records: list[TransactionRecord] = result["transaction_records"]
-
-        await self.wallet_client.push_transactions(
-            PushTransactions(transactions=transaction_records, sign=False), DEFAULT_TX_CONFIG
-        )
+        lease.reserve(coin.name() for tx in transaction_records for coin in tx.removals)
 
         return result
 
@@ -410,24 +621,28 @@ class ClimateWallet(ClimateWalletBase):
             raise ValueError("No public keys provided for the registry!")
         gateway_public_key: G1Element = self.mode_to_public_key[mode]
 
-        result = await self._create_client_transaction(
-            mode=mode,
-            amount=amount,
-            fee=fee,
-            gateway_public_key=gateway_public_key,
-            wallet_id=wallet_id,
-        )
-        transaction_records: list[TransactionRecord] = result["transaction_records"]
-        spend_bundle: SpendBundle = result["spend_bundle"]
-        content: str = bech32_encode("detok", convertbits(bytes(spend_bundle), 8, 5))
+        async with coin_reservations.lease() as lease:
+            async with lease.selecting():
+                result = await self._create_client_transaction(
+                    mode=mode,
+                    amount=amount,
+                    lease=lease,
+                    fee=fee,
+                    gateway_public_key=gateway_public_key,
+                    wallet_id=wallet_id,
+                )
+            transaction_records: list[TransactionRecord] = result["transaction_records"]
+            spend_bundle: SpendBundle = result["spend_bundle"]
+            content: str = bech32_encode("detok", convertbits(bytes(spend_bundle), 8, 5))
 
-        transaction_records = [
-            dataclasses.replace(transaction_record, spend_bundle=None) for transaction_record in transaction_records
-        ]
+            transaction_records = [
+                dataclasses.replace(transaction_record, spend_bundle=None) for transaction_record in transaction_records
+            ]
 
-        await self.wallet_client.push_transactions(
-            PushTransactions(transactions=transaction_records, sign=False), DEFAULT_TX_CONFIG
-        )
+            await self.wallet_client.push_transactions(
+                PushTransactions(transactions=transaction_records, sign=False), DEFAULT_TX_CONFIG
+            )
+            lease.track(transaction_records)
 
         result.update(
             {
@@ -483,7 +698,7 @@ class ClimateWallet(ClimateWalletBase):
                 puzzle_reveal=inner_puzzle,
                 solution=inner_solution,
             )
-            (mode, _) = parse_gateway_spend(coin_spend=inner_coin_spend, is_cat=False)
+            (mode, _) = extract_gateway_spend(coin_spend=inner_coin_spend, is_cat=False)
             gateway_coin_spend = coin_spend
 
             # only one gateway per SpendBundle
@@ -619,22 +834,26 @@ class ClimateWallet(ClimateWalletBase):
             if beneficiary_address is None:
                 beneficiary_puzzle_hash = await get_first_puzzle_hash(self.wallet_client)
 
-        result = await self._create_client_transaction(
-            mode=mode,
-            amount=amount,
-            fee=fee,
-            wallet_id=wallet_id,
-            gateway_key_values={
-                "bn": beneficiary_name,
-                "ba": beneficiary_address,
-                "bp": beneficiary_puzzle_hash if beneficiary_puzzle_hash else b"",
-            },
-        )
-        transaction_records: list[TransactionRecord] = result["transaction_records"]
+        async with coin_reservations.lease() as lease:
+            async with lease.selecting():
+                result = await self._create_client_transaction(
+                    mode=mode,
+                    amount=amount,
+                    lease=lease,
+                    fee=fee,
+                    wallet_id=wallet_id,
+                    gateway_key_values={
+                        "bn": beneficiary_name,
+                        "ba": beneficiary_address,
+                        "bp": beneficiary_puzzle_hash if beneficiary_puzzle_hash else b"",
+                    },
+                )
+            transaction_records: list[TransactionRecord] = result["transaction_records"]
 
-        await self.wallet_client.push_transactions(
-            PushTransactions(transactions=transaction_records, sign=False), DEFAULT_TX_CONFIG
-        )
+            await self.wallet_client.push_transactions(
+                PushTransactions(transactions=transaction_records, sign=False), DEFAULT_TX_CONFIG
+            )
+            lease.track(transaction_records)
 
         return result
 
@@ -642,6 +861,29 @@ class ClimateWallet(ClimateWalletBase):
 @dataclasses.dataclass
 class ClimateObserverWallet(ClimateWalletBase):
     full_node_client: FullNodeRpcClient
+    # maximum number of `get_puzzle_and_solution` calls in flight at a time
+    max_concurrency: int = dataclasses.field(default=16, kw_only=True)
+
+    async def get_coin_spend(self, coin_record: CoinRecord) -> CoinSpend:
+        coin_spend: Optional[CoinSpend] = await self.full_node_client.get_puzzle_and_solution(
+            coin_id=coin_record.coin.name(),
+            height=coin_record.spent_block_index,
+        )
+
+        if coin_spend is None:
+            raise ValueError("No coin spend found!")
+
+        return coin_spend
+
+    async def get_coin_spends(self, coin_records: list[CoinRecord]) -> list[CoinSpend]:
+        semaphore = asyncio.Semaphore(max(1, self.max_concurrency))
+
+        async def get_coin_spend(coin_record: CoinRecord) -> CoinSpend:
+            async with semaphore:
+                return await self.get_coin_spend(coin_record)
+
+        # `gather` returns results in the order of `coin_records`
+        return list(await asyncio.gather(*(get_coin_spend(coin_record) for coin_record in coin_records)))
 
     async def get_activities(
         self,
@@ -649,72 +891,53 @@ class ClimateObserverWallet(ClimateWalletBase):
         start_height: Optional[int] = None,
         end_height: Optional[int] = None,
     ) -> list[dict[str, Any]]:
-        modes: list[GatewayMode]
-        if mode is None:
-            modes = list(GatewayMode)
-        else:
-            modes = [mode]
-
-        gateway_puzzle: Program = create_gateway_puzzle()
-        gateway_cat_puzzle: Program = construct_cat_puzzle(
-            mod_code=CAT_MOD,
-            limitations_program_hash=self.tail_program_hash,
-            inner_puzzle_or_hash=gateway_puzzle,
-        )
-        gateway_cat_puzzle_hash: bytes32 = gateway_cat_puzzle.get_tree_hash()
-
         coin_records: list[CoinRecord] = await self.full_node_client.get_coin_records_by_puzzle_hash(
-            puzzle_hash=gateway_cat_puzzle_hash,
+            puzzle_hash=self.gateway_cat_puzzle_hash,
             start_height=start_height,
             end_height=end_height,
         )
 
-        activities = []
-        for coin_record in coin_records:
-            coin: Coin = coin_record.coin
-            height = coin_record.spent_block_index
-
-            coin_spend = await self.full_node_client.get_puzzle_and_solution(
-                coin_id=coin.name(),
-                height=height,
-            )
-
-            if coin_spend is None:
-                raise ValueError("No coin spend found!")
-            (mode, tail_spend) = parse_gateway_spend(coin_spend=coin_spend, is_cat=True)
+        return await self.get_activities_from_coin_records(coin_records=coin_records, mode=mode)
 
-            if mode not in modes:
-                continue
+    async def get_activities_from_coin_records(
+        self,
+        coin_records: list[CoinRecord],
+        mode: Optional[GatewayMode] = None,
+    ) -> list[dict[str, Any]]:
+        """Parse activities out of gateway coin records of this token that were fetched elsewhere."""
+        modes: list[GatewayMode]
+        if mode is None:
+            modes = list(GatewayMode)
+        else:
+            modes = [mode]
 
-            tail_solution: Program = tail_spend.solution.to_program()
-            delegated_solution: Program = tail_solution.at("r")
-            key_value_pairs: Program = delegated_solution.at("f")
+        # fetch every spend first, so the scan is bound by RPC throughput rather than latency
+        coin_spends: list[CoinSpend] = await self.get_coin_spends(coin_records)
 
-            metadata: dict[str, str] = {}
-            for key_value_pair in key_value_pairs.as_iter():
-                if (not key_value_pair.listp()) or (key_value_pair.at("r").listp()):
-                    logger.warning(f"Coin {coin.name()} has incorrect metadata structure")
-                    continue
+        activities = []
+        for coin_record, coin_spend in zip(coin_records, coin_spends):
+            activity = self.parse_activity(coin_record=coin_record, coin_spend=coin_spend, modes=modes)
+            if activity is not None:
+                activities.append(activity)
 
-                key_bytes = key_value_pair.at("f").as_atom()
-                value_bytes = key_value_pair.at("r").as_atom()
+        return activities
 
-                key = key_bytes.decode()
-                if key in {"bp"}:
-                    value = f"0x{value_bytes.hex()}"
-                elif key in {"ba", "bn"}:
-                    value = value_bytes.decode()
-                else:
-                    raise ValueError(f"Unknown key '{key}'!")
+    def parse_activity(
+        self,
+        coin_record: CoinRecord,
+        coin_spend: CoinSpend,
+        modes: Optional[list[GatewayMode]] = None,
+    ) -> Optional[dict[str, Any]]:
+        (mode, tail_spend) = extract_gateway_spend(coin_spend=coin_spend, is_cat=True)
 
-                metadata[key] = value
+        if modes is not None and mode not in modes:
+            return None
 
-            activity = {
-                "coin_record": coin_record,
-                "coin_spend": coin_spend,
-                "mode": mode,
-                "metadata": metadata,
-            }
-            activities.append(activity)
+        metadata = parse_gateway_metadata(tail_spend=tail_spend)
 
-        return activities
+        return {
+            "coin_record": coin_record,
+            "coin_spend": coin_spend,
+            "mode": mode,
+            "metadata": metadata,
+        }
@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+import functools
 import logging
 from typing import Any, Optional
 
@@ -15,7 +16,7 @@ from chia.wallet.cat_wallet.cat_info import CATInfo
 from chia.wallet.derive_keys import master_sk_to_wallet_sk_unhardened
 from chia.wallet.puzzles.p2_delegated_puzzle_or_hidden_puzzle import puzzle_for_pk
 from chia.wallet.transaction_record import TransactionRecord
-from chia.wallet.util.tx_config import DEFAULT_TX_CONFIG
+from chia.wallet.util.tx_config import DEFAULT_TX_CONFIG, TXConfig
 from chia.wallet.util.wallet_types import WalletType
 from chia.wallet.wallet_info import WalletInfo
 from chia_rs import G1Element, PrivateKey
@@ -32,6 +33,13 @@ async def get_constants(
     result = await wallet_client.fetch("get_network_info", {})
     network_name: str = result["network_name"]
 
+    return get_network_constants(network_name)
+
+
+@functools.lru_cache(maxsize=8)
+def get_network_constants(network_name: str) -> ConsensusConstants:
+    """Consensus constants of a network, loaded from `config.yaml` once per network."""
+
     config = load_config(
         root_path=DEFAULT_ROOT_PATH,
         filename="config.yaml",
@@ -114,13 +122,14 @@ async def get_created_signed_transactions(
     transaction_request: TransactionRequest,
     wallet_id: int,
     wallet_client: WalletRpcClient,
+    tx_config: TXConfig = DEFAULT_TX_CONFIG,
 ) -> list[TransactionRecord]:
     response = await wallet_client.create_signed_transactions(
         coins=transaction_request.coins,
         additions=transaction_request.additions,
         fee=uint64(transaction_request.fee),
         wallet_id=wallet_id,
-        tx_config=DEFAULT_TX_CONFIG,
+        tx_config=tx_config,
         extra_conditions=(*transaction_request.coin_announcements, *transaction_request.puzzle_announcements),
     )
 
@@ -0,0 +1,104 @@
+from __future__ import annotations
+
+import asyncio
+import dataclasses
+import logging
+from typing import Any, Optional
+
+import httpx
+
+from app.config import settings
+
+logger = logging.getLogger("ClimateToken")
+
+RETRY_STATUS_CODES = {429, 502, 503, 504}
+
+
+@dataclasses.dataclass
+class CadtClient:
+    """Keep-alive HTTP client shared by every CADT call in the process.
+
+    The underlying `httpx.AsyncClient` is created lazily and bound to the event loop
+    it was created on; it is recreated if it is used from a different loop.
+    """
+
+    timeout: float
+    connect_timeout: float
+    max_retries: int
+    retry_backoff: float
+    max_connections: int
+
+    _client: Optional[httpx.AsyncClient] = dataclasses.field(default=None, init=False, repr=False)
+    _loop: Optional[asyncio.AbstractEventLoop] = dataclasses.field(default=None, init=False, repr=False)
+
+    @classmethod
+    def from_settings(cls) -> CadtClient:
+        return cls(
+            timeout=settings.CADT_TIMEOUT,
+            connect_timeout=settings.CADT_CONNECT_TIMEOUT,
+            max_retries=settings.CADT_MAX_RETRIES,
+            retry_backoff=settings.CADT_RETRY_BACKOFF,
+            max_connections=settings.CADT_MAX_CONNECTIONS,
+        )
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        loop = asyncio.get_running_loop()
+        if self._client is None or self._client.is_closed or self._loop is not loop:
+            self._client = httpx.AsyncClient(
+                timeout=httpx.Timeout(self.timeout, connect=self.connect_timeout),
+                limits=httpx.Limits(
+                    max_connections=self.max_connections,
+                    max_keepalive_connections=self.max_connections,
+                ),
+            )
+            self._loop = loop
+
+        return self._client
+
+    async def get(
+        self,
+        url: str,
+        params: Optional[dict[str, Any]] = None,
+        headers: Optional[dict[str, str]] = None,
+    ) -> httpx.Response:
+        attempt = 0
+        while True:
+            try:
+                response = await self.client.get(url, params=params, headers=headers)
+                if response.status_code not in RETRY_STATUS_CODES or attempt >= self.max_retries:
+                    return response
+
+                logger.warning(f"Request Url: {response.url} returned {response.status_code}, retrying")
+
+            except httpx.TransportError as e:
+                if attempt >= self.max_retries:
+                    raise
+
+                logger.warning(f"Request Url: {url} failed with {e!r}, retrying")
+
+            await asyncio.sleep(self.retry_backoff * (2**attempt))
+            attempt += 1
+
+    async def close(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+            self._loop = None
+
+
+_cadt_client: Optional[CadtClient] = None
+
+
+def get_cadt_client() -> CadtClient:
+    global _cadt_client
+
+    if _cadt_client is None:
+        _cadt_client = CadtClient.from_settings()
+
+    return _cadt_client
+
+
+async def close_cadt_client() -> None:
+    if _cadt_client is not None:
+        await _cadt_client.close()
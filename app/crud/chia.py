@@ -1,32 +1,147 @@
 from __future__ import annotations
 
+import asyncio
 import dataclasses
 import json
 import logging
+from collections.abc import Iterable
 from typing import Any, Optional
 from urllib.parse import urlencode, urlparse
 
-import requests
+import httpx
 from chia.rpc.full_node_rpc_client import FullNodeRpcClient
 from chia.types.blockchain_format.coin import Coin
+from chia.types.blockchain_format.sized_bytes import bytes32
 from chia.types.coin_record import CoinRecord
 from chia_rs import G1Element
 from fastapi.encoders import jsonable_encoder
 
 from app import schemas
+from app.cache import TTLCache
 from app.config import settings
-from app.core.climate_wallet.wallet import ClimateObserverWallet
+from app.core.climate_wallet.coin_reservations import coin_reservations
+from app.core.climate_wallet.wallet import ClimateObserverWallet, get_climate_token_puzzles, registry_keys_cache
 from app.core.types import ClimateTokenIndex, GatewayMode
+from app.crud.cadt_client import CadtClient, get_cadt_client
 from app.errors import ErrorCode
+from app.metrics import metrics
 
 error_code = ErrorCode()
 logger = logging.getLogger("ClimateToken")
 
+units_cache: TTLCache[str, Any] = TTLCache(
+    name="cadt_units",
+    ttl=settings.CADT_CACHE_UNITS_TTL,
+    max_size=settings.CADT_CACHE_MAX_SIZE,
+)
+projects_cache: TTLCache[str, Any] = TTLCache(
+    name="cadt_projects",
+    ttl=settings.CADT_CACHE_PROJECTS_TTL,
+    max_size=settings.CADT_CACHE_MAX_SIZE,
+)
+organizations_cache: TTLCache[str, Any] = TTLCache(
+    name="cadt_organizations",
+    ttl=settings.CADT_CACHE_ORGANIZATIONS_TTL,
+    max_size=settings.CADT_CACHE_MAX_SIZE,
+)
+organizations_metadata_cache: TTLCache[str, Any] = TTLCache(
+    name="cadt_organizations_metadata",
+    ttl=settings.CADT_CACHE_METADATA_TTL,
+    max_size=settings.CADT_CACHE_MAX_SIZE,
+)
+cadt_caches: list[TTLCache[str, Any]] = [
+    units_cache,
+    projects_cache,
+    organizations_cache,
+    organizations_metadata_cache,
+]
+metrics.register("cadt_caches", lambda: {cache.name: cache.stats() for cache in cadt_caches})
+
+
+def climate_token_puzzles_stats() -> dict[str, Any]:
+    cache_info = get_climate_token_puzzles.cache_info()
+    lookups = cache_info.hits + cache_info.misses
+
+    return {
+        "size": cache_info.currsize,
+        "max_size": cache_info.maxsize,
+        "hits": cache_info.hits,
+        "misses": cache_info.misses,
+        "hit_rate": cache_info.hits / lookups if lookups > 0 else None,
+    }
+
+
+metrics.register("climate_token_puzzles_cache", climate_token_puzzles_stats)
+metrics.register("registry_keys_cache", registry_keys_cache.stats)
+metrics.register("coin_reservations", coin_reservations.stats)
+
+
+def combine_units_and_metadata(
+    units: list[dict[str, Any]],
+    projects: list[dict[str, Any]],
+    organization_by_id: dict[str, dict[str, Any]],
+    metadata_by_id: dict[str, dict[Any, Any]],
+) -> list[dict[str, Any]]:
+    """Annotate on-chain units with their organization, project and token metadata.
+
+    Shared by the live CADT calls and the local CADT mirror so both return the same shape.
+    """
+    project_by_id = {project["warehouseProjectId"]: project for project in projects}
+
+    onchain_units = []
+    for unit in units:
+        # units may be shared with the cache, annotate a copy
+        unit = unit.copy()
+        marketplace_id = unit["marketplaceIdentifier"]
+
+        if not marketplace_id:
+            continue
+
+        unit_org_uid = unit.get("orgUid")
+        if unit_org_uid is None:
+            logger.warning(f"Can not get climate warehouse orgUid in unit. unit:{unit}")
+            continue
+
+        org = organization_by_id.get(unit_org_uid)
+        if org is None:
+            logger.warning(f"Can not get organization by org_uid. org_uid:{unit_org_uid}")
+            continue
+
+        try:
+            warehouse_project_id = unit["issuance"]["warehouseProjectId"]
+            project = project_by_id[warehouse_project_id]
+        except (KeyError, TypeError):
+            logger.warning("Can not get project by warehouse_project_id")
+            continue
+
+        org_metadata = metadata_by_id.get(unit_org_uid)
+        if org_metadata is None:
+            continue
+
+        metadata = dict()
+        # some versions perpended "meta_" to the key, so check both ways
+        if marketplace_id in org_metadata:
+            metadata = json.loads(org_metadata.get(marketplace_id, "{}"))
+        elif f"meta_{marketplace_id}" in org_metadata:
+            metadata = json.loads(org_metadata.get(f"meta_{marketplace_id}", "{}"))
+
+        unit["organization"] = org
+        unit["token"] = metadata
+        unit["project"] = project
+
+        onchain_units.append(unit)
+
+    return onchain_units
+
 
 @dataclasses.dataclass
 class ClimateWareHouseCrud:
     url: str
     api_key: Optional[str]
+    client: CadtClient = dataclasses.field(default_factory=get_cadt_client)
+
+    def _cache_key(self, path: str, params: Optional[dict[str, Any]] = None) -> str:
+        return f"{self.url}{path}?{json.dumps(params or {}, sort_keys=True)}"
 
     def _headers(self) -> dict[str, str]:
         headers = {}
@@ -36,10 +151,33 @@ class ClimateWareHouseCrud:
 
         return headers
 
-    def _get_paginated_data(self, path: str, search_params: dict[str, Any]) -> list[Any]:
+    async def _get(self, url: str) -> Any:
+        response = await self.client.get(url, headers=self._headers())
+        if response.status_code != httpx.codes.OK:
+            logger.error(f"Request Url: {response.url} Error Message: {response.text}")
+            raise error_code.internal_server_error(message="API Call Failure")
+
+        return response.json()
+
+    async def _get_page(self, path: str, search_params: dict[str, Any], page: int, limit: int) -> Any:
+        # Update search parameters with current page and limit
+        params = {**search_params, "page": page, "limit": limit}
+        encoded_params = urlencode(params)
+
+        # Construct the URL
+        url_obj = urlparse(f"{self.url}{path}?{encoded_params}")
+        url = url_obj.geturl()
+
+        return await self._get(url)
+
+    async def _get_paginated_data(self, path: str, search_params: dict[str, Any]) -> list[Any]:
         """
         Generic function to retrieve paginated data from a given path.
 
+        The first page is fetched on its own to learn `pageCount`, the remaining
+        pages are then fetched concurrently (at most `CADT_MAX_CONCURRENT_REQUESTS`
+        at a time) and concatenated in page order.
+
         Args:
             path: API endpoint path.
             search_params: A dictionary of search parameters including pagination.
@@ -48,55 +186,58 @@ class ClimateWareHouseCrud:
             A list of all data retrieved from the paginated API.
         """
         all_data: list[dict[str, Any]] = []
-        page = 1
-        limit = 10
+        limit = settings.CADT_PAGE_SIZE
 
         try:
-            while True:
-                # Update search parameters with current page and limit
-                params = {**search_params, "page": page, "limit": limit}
-                encoded_params = urlencode(params)
-
-                # Construct the URL
-                url_obj = urlparse(f"{self.url}{path}?{encoded_params}")
-                url = url_obj.geturl()
-
-                response = requests.get(url, headers=self._headers())
-                if response.status_code != requests.codes.ok:
-                    logger.error(f"Request Url: {response.url} Error Message: {response.text}")
-                    raise error_code.internal_server_error(message="API Call Failure")
-
-                data = response.json()
-                if data is None:
-                    # some cadt endpoints return null with no pagination info if no data is found
-                    # to prevent an infinite loop need to assume that there is no data matching
-                    # the search from this iteration on
-                    return all_data
+            data = await self._get_page(path, search_params, page=1, limit=limit)
+            if data is None:
+                # some cadt endpoints return null with no pagination info if no data is found
+                # to prevent an infinite loop need to assume that there is no data matching
+                # the search from this iteration on
+                return all_data
 
-                try:
-                    if (
-                        data["page"] and (data["pageCount"] >= 0) and len(data["data"]) >= 0
-                    ):  # page count can be 0 (as of when this was written)
-                        all_data.extend(data["data"])  # Add data from the current page
-                    else:
-                        all_data.append(data)  # data was not paginated, append and return
-                        return all_data
-                except Exception:
+            try:
+                if (
+                    data["page"] and (data["pageCount"] >= 0) and len(data["data"]) >= 0
+                ):  # page count can be 0 (as of when this was written)
+                    all_data.extend(data["data"])  # Add data from the current page
+                else:
                     all_data.append(data)  # data was not paginated, append and return
                     return all_data
+            except Exception:
+                all_data.append(data)  # data was not paginated, append and return
+                return all_data
+
+            page_count: int = data["pageCount"]
+            if page_count <= 1:
+                return all_data
+
+            semaphore = asyncio.Semaphore(max(1, settings.CADT_MAX_CONCURRENT_REQUESTS))
+
+            async def get_page(page: int) -> Any:
+                async with semaphore:
+                    return await self._get_page(path, search_params, page=page, limit=limit)
 
-                if page >= data["pageCount"]:
-                    break  # Exit loop if all pages have been processed
+            # `gather` returns results in page order, regardless of completion order
+            pages_data = await asyncio.gather(*(get_page(page) for page in range(2, page_count + 1)))
+            for page_data in pages_data:
+                if page_data is None:
+                    # same as above, no data from this page on
+                    break
 
-                page += 1
+                all_data.extend(page_data["data"])
 
             return all_data
 
-        except TimeoutError as e:
+        except httpx.TimeoutException as e:
             logger.error("API Call Timeout, ErrorMessage: " + str(e))
             raise error_code.internal_server_error("API Call Timeout")
 
-    def get_climate_units(self, search: dict[str, Any]) -> Any:
+        except httpx.HTTPError as e:
+            logger.error("API Call Failure, ErrorMessage: " + str(e))
+            raise error_code.internal_server_error("API Call Failure")
+
+    async def get_climate_units(self, search: dict[str, Any]) -> Any:
         """
         Retrieves all climate units using pagination and given search parameters.
 
@@ -107,9 +248,12 @@ class ClimateWareHouseCrud:
             A JSON object containing all the climate units.
         """
         search_with_marketplace = {**search, "hasMarketplaceIdentifier": True}
-        return self._get_paginated_data("/v1/units", search_with_marketplace)
+        return await units_cache.get_or_load(
+            self._cache_key("/v1/units", search_with_marketplace),
+            lambda: self._get_paginated_data("/v1/units", search_with_marketplace),
+        )
 
-    def get_climate_projects(self) -> Any:
+    async def get_climate_projects(self) -> Any:
         """
         Retrieves all climate projects using pagination.
 
@@ -117,106 +261,104 @@ class ClimateWareHouseCrud:
             A JSON object containing all the climate projects.
         """
         search_params = {"onlyMarketplaceProjects": True}
-        return self._get_paginated_data("/v1/projects", search_params)
+        return await projects_cache.get_or_load(
+            self._cache_key("/v1/projects", search_params),
+            lambda: self._get_paginated_data("/v1/projects", search_params),
+        )
 
-    def get_climate_organizations(self) -> Any:
+    async def get_climate_organizations(self) -> Any:
+        return await organizations_cache.get_or_load(
+            self._cache_key("/v1/organizations"),
+            self._get_climate_organizations,
+        )
+
+    async def _get_climate_organizations(self) -> Any:
         try:
             url = urlparse(self.url + "/v1/organizations")
 
-            r = requests.get(url.geturl(), headers=self._headers())
-            if r.status_code != requests.codes.ok:
-                logger.error(f"Request Url: {r.url} Error Message: {r.text}")
-                raise error_code.internal_server_error(message="Call Climate API Failure")
-
-            return r.json()
+            return await self._get(url.geturl())
 
-        except TimeoutError as e:
+        except httpx.TimeoutException as e:
             logger.error("Call Climate API Timeout, ErrorMessage: " + str(e))
             raise error_code.internal_server_error("Call Climate API Timeout")
 
-    def get_climate_organizations_metadata(self, org_uid: str) -> Any:
+        except httpx.HTTPError as e:
+            logger.error("Call Climate API Failure, ErrorMessage: " + str(e))
+            raise error_code.internal_server_error("Call Climate API Failure")
+
+    async def get_climate_organizations_metadata(self, org_uid: str) -> Any:
+        return await organizations_metadata_cache.get_or_load(
+            self._cache_key("/v1/organizations/metadata", {"orgUid": org_uid}),
+            lambda: self._get_climate_organizations_metadata(org_uid),
+        )
+
+    async def _get_climate_organizations_metadata(self, org_uid: str) -> Any:
         try:
             condition = {"orgUid": org_uid}
 
             params = urlencode(condition)
-            url = urlparse(self.url + "/v1/organizations/metadata")
-
-            r = requests.get(url.geturl(), params=params, headers=self._headers())
-            if r.status_code != requests.codes.ok:
-                logger.error(f"Request Url: {r.url} Error Message: {r.text}")
-                raise error_code.internal_server_error(message="Call Climate API Failure")
+            url = urlparse(f"{self.url}/v1/organizations/metadata?{params}")
 
-            return r.json()
+            return await self._get(url.geturl())
 
-        except TimeoutError as e:
+        except httpx.TimeoutException as e:
             logger.error("Call Climate API Timeout, ErrorMessage: " + str(e))
             raise error_code.internal_server_error("Call Climate API Timeout")
 
-    def combine_climate_units_and_metadata(self, search: dict[str, Any]) -> list[dict[str, Any]]:
+        except httpx.HTTPError as e:
+            logger.error("Call Climate API Failure, ErrorMessage: " + str(e))
+            raise error_code.internal_server_error("Call Climate API Failure")
+
+    async def get_climate_organizations_metadata_bulk(self, org_uids: Iterable[str]) -> dict[str, Any]:
+        """
+        Retrieves the metadata of many organizations concurrently.
+
+        At most `CADT_MAX_CONCURRENT_REQUESTS` requests are in flight at a time. Organizations
+        whose metadata cannot be retrieved are logged and left out of the result.
+
+        Args:
+            org_uids: The organization ids to retrieve metadata for.
+
+        Returns:
+            A dictionary of organization id to organization metadata.
+        """
+        semaphore = asyncio.Semaphore(max(1, settings.CADT_MAX_CONCURRENT_REQUESTS))
+
+        async def get_metadata(org_uid: str) -> Any:
+            async with semaphore:
+                try:
+                    return await self.get_climate_organizations_metadata(org_uid)
+                except Exception as e:
+                    logger.warning(f"Can not get metadata of organization. org_uid:{org_uid} error:{e!r}")
+                    return None
+
+        org_uids = list(org_uids)
+        results = await asyncio.gather(*(get_metadata(org_uid) for org_uid in org_uids))
+
+        return {org_uid: metadata for (org_uid, metadata) in zip(org_uids, results) if metadata is not None}
+
+    async def combine_climate_units_and_metadata(self, search: dict[str, Any]) -> list[dict[str, Any]]:
         # units: [unit]
-        units = self.get_climate_units(search)
+        units = await self.get_climate_units(search)
         if len(units) == 0:
             logger.warning(f"Search climate warehouse units by search is empty. search:{search}")
             return []
 
-        projects = self.get_climate_projects()
+        projects = await self.get_climate_projects()
         if len(projects) == 0:
             return []
 
         # organization_by_id: {org_uid -> org}
-        organization_by_id = self.get_climate_organizations()
+        organization_by_id = await self.get_climate_organizations()
         if len(organization_by_id) == 0:
             return []
 
         # metadata_by_id: {org_uid -> {meta_key -> meta_value}}
-        metadata_by_id: dict[str, dict[Any, Any]] = {}
-        for org_uid in organization_by_id.keys():
-            metadata_by_id[org_uid] = self.get_climate_organizations_metadata(org_uid)
-
-        project_by_id = {project["warehouseProjectId"]: project for project in projects}
-
-        onchain_units = []
-        for unit in units:
-            marketplace_id = unit["marketplaceIdentifier"]
-
-            if not marketplace_id:
-                continue
-
-            unit_org_uid = unit.get("orgUid")
-            if unit_org_uid is None:
-                logger.warning(f"Can not get climate warehouse orgUid in unit. unit:{unit}")
-                continue
-
-            org = organization_by_id.get(unit_org_uid)
-            if org is None:
-                logger.warning(f"Can not get organization by org_uid. org_uid:{unit_org_uid}")
-                continue
-
-            try:
-                warehouse_project_id = unit["issuance"]["warehouseProjectId"]
-                project = project_by_id[warehouse_project_id]
-            except (KeyError, TypeError):
-                logger.warning("Can not get project by warehouse_project_id")
-                continue
-
-            org_metadata = metadata_by_id.get(unit_org_uid)
-            if org_metadata is None:
-                continue
-
-            metadata = dict()
-            # some versions perpended "meta_" to the key, so check both ways
-            if marketplace_id in org_metadata:
-                metadata = json.loads(org_metadata.get(marketplace_id, "{}"))
-            elif f"meta_{marketplace_id}" in org_metadata:
-                metadata = json.loads(org_metadata.get(f"meta_{marketplace_id}", "{}"))
-
-            unit["organization"] = org
-            unit["token"] = metadata
-            unit["project"] = project
-
-            onchain_units.append(unit)
+        metadata_by_id: dict[str, dict[Any, Any]] = await self.get_climate_organizations_metadata_bulk(
+            organization_by_id.keys()
+        )
 
-        return onchain_units
+        return combine_units_and_metadata(units, projects, organization_by_id, metadata_by_id)
 
 
 @dataclasses.dataclass
@@ -227,6 +369,57 @@ class BlockChainCrud:
         result = await self.full_node_client.fetch("get_network_info", {})
         return str(result["network_name"])
 
+    def get_observer_wallet(
+        self,
+        org_uid: str,
+        warehouse_project_id: str,
+        vintage_year: int,
+        sequence_num: int,
+        public_key: G1Element,
+    ) -> ClimateObserverWallet:
+        token_index = ClimateTokenIndex(
+            org_uid=org_uid,
+            warehouse_project_id=warehouse_project_id,
+            vintage_year=vintage_year,
+            sequence_num=sequence_num,
+        )
+        return ClimateObserverWallet(
+            token_index=token_index,
+            root_public_key=public_key,
+            full_node_client=self.full_node_client,
+            max_concurrency=settings.FULL_NODE_MAX_CONCURRENT_REQUESTS,
+        )
+
+    async def get_gateway_coin_records(
+        self,
+        wallets: Iterable[ClimateObserverWallet],
+        start_height: int,
+        end_height: int,
+    ) -> dict[bytes32, list[CoinRecord]]:
+        """
+        Retrieves the gateway coin records of many tokens with a single full node call.
+
+        Returns:
+            The coin records grouped by gateway CAT puzzle hash. Tokens without activity in
+            the height range are left out.
+        """
+        puzzle_hashes = list({wallet.gateway_cat_puzzle_hash for wallet in wallets})
+        if len(puzzle_hashes) == 0:
+            return {}
+
+        coin_records: list[CoinRecord] = await self.full_node_client.get_coin_records_by_puzzle_hashes(
+            puzzle_hashes=puzzle_hashes,
+            include_spent_coins=True,
+            start_height=start_height,
+            end_height=end_height,
+        )
+
+        coin_records_by_puzzle_hash: dict[bytes32, list[CoinRecord]] = {}
+        for coin_record in coin_records:
+            coin_records_by_puzzle_hash.setdefault(coin_record.coin.puzzle_hash, []).append(coin_record)
+
+        return coin_records_by_puzzle_hash
+
     async def get_activities(
         self,
         org_uid: str,
@@ -239,16 +432,12 @@ class BlockChainCrud:
         peak_height: int,
         mode: Optional[GatewayMode] = None,
     ) -> list[schemas.Activity]:
-        token_index = ClimateTokenIndex(
+        wallet = self.get_observer_wallet(
             org_uid=org_uid,
             warehouse_project_id=warehouse_project_id,
             vintage_year=vintage_year,
             sequence_num=sequence_num,
-        )
-        wallet = ClimateObserverWallet(
-            token_index=token_index,
-            root_public_key=public_key,
-            full_node_client=self.full_node_client,
+            public_key=public_key,
         )
         activity_objs = await wallet.get_activities(
             mode=mode,
@@ -256,34 +445,63 @@ class BlockChainCrud:
             end_height=end_height,
         )
 
+        return self._to_activities(wallet=wallet, activity_objs=activity_objs, peak_height=peak_height)
+
+    async def get_activities_from_coin_records(
+        self,
+        wallet: ClimateObserverWallet,
+        coin_records: list[CoinRecord],
+        peak_height: int,
+        mode: Optional[GatewayMode] = None,
+    ) -> list[schemas.Activity]:
+        activity_objs = await wallet.get_activities_from_coin_records(coin_records=coin_records, mode=mode)
+
+        return self._to_activities(wallet=wallet, activity_objs=activity_objs, peak_height=peak_height)
+
+    def _to_activities(
+        self,
+        wallet: ClimateObserverWallet,
+        activity_objs: list[dict[str, Any]],
+        peak_height: int,
+    ) -> list[schemas.Activity]:
         activities: list[schemas.Activity] = []
         for obj in activity_objs:
-            coin_record: CoinRecord = obj["coin_record"]
-            metadata = jsonable_encoder(obj["metadata"])
-            coin: Coin = coin_record.coin
-            obj_mode = obj["mode"]
-
-            if peak_height - coin_record.spent_block_index + 1 < settings.MIN_DEPTH:
-                continue
-
-            activity = schemas.Activity(
-                org_uid=token_index.org_uid,
-                warehouse_project_id=token_index.warehouse_project_id,
-                vintage_year=token_index.vintage_year,
-                sequence_num=token_index.sequence_num,
-                asset_id=bytes(wallet.tail_program_hash),
-                beneficiary_address=metadata.get("ba"),
-                beneficiary_name=metadata.get("bn"),
-                beneficiary_puzzle_hash=metadata.get("bp"),
-                coin_id=coin_record.name,
-                height=coin_record.spent_block_index,
-                amount=coin.amount,
-                mode=obj_mode,
-                metadata=metadata,
-                timestamp=coin_record.timestamp,
-            )
-            activities.append(activity)
-
-            logger.info(f"Found activity {jsonable_encoder(activity)}")
+            activity = self.to_activity(wallet=wallet, activity_obj=obj, peak_height=peak_height)
+            if activity is not None:
+                activities.append(activity)
 
         return activities
+
+    def to_activity(
+        self,
+        wallet: ClimateObserverWallet,
+        activity_obj: dict[str, Any],
+        peak_height: int,
+    ) -> Optional[schemas.Activity]:
+        coin_record: CoinRecord = activity_obj["coin_record"]
+        metadata = jsonable_encoder(activity_obj["metadata"])
+        coin: Coin = coin_record.coin
+
+        if peak_height - coin_record.spent_block_index + 1 < settings.MIN_DEPTH:
+            return None
+
+        token_index = wallet.token_index
+        activity = schemas.Activity(
+            org_uid=token_index.org_uid,
+            warehouse_project_id=token_index.warehouse_project_id,
+            vintage_year=token_index.vintage_year,
+            sequence_num=token_index.sequence_num,
+            asset_id=bytes(wallet.tail_program_hash),
+            beneficiary_address=metadata.get("ba"),
+            beneficiary_name=metadata.get("bn"),
+            beneficiary_puzzle_hash=metadata.get("bp"),
+            coin_id=coin_record.name,
+            height=coin_record.spent_block_index,
+            amount=coin.amount,
+            mode=activity_obj["mode"],
+            metadata=metadata,
+            timestamp=coin_record.timestamp,
+        )
+
+        logger.info(f"Found activity {jsonable_encoder(activity)}")
+        return activity
@@ -1,14 +1,20 @@
 from __future__ import annotations
 
 import dataclasses
+import datetime
+import hashlib
+import json
 import logging
+from collections.abc import Iterable
 from typing import Any, AnyStr, Optional
 
 from fastapi.encoders import jsonable_encoder
-from sqlalchemy import and_, desc, insert, or_, update
-from sqlalchemy.orm import Session
+from sqlalchemy import and_, case, delete, desc, func, insert, inspect, or_, select, tuple_, update
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from app import models, schemas
+from app.core.types import GatewayMode
+from app.crud.chia import combine_units_and_metadata
 from app.db.base import Base
 from app.errors import ErrorCode
 
@@ -16,70 +22,256 @@ logger = logging.getLogger("ClimateToken")
 
 errorcode = ErrorCode()
 
+CADT_MIRROR_RESOURCES = ("units", "projects", "organizations", "organizations_metadata")
+
+# unit fields matched by the `search` filter of the CADT mirror, as searched by CADT
+CADT_UNIT_SEARCH_FIELDS = (
+    "warehouseUnitId",
+    "issuanceId",
+    "projectLocationId",
+    "orgUid",
+    "unitOwner",
+    "countryJurisdictionOfOwner",
+    "inCountryJurisdictionOfOwner",
+    "serialNumberBlock",
+    "unitBlockStart",
+    "unitBlockEnd",
+    "unitCount",
+    "vintageYear",
+    "unitType",
+    "marketplace",
+    "marketplaceLink",
+    "marketplaceIdentifier",
+    "unitTags",
+    "unitStatus",
+    "unitStatusReason",
+    "unitRegistryLink",
+    "correspondingAdjustmentDeclaration",
+    "correspondingAdjustmentStatus",
+)
+
+# rows sent to SQLite per statement by the bulk writes
+BULK_WRITE_CHUNK_SIZE = 500
+
+# CADT resources that have been mirrored at least once, loaded at startup and kept
+# up to date by the sync task so requests do not need to query the sync state
+cadt_mirror_synced_resources: set[str] = set()
+
+
+def _cadt_row(data: Any, **columns: Any) -> dict[str, Any]:
+    data_hash = hashlib.sha256(json.dumps(data, sort_keys=True).encode()).hexdigest()
+    return {**columns, "data": data, "data_hash": data_hash}
+
+
+def _cadt_unit_search_text(unit: dict[str, Any], warehouse_project_id: Optional[str]) -> str:
+    # the decoded values rather than their JSON, so key names and escaped characters never match
+    values = [unit.get(field) for field in CADT_UNIT_SEARCH_FIELDS] + [warehouse_project_id]
+    return "\n".join(str(value).lower() for value in values if value is not None)
+
+
+def _like_contains(value: str) -> str:
+    escaped = value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return f"%{escaped}%"
+
+
+def _activity_row(activity: schemas.Activity) -> dict[str, Any]:
+    # the columns `jsonable_encoder(activity)` would give, without encoding every field through pydantic
+    return {
+        "org_uid": activity.org_uid,
+        "warehouse_project_id": activity.warehouse_project_id,
+        "vintage_year": activity.vintage_year,
+        "sequence_num": activity.sequence_num,
+        "asset_id": "0x" + activity.asset_id.hex(),
+        "beneficiary_name": activity.beneficiary_name,
+        "beneficiary_address": activity.beneficiary_address,
+        "beneficiary_puzzle_hash": activity.beneficiary_puzzle_hash,
+        "coin_id": "0x" + activity.coin_id.hex(),
+        "height": activity.height,
+        "amount": activity.amount,
+        "mode": activity.mode.name if isinstance(activity.mode, GatewayMode) else activity.mode,
+        "metadata": activity.metadata,
+        "timestamp": activity.timestamp,
+    }
+
+
+@dataclasses.dataclass(frozen=True)
+class BulkWriteResult:
+    inserted: int
+    # rows already stored, or repeated in the same write
+    ignored: int
+
 
 @dataclasses.dataclass
 class DBCrudBase:
-    db: Session
+    db: AsyncSession
 
-    def create_object(self, model: Base) -> Base:
+    async def create_object(self, model: Base) -> Base:
         self.db.add(model)
-        self.db.commit()
-        self.db.refresh(model)
+        await self.db.commit()
+        await self.db.refresh(model)
         return model
 
-    def batch_insert_ignore_db(self, table: AnyStr, models: list[Any]) -> bool:
+    async def batch_insert_ignore_db(self, table: AnyStr, models: list[Any]) -> bool:
         try:
             s = insert(Base.metadata.tables[table]).prefix_with("OR IGNORE").values(models)
-            self.db.execute(s)
-            self.db.commit()
+            await self.db.execute(s)
+            await self.db.commit()
             return True
         except Exception as e:
             logger.error(f"Batch Insert DB Failure:{e}")
             raise errorcode.internal_server_error(message="Batch Insert DB Failure")
 
-    def insert_db(self, models: Any) -> bool:
+    async def bulk_insert_ignore_db(
+        self,
+        table: Any,
+        rows: list[dict[str, Any]],
+        chunk_size: int = BULK_WRITE_CHUNK_SIZE,
+    ) -> BulkWriteResult:
+        """Insert `rows` into `table` in a single transaction, ignoring the rows already stored.
+
+        Rows are sent `chunk_size` at a time through `executemany`, so the statement stays the
+        same size, and within the limit of SQLite on bound variables, however many rows there are.
+        """
+        try:
+            statement = insert(table).prefix_with("OR IGNORE")
+
+            inserted = 0
+            for start in range(0, len(rows), chunk_size):
+                result = await self.db.execute(statement, rows[start : start + chunk_size])
+                inserted += result.rowcount
+            await self.db.commit()
+
+            return BulkWriteResult(inserted=inserted, ignored=len(rows) - inserted)
+        except Exception as e:
+            await self.db.rollback()
+            logger.error(f"Bulk Insert DB Failure:{e}")
+            raise errorcode.internal_server_error(message="Bulk Insert DB Failure")
+
+    async def insert_db(self, models: Any) -> bool:
         try:
             self.db.add(models)
-            self.db.commit()
-            self.db.refresh(models)
+            await self.db.commit()
+            await self.db.refresh(models)
             return True
         except Exception as e:
             logger.error(f"Insert DB Failure:{e}")
             raise errorcode.internal_server_error(message="Insert DB Failure")
 
-    def update_db(self, table: Any, stmt: Any) -> bool:
+    async def update_db(self, table: Any, stmt: Any) -> bool:
         try:
             u = update(Base.metadata.tables[table]).values(stmt)
-            self.db.execute(u)
-            self.db.commit()
+            await self.db.execute(u)
+            await self.db.commit()
             return True
         except Exception as e:
             logger.error(f"Update DB Failure:{e}")
             raise errorcode.internal_server_error(message="Update DB Failure")
 
-    def select_first_db(self, model: Any, order_by: Any) -> Any:
+    async def select_first_db(self, model: Any, order_by: Any) -> Any:
         try:
-            return self.db.query(model).order_by(desc(order_by)).first()
+            return (await self.db.scalars(select(model).order_by(desc(order_by)).limit(1))).first()
         except Exception as e:
             logger.error(f"Select DB Failure:{e}")
             raise errorcode.internal_server_error(message="Select DB Failure")
 
-    def select_activity_with_pagination(
-        self, model: Any, filters: Any, order_by: Any, limit: Optional[int] = None, page: Optional[int] = None
-    ) -> tuple[Any, int]:
+    async def sync_db(self, model: Any, rows: list[dict[str, Any]], keep: Iterable[Any] = ()) -> int:
+        """Mirror `rows` into the table of `model`, writing only the rows whose `data_hash` changed.
+
+        Stored rows whose primary key is neither in `rows` nor in `keep` are deleted.
+        Returns the number of inserted, updated and deleted rows.
+        """
+        try:
+            (primary_key,) = inspect(model).primary_key
+            stored = dict((await self.db.execute(select(primary_key, model.data_hash))).all())
+
+            changed = [row for row in rows if stored.get(row[primary_key.name]) != row["data_hash"]]
+            retained = {row[primary_key.name] for row in rows}.union(keep)
+            removed = [key for key in stored if key not in retained]
+
+            if changed:
+                await self.db.execute(insert(model.__table__).prefix_with("OR REPLACE"), changed)
+            if removed:
+                await self.db.execute(delete(model.__table__).where(primary_key.in_(removed)))
+            await self.db.commit()
+
+            return len(changed) + len(removed)
+        except Exception as e:
+            logger.error(f"Sync DB Failure:{e}")
+            raise errorcode.internal_server_error(message="Sync DB Failure")
+
+    async def count_db(self, query: Any) -> int:
+        count: int = await self.db.scalar(select(func.count()).select_from(query.subquery()))
+        return count
+
+    async def select_activity_with_pagination(
+        self,
+        model: Any,
+        filters: Any,
+        order_by: Any,
+        limit: Optional[int] = None,
+        page: Optional[int] = None,
+        count: bool = True,
+    ) -> tuple[Any, Optional[int]]:
+        """Select the `page`-th page of `limit` rows, and the number of rows matching `filters`.
+
+        Without `count` the rows are not counted and the number is None. One row past the page is
+        selected instead, so the caller can tell whether a next page follows.
+        """
         try:
-            query = self.db.query(model).filter(or_(*filters["or"]), and_(*filters["and"]))
+            query = select(model).where(or_(*filters["or"]), and_(*filters["and"]))
 
+            query_page = query.order_by(*order_by)
             if limit is not None and page is not None:
-                return (
-                    (query.order_by(*order_by).limit(limit).offset((page - 1) * limit).all()),
-                    query.count(),
-                )
+                query_page = query_page.limit(limit if count else limit + 1).offset((page - 1) * limit)
+
+            return (
+                list((await self.db.scalars(query_page)).all()),
+                await self.count_db(query) if count else None,
+            )
+        except Exception as e:
+            logger.error(f"Select DB Failure:{e}")
+            raise errorcode.internal_server_error(message="Select DB Failure")
+
+    async def select_activity_with_cursor(
+        self,
+        model: Any,
+        filters: Any,
+        keys: list[Any],
+        descending: bool,
+        limit: int,
+        after: Optional[tuple[Any, ...]] = None,
+        before: Optional[tuple[Any, ...]] = None,
+        count: bool = True,
+    ) -> tuple[Any, bool, Optional[int]]:
+        """Select a page of at most `limit` rows ordered by the unique `keys`, from a position in that order.
+
+        Rows come after the key values `after`, or, when going back, before the key values `before`.
+        The page starts from the position with an index search on `keys` rather than by skipping
+        rows, so every page costs the same. Returns the rows, whether more rows follow in the
+        direction of the page, and the number of rows matching `filters` if `count` is set.
+        """
+        try:
+            query = select(model).where(or_(*filters["or"]), and_(*filters["and"]))
+
+            backward = before is not None
+            position = before if backward else after
+            if position is not None:
+                # going back through a descending order means looking at the greater keys
+                if descending != backward:
+                    query_page = query.where(tuple_(*keys) < tuple_(*position))
+                else:
+                    query_page = query.where(tuple_(*keys) > tuple_(*position))
             else:
-                return (
-                    (query.order_by(*order_by).all()),
-                    query.count(),
-                )
+                query_page = query
+
+            order_by = [key.desc() if descending != backward else key.asc() for key in keys]
+            rows = list((await self.db.scalars(query_page.order_by(*order_by).limit(limit + 1))).all())
+            has_more = len(rows) > limit
+            rows = rows[:limit]
+            if backward:
+                rows.reverse()
+
+            return (rows, has_more, await self.count_db(query) if count else None)
         except Exception as e:
             logger.error(f"Select DB Failure:{e}")
             raise errorcode.internal_server_error(message="Select DB Failure")
@@ -87,25 +279,48 @@ class DBCrudBase:
 
 @dataclasses.dataclass
 class DBCrud(DBCrudBase):
-    def create_activity(self, activity: schemas.Activity) -> models.Activity:
-        new_activity: models.Activity = self.create_object(models.Activity(**jsonable_encoder(activity)))
+    async def create_activity(self, activity: schemas.Activity) -> models.Activity:
+        new_activity: models.Activity = await self.create_object(models.Activity(**jsonable_encoder(activity)))
         return new_activity
 
-    def batch_insert_ignore_activity(
+    async def batch_insert_ignore_activity(
         self,
         activities: list[schemas.Activity],
-    ) -> bool:
-        db_activities = []
-        for activity in activities:
-            db_activity = models.Activity(**jsonable_encoder(activity))
-            db_activities.append(jsonable_encoder(db_activity))
-
-        return self.batch_insert_ignore_db(
-            table=models.Activity.__tablename__,
-            models=db_activities,
+    ) -> BulkWriteResult:
+        result = await self.bulk_insert_ignore_db(
+            table=models.Activity.__table__,
+            rows=[_activity_row(activity) for activity in activities],
         )
+        await self.index_activity_search()
+        return result
+
+    async def index_activity_search(self) -> int:
+        """Add the activities missing from the full-text index of beneficiaries.
+
+        Activities are only ever appended, so the missing ones are those past the last indexed
+        id; an activity left out by a failure is picked up by the next call.
+        Returns the number of indexed activities.
+        """
+        try:
+            activity_search = models.activity_search
+            last_id = select(func.coalesce(func.max(activity_search.c.rowid), 0)).scalar_subquery()
+            puzzle_hash = models.Activity.beneficiary_puzzle_hash
+            rows = select(
+                models.Activity.id,
+                models.Activity.beneficiary_name,
+                models.Activity.beneficiary_address,
+                # indexed without the hex prefix, so that a search by the start of a hash matches
+                case((puzzle_hash.like("0x%"), func.substr(puzzle_hash, 3)), else_=puzzle_hash),
+            ).where(models.Activity.id > last_id)
 
-    def update_block_state(
+            result = await self.db.execute(insert(activity_search).from_select(list(activity_search.c), rows))
+            await self.db.commit()
+            return int(result.rowcount)
+        except Exception as e:
+            logger.error(f"Index DB Failure:{e}")
+            raise errorcode.internal_server_error(message="Index DB Failure")
+
+    async def update_block_state(
         self,
         peak_height: Optional[int] = None,
         current_height: Optional[int] = None,
@@ -117,21 +332,167 @@ class DBCrud(DBCrudBase):
         if current_height is not None:
             state.current_height = current_height
 
-        return self.update_db(
+        return await self.update_db(
             table=models.State.__tablename__,
             stmt=jsonable_encoder(state),
         )
 
-    def select_block_state_first(self) -> models.State:
-        selected_state: models.State = self.select_first_db(
+    async def select_scan_cursors(self, asset_ids: list[str]) -> dict[str, models.ScanCursor]:
+        try:
+            cursors = await self.db.scalars(select(models.ScanCursor).where(models.ScanCursor.asset_id.in_(asset_ids)))
+            return {cursor.asset_id: cursor for cursor in cursors}
+        except Exception as e:
+            logger.error(f"Select DB Failure:{e}")
+            raise errorcode.internal_server_error(message="Select DB Failure")
+
+    async def update_scan_cursors(
+        self,
+        asset_ids: list[str],
+        last_scanned_height: int,
+        last_confirmed_height: int,
+    ) -> bool:
+        try:
+            rows = [
+                {
+                    "asset_id": asset_id,
+                    "last_scanned_height": last_scanned_height,
+                    "last_confirmed_height": last_confirmed_height,
+                }
+                for asset_id in asset_ids
+            ]
+            await self.db.execute(insert(models.ScanCursor.__table__).prefix_with("OR REPLACE"), rows)
+            await self.db.commit()
+            return True
+        except Exception as e:
+            logger.error(f"Update DB Failure:{e}")
+            raise errorcode.internal_server_error(message="Update DB Failure")
+
+    async def select_block_state_first(self) -> models.State:
+        selected_state: models.State = await self.select_first_db(
             model=models.State,
             order_by=models.State.id,
         )
         return selected_state
 
-    def select_activity_first(self) -> models.Activity:
-        selected_activity: models.Activity = self.select_first_db(
+    async def select_activity_first(self) -> models.Activity:
+        selected_activity: models.Activity = await self.select_first_db(
             model=models.Activity,
             order_by=models.Activity.created_at,
         )
         return selected_activity
+
+    async def sync_cadt_units(self, units: list[dict[str, Any]]) -> int:
+        rows = []
+        for unit in units:
+            warehouse_project_id = (unit.get("issuance") or {}).get("warehouseProjectId")
+            rows.append(
+                _cadt_row(
+                    unit,
+                    warehouse_unit_id=unit["warehouseUnitId"],
+                    org_uid=unit.get("orgUid"),
+                    marketplace_identifier=unit.get("marketplaceIdentifier"),
+                    warehouse_project_id=warehouse_project_id,
+                    search_text=_cadt_unit_search_text(unit, warehouse_project_id),
+                )
+            )
+        return await self.sync_db(model=models.CadtUnit, rows=rows)
+
+    async def sync_cadt_projects(self, projects: list[dict[str, Any]]) -> int:
+        rows = [
+            _cadt_row(
+                project,
+                warehouse_project_id=project["warehouseProjectId"],
+                org_uid=project.get("orgUid"),
+            )
+            for project in projects
+        ]
+        return await self.sync_db(model=models.CadtProject, rows=rows)
+
+    async def sync_cadt_organizations(self, organization_by_id: dict[str, dict[str, Any]]) -> int:
+        rows = [_cadt_row(org, org_uid=org_uid) for (org_uid, org) in organization_by_id.items()]
+        return await self.sync_db(model=models.CadtOrganization, rows=rows)
+
+    async def sync_cadt_organizations_metadata(
+        self,
+        metadata_by_id: dict[str, dict[str, Any]],
+        org_uids: Iterable[str],
+    ) -> int:
+        # metadata that failed to refresh is kept for as long as its organization exists
+        rows = [_cadt_row(metadata, org_uid=org_uid) for (org_uid, metadata) in metadata_by_id.items()]
+        return await self.sync_db(model=models.CadtOrganizationMetadata, rows=rows, keep=org_uids)
+
+    async def update_cadt_sync_state(self, resource: str, record_count: int, changed_count: int) -> bool:
+        try:
+            now = datetime.datetime.now(datetime.timezone.utc).replace(tzinfo=None)
+            state = await self.db.get(models.CadtSyncState, resource) or models.CadtSyncState(resource=resource)
+            state.record_count = record_count
+            state.changed_count = changed_count
+            state.last_synced_at = now
+            if changed_count > 0 or state.last_changed_at is None:
+                state.last_changed_at = now
+
+            self.db.add(state)
+            await self.db.commit()
+        except Exception as e:
+            logger.error(f"Update DB Failure:{e}")
+            raise errorcode.internal_server_error(message="Update DB Failure")
+
+        cadt_mirror_synced_resources.add(resource)
+        return True
+
+    async def select_cadt_sync_states(self) -> list[models.CadtSyncState]:
+        try:
+            return list((await self.db.scalars(select(models.CadtSyncState))).all())
+        except Exception as e:
+            logger.error(f"Select DB Failure:{e}")
+            raise errorcode.internal_server_error(message="Select DB Failure")
+
+    def is_cadt_mirror_ready(self) -> bool:
+        return cadt_mirror_synced_resources.issuperset(CADT_MIRROR_RESOURCES)
+
+    async def combine_climate_units_and_metadata(self, search: dict[str, Any]) -> list[dict[str, Any]]:
+        """Same as `ClimateWareHouseCrud.combine_climate_units_and_metadata`, served from the CADT mirror.
+
+        Supports the `orgUid`, `warehouseUnitId` and `search` filters used by the explorer.
+        """
+        try:
+            query = select(models.CadtUnit.data).where(models.CadtUnit.marketplace_identifier.isnot(None))
+            if "orgUid" in search:
+                query = query.where(models.CadtUnit.org_uid == search["orgUid"])
+            if "warehouseUnitId" in search:
+                query = query.where(models.CadtUnit.warehouse_unit_id == search["warehouseUnitId"])
+            if "search" in search:
+                # lowercased in Python, as SQLite only folds the case of ASCII letters
+                query = query.where(
+                    models.CadtUnit.search_text.like(_like_contains(search["search"].lower()), escape="\\")
+                )
+            units = (await self.db.scalars(query)).all()
+            if len(units) == 0:
+                logger.warning(f"Search CADT mirror units by search is empty. search:{search}")
+                return []
+
+            org_uids = {unit.get("orgUid") for unit in units}
+            project_ids = {(unit.get("issuance") or {}).get("warehouseProjectId") for unit in units}
+
+            projects = (
+                await self.db.scalars(
+                    select(models.CadtProject.data).where(models.CadtProject.warehouse_project_id.in_(project_ids))
+                )
+            ).all()
+            organizations = await self.db.execute(
+                select(models.CadtOrganization.org_uid, models.CadtOrganization.data).where(
+                    models.CadtOrganization.org_uid.in_(org_uids)
+                )
+            )
+            organizations_metadata = await self.db.execute(
+                select(models.CadtOrganizationMetadata.org_uid, models.CadtOrganizationMetadata.data).where(
+                    models.CadtOrganizationMetadata.org_uid.in_(org_uids)
+                )
+            )
+            organization_by_id = dict(organizations.all())
+            metadata_by_id = dict(organizations_metadata.all())
+        except Exception as e:
+            logger.error(f"Select DB Failure:{e}")
+            raise errorcode.internal_server_error(message="Select DB Failure")
+
+        return combine_units_and_metadata(units, projects, organization_by_id, metadata_by_id)
@@ -0,0 +1,63 @@
+from __future__ import annotations
+
+import logging
+
+from sqlalchemy import engine, inspect, text
+
+from app import models
+from app.db.base import Base
+
+logger = logging.getLogger("ClimateToken")
+
+ANALYSIS_LIMIT = 1_000
+
+
+def ensure_indexes(engine: engine.Engine) -> list[str]:
+    """Create the indexes declared on the models that are missing from the database.
+
+    `create_all` skips the tables that already exist together with their indexes, so the
+    indexes added to a model after its table was created are only built here.
+    Returns the names of the created indexes.
+    """
+
+    inspector = inspect(engine)
+    table_names = set(inspector.get_table_names())
+
+    created: list[str] = []
+    for table in Base.metadata.sorted_tables:
+        if table.name not in table_names:
+            continue
+
+        index_names = {index["name"] for index in inspector.get_indexes(table.name)}
+        for index in table.indexes:
+            if index.name in index_names:
+                continue
+
+            logger.info(f"Creating index {index.name} on table {table.name}")
+            index.create(bind=engine)
+            created.append(str(index.name))
+
+    return created
+
+
+def ensure_activity_search(engine: engine.Engine) -> None:
+    """Create the full-text index of beneficiaries for a database created before it existed.
+
+    It is filled by `DBCrud.index_activity_search`.
+    """
+
+    with engine.begin() as connection:
+        models.create_activity_search.execute_if(dialect="sqlite")(models.Activity.__table__, connection)
+
+
+def update_statistics(engine: engine.Engine, analysis_limit: int = ANALYSIS_LIMIT) -> None:
+    """Refresh the statistics the SQLite query planner picks indexes with.
+
+    Without them, a filter on a few tokens looks more selective than walking the listing order,
+    and every page of activities sorts all the activities of those tokens. Each index is only
+    sampled up to about `analysis_limit` rows, so this stays quick on large databases.
+    """
+
+    with engine.begin() as connection:
+        connection.execute(text(f"PRAGMA analysis_limit = {int(analysis_limit)}"))
+        connection.execute(text("ANALYZE"))
@@ -1,26 +1,135 @@
 from __future__ import annotations
 
-from sqlalchemy import create_engine, engine
-from sqlalchemy.orm import Session, sessionmaker
+import asyncio
+from typing import Any, Optional
+
+from sqlalchemy import create_engine, engine, event
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, create_async_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
 
 from app import crud
 from app.api import dependencies as deps
 from app.config import settings
 
+# the engines and session factory live for the whole process, the network challenge
+# that names the database file is resolved from the full node on first use only
+_engine: Optional[engine.Engine] = None
+_async_engine: Optional[AsyncEngine] = None
+_session_local: Optional[sessionmaker] = None
+_engine_lock = asyncio.Lock()
+
+
+def get_sqlite_pragmas() -> dict[str, Any]:
+    return {
+        # first, so that switching the journal mode waits for other connections
+        "busy_timeout": settings.DB_BUSY_TIMEOUT,
+        "journal_mode": settings.DB_JOURNAL_MODE,
+        "synchronous": settings.DB_SYNCHRONOUS,
+        "cache_size": settings.DB_CACHE_SIZE,
+        "mmap_size": settings.DB_MMAP_SIZE,
+        "temp_store": settings.DB_TEMP_STORE,
+    }
+
+
+def set_sqlite_pragmas(engine: engine.Engine, pragmas: dict[str, Any]) -> None:
+    """Apply `pragmas` to every connection `engine` opens.
+
+    In WAL mode, readers see the last commit while the scanner writes, instead of waiting for
+    its commits, and `synchronous=NORMAL` only syncs the log at checkpoints.
+    """
+
+    def connect(dbapi_connection: Any, connection_record: Any) -> None:
+        cursor = dbapi_connection.cursor()
+        for name, value in pragmas.items():
+            cursor.execute(f"PRAGMA {name} = {value}")
+        cursor.close()
+
+    event.listen(engine, "connect", connect)
+
 
 async def get_engine_cls() -> engine.Engine:
-    async with deps.get_full_node_rpc_client() as full_node_client:
-        blockchain_crud = crud.BlockChainCrud(full_node_client)
-        challenge: str = await blockchain_crud.get_challenge()
+    global _engine
+
+    if _engine is not None:
+        return _engine
+
+    async with _engine_lock:
+        if _engine is None:
+            async with deps.get_full_node_rpc_client() as full_node_client:
+                blockchain_crud = crud.BlockChainCrud(full_node_client)
+                challenge: str = await blockchain_crud.get_challenge()
+
+            db_url: str = "sqlite:///" + str(settings.DB_PATH).replace("CHALLENGE", challenge)
+            _engine = create_engine(
+                db_url,
+                connect_args={"check_same_thread": False},
+                poolclass=QueuePool,
+                pool_size=settings.DB_POOL_SIZE,
+                max_overflow=settings.DB_MAX_OVERFLOW,
+            )
+            set_sqlite_pragmas(_engine, get_sqlite_pragmas())
+
+    return _engine
 
-    db_url: str = "sqlite:///" + str(settings.DB_PATH).replace("CHALLENGE", challenge)
-    Engine: engine.Engine = create_engine(db_url, connect_args={"check_same_thread": False, "timeout": 15})
 
-    return Engine
+async def get_async_engine_cls() -> AsyncEngine:
+    """The engine of the same database as `get_engine_cls`, through `aiosqlite`.
 
+    Queries run on the connection threads of `aiosqlite`, so waiting for SQLite, including
+    for its lock, does not block the event loop. The synchronous engine is left to the
+    schema migrations run at startup.
+    """
+
+    global _async_engine
+
+    if _async_engine is not None:
+        return _async_engine
 
-async def get_session_local_cls() -> Session:
     Engine = await get_engine_cls()
-    SessionLocal: Session = sessionmaker(autocommit=False, autoflush=False, bind=Engine)
+    async with _engine_lock:
+        if _async_engine is None:
+            _async_engine = create_async_engine(
+                Engine.url.set(drivername="sqlite+aiosqlite"),
+                poolclass=AsyncAdaptedQueuePool,
+                pool_size=settings.DB_POOL_SIZE,
+                max_overflow=settings.DB_MAX_OVERFLOW,
+            )
+            set_sqlite_pragmas(_async_engine.sync_engine, get_sqlite_pragmas())
+
+    return _async_engine
+
+
+async def get_session_local_cls() -> sessionmaker:
+    global _session_local
+
+    if _session_local is not None:
+        return _session_local
+
+    AsyncEngine = await get_async_engine_cls()
+    async with _engine_lock:
+        if _session_local is None:
+            # loaded rows stay readable after a commit, as reloading them lazily needs an await
+            _session_local = sessionmaker(
+                autocommit=False,
+                autoflush=False,
+                expire_on_commit=False,
+                bind=AsyncEngine,
+                class_=AsyncSession,
+            )
+
+    return _session_local
+
+
+async def dispose_engine() -> None:
+    global _engine, _async_engine, _session_local
+
+    if _async_engine is not None:
+        await _async_engine.dispose()
+
+    if _engine is not None:
+        _engine.dispose()
 
-    return SessionLocal
+    _engine = None
+    _async_engine = None
+    _session_local = None
@@ -0,0 +1,95 @@
+from __future__ import annotations
+
+import asyncio
+import dataclasses
+import logging
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Optional
+
+from chia.types.coin_spend import CoinSpend
+
+from app.config import settings
+from app.core.chialisp.gateway import decode_gateway_spend
+from app.core.types import GatewayMode
+from app.metrics import metrics
+
+logger = logging.getLogger("ClimateToken")
+
+
+@dataclasses.dataclass
+class GatewayDecoder:
+    """Decode gateway spends into their mode and metadata off the event loop.
+
+    With `workers` > 0, spends are serialized and decoded on a pool of that many worker
+    processes, so decoding uses every core without holding the GIL of the API process. With
+    `workers` == 0, or if the pool cannot be started or breaks, spends are decoded in-line on
+    the event loop instead.
+    """
+
+    workers: int
+    _executor: Optional[ProcessPoolExecutor] = dataclasses.field(default=None, init=False, repr=False)
+    _disabled: bool = dataclasses.field(default=False, init=False, repr=False)
+
+    @classmethod
+    def from_settings(cls) -> GatewayDecoder:
+        workers = settings.DECODE_PROCESSES
+        return cls(workers=(os.cpu_count() or 1) if workers is None else workers)
+
+    @property
+    def executor(self) -> Optional[ProcessPoolExecutor]:
+        if self._executor is None and self.workers > 0 and not self._disabled:
+            try:
+                # forking the running event loop can deadlock, and frozen builds can only spawn
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers, mp_context=multiprocessing.get_context("spawn")
+                )
+            except (NotImplementedError, OSError) as e:
+                logger.warning(f"Cannot start {self.workers} decode workers, decoding in-line: {e!s}")
+                self._disabled = True
+
+        return self._executor
+
+    async def decode(self, coin_spend: CoinSpend) -> tuple[GatewayMode, dict[str, str]]:
+        executor = self.executor
+        if executor is not None:
+            try:
+                result = await asyncio.get_running_loop().run_in_executor(
+                    executor, decode_gateway_spend, bytes(coin_spend)
+                )
+            except BrokenProcessPool as e:
+                logger.warning(f"Decode workers stopped unexpectedly, decoding in-line: {e!s}")
+                metrics.inc("decode_pool_failures")
+                self._disabled = True
+                self.close()
+            else:
+                metrics.inc("decode_pool_items")
+                return result
+
+        # CLVM programs are bound to the thread that created them, so this cannot move to a thread
+        metrics.inc("decode_inline_items")
+        return decode_gateway_spend(bytes(coin_spend))
+
+    def close(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+_gateway_decoder: Optional[GatewayDecoder] = None
+
+
+def get_gateway_decoder() -> GatewayDecoder:
+    global _gateway_decoder
+
+    if _gateway_decoder is None:
+        _gateway_decoder = GatewayDecoder.from_settings()
+
+    return _gateway_decoder
+
+
+def close_gateway_decoder() -> None:
+    if _gateway_decoder is not None:
+        _gateway_decoder.close()
@@ -1,6 +1,7 @@
 from __future__ import annotations
 
 import logging
+import multiprocessing
 import sys
 import traceback
 
@@ -11,7 +12,11 @@ from starlette.requests import Request
 from starlette.responses import Response
 
 from app.api import v1
+from app.api.dependencies import close_rpc_client_pool
 from app.config import ExecutionMode, settings
+from app.crud.cadt_client import close_cadt_client
+from app.db.session import dispose_engine
+from app.decoder import close_gateway_decoder
 from app.logger import initialize_logging
 from app.utils import wait_until_dir_exists
 
@@ -29,6 +34,15 @@ if settings.MODE == ExecutionMode.DEV:
 
 app.include_router(v1.router)
 
+
+@app.on_event("shutdown")
+async def close_clients() -> None:
+    await close_cadt_client()
+    await close_rpc_client_pool()
+    await dispose_engine()
+    close_gateway_decoder()
+
+
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
@@ -39,6 +53,8 @@ app.add_middleware(
 
 
 if __name__ == "__main__":
+    # decode worker processes of a frozen build start from this executable too
+    multiprocessing.freeze_support()
     uvicorn_log_config = initialize_logging()
     logger = logging.getLogger("ClimateToken")
     logger.info(f"Using settings {settings.dict()}")
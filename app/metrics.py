@@ -0,0 +1,37 @@
+from __future__ import annotations
+
+from collections.abc import Callable
+from typing import Any, Optional
+
+
+class Metrics:
+    """Process-wide gauges and counters, reported by `GET /v1/metrics`.
+
+    Components that already keep their own statistics register a collector instead,
+    which is called on every snapshot.
+    """
+
+    def __init__(self) -> None:
+        self._values: dict[str, float] = {}
+        self._collectors: dict[str, Callable[[], Any]] = {}
+
+    def set(self, name: str, value: float) -> None:
+        self._values[name] = value
+
+    def inc(self, name: str, amount: float = 1) -> None:
+        self._values[name] = self._values.get(name, 0) + amount
+
+    def get(self, name: str) -> Optional[float]:
+        return self._values.get(name)
+
+    def register(self, name: str, collector: Callable[[], Any]) -> None:
+        self._collectors[name] = collector
+
+    def snapshot(self) -> dict[str, Any]:
+        return {
+            **self._values,
+            **{name: collector() for (name, collector) in self._collectors.items()},
+        }
+
+
+metrics = Metrics()
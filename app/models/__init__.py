@@ -1,6 +1,19 @@
 from __future__ import annotations
 
-from app.models.activity import Activity
+from app.models.activity import Activity, activity_search, create_activity_search
+from app.models.cadt import CadtOrganization, CadtOrganizationMetadata, CadtProject, CadtSyncState, CadtUnit
+from app.models.scan_cursor import ScanCursor
 from app.models.state import State
 
-__all__ = ["Activity", "State"]
+__all__ = [
+    "Activity",
+    "CadtOrganization",
+    "CadtOrganizationMetadata",
+    "CadtProject",
+    "CadtSyncState",
+    "CadtUnit",
+    "ScanCursor",
+    "State",
+    "activity_search",
+    "create_activity_search",
+]
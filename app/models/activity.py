@@ -1,6 +1,20 @@
 from __future__ import annotations
 
-from sqlalchemy import JSON, BigInteger, Column, DateTime, Integer, String, UniqueConstraint, func
+from sqlalchemy import (
+    DDL,
+    JSON,
+    BigInteger,
+    Column,
+    DateTime,
+    Index,
+    Integer,
+    MetaData,
+    String,
+    Table,
+    UniqueConstraint,
+    event,
+    func,
+)
 
 from app.db.base import Base
 
@@ -34,4 +48,26 @@ class Activity(Base):  # type: ignore[misc]
             "coin_id",
             name="uk_coin_id",
         ),
+        # activities of some tokens, optionally of one mode and above a height; covers counting them
+        Index("ix_activity_asset_id_mode_height", "asset_id", "mode", "height"),
+        # activities in the order they are listed in
+        Index("ix_activity_height_coin_id", "height", "coin_id"),
     )
+
+
+# full-text index of the beneficiary of each activity, under the rowid of the activity; kept
+# out of `Base.metadata` since `create_all` cannot create virtual tables
+activity_search = Table(
+    "activity_search",
+    MetaData(),
+    Column("rowid", Integer, primary_key=True),
+    Column("beneficiary_name", String),
+    Column("beneficiary_address", String),
+    Column("beneficiary_puzzle_hash", String),
+)
+
+create_activity_search = DDL(
+    "CREATE VIRTUAL TABLE IF NOT EXISTS activity_search"
+    " USING fts5(beneficiary_name, beneficiary_address, beneficiary_puzzle_hash)"
+)
+event.listen(Activity.__table__, "after_create", create_activity_search.execute_if(dialect="sqlite"))
@@ -0,0 +1,61 @@
+from __future__ import annotations
+
+from sqlalchemy import JSON, Column, DateTime, Integer, String, func
+
+from app.db.base import Base
+
+
+class CadtUnit(Base):  # type: ignore[misc]
+    __tablename__ = "cadt_unit"
+
+    warehouse_unit_id = Column(String, primary_key=True)
+    org_uid = Column(String, index=True)
+    marketplace_identifier = Column(String, index=True)
+    warehouse_project_id = Column(String)
+    # lowercased values of the searchable fields, one per line
+    search_text = Column(String)
+    data = Column(JSON)
+    data_hash = Column(String)
+
+    updated_at = Column(DateTime, default=func.now(), onupdate=func.now())
+
+
+class CadtProject(Base):  # type: ignore[misc]
+    __tablename__ = "cadt_project"
+
+    warehouse_project_id = Column(String, primary_key=True)
+    org_uid = Column(String)
+    data = Column(JSON)
+    data_hash = Column(String)
+
+    updated_at = Column(DateTime, default=func.now(), onupdate=func.now())
+
+
+class CadtOrganization(Base):  # type: ignore[misc]
+    __tablename__ = "cadt_organization"
+
+    org_uid = Column(String, primary_key=True)
+    data = Column(JSON)
+    data_hash = Column(String)
+
+    updated_at = Column(DateTime, default=func.now(), onupdate=func.now())
+
+
+class CadtOrganizationMetadata(Base):  # type: ignore[misc]
+    __tablename__ = "cadt_organization_metadata"
+
+    org_uid = Column(String, primary_key=True)
+    data = Column(JSON)
+    data_hash = Column(String)
+
+    updated_at = Column(DateTime, default=func.now(), onupdate=func.now())
+
+
+class CadtSyncState(Base):  # type: ignore[misc]
+    __tablename__ = "cadt_sync_state"
+
+    resource = Column(String, primary_key=True)
+    record_count = Column(Integer)
+    changed_count = Column(Integer)
+    last_synced_at = Column(DateTime)
+    last_changed_at = Column(DateTime)
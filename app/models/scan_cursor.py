@@ -0,0 +1,18 @@
+from __future__ import annotations
+
+from datetime import datetime
+
+from sqlalchemy import BigInteger, Column, DateTime, String, func
+
+from app.db.base import Base
+
+
+class ScanCursor(Base):  # type: ignore[misc]
+    __tablename__ = "scan_cursor"
+
+    asset_id = Column(String, primary_key=True)
+    # end of the last height window scanned for this token
+    last_scanned_height = Column(BigInteger)
+    # every activity of this token below this height is recorded
+    last_confirmed_height = Column(BigInteger)
+    updated_at = Column(DateTime, server_default=func.now(), onupdate=datetime.now)
@@ -0,0 +1,254 @@
+from __future__ import annotations
+
+import asyncio
+import dataclasses
+import logging
+import time
+from collections.abc import Awaitable, Callable
+from typing import Any, Optional
+
+from chia.types.coin_record import CoinRecord
+from chia.types.coin_spend import CoinSpend
+
+from app import crud, schemas
+from app.config import settings
+from app.core.climate_wallet.wallet import ClimateObserverWallet
+from app.decoder import GatewayDecoder
+from app.metrics import metrics
+
+logger = logging.getLogger("ClimateToken")
+
+
+@dataclasses.dataclass(frozen=True)
+class ScanToken:
+    org_name: str
+    key: str
+    wallet: ClimateObserverWallet
+
+    @property
+    def asset_id(self) -> str:
+        return self.wallet.tail_program_hash.hex()
+
+
+@dataclasses.dataclass(frozen=True)
+class ScanResult:
+    # activities added to the database, the ones already stored are not counted
+    written: int
+    # gateway coin records found in the window
+    coin_records: int
+    # time taken by the coin record query, in seconds
+    latency: float
+    # tokens with a coin that could not be fetched or decoded, their window must be scanned again
+    failed_asset_ids: frozenset[str] = frozenset()
+
+
+@dataclasses.dataclass
+class AdaptiveWindow:
+    """Size of the height window scanned at a time.
+
+    The size doubles while windows come back sparse and fast, and halves as soon as a window
+    holds more than `target_coin_records` coin records or its coin record query takes longer
+    than `target_latency` seconds. It always stays between `min_size` and `max_size`.
+    """
+
+    size: int
+    min_size: int
+    max_size: int
+    target_coin_records: int
+    target_latency: float
+
+    def __post_init__(self) -> None:
+        self.size = min(max(self.size, self.min_size), self.max_size)
+        metrics.set("scan_window_size", self.size)
+
+    @classmethod
+    def from_settings(cls) -> AdaptiveWindow:
+        return cls(
+            size=settings.BLOCK_RANGE,
+            min_size=settings.SCAN_WINDOW_MIN_SIZE,
+            max_size=settings.SCAN_WINDOW_MAX_SIZE,
+            target_coin_records=settings.SCAN_WINDOW_TARGET_COIN_RECORDS,
+            target_latency=settings.SCAN_WINDOW_TARGET_LATENCY,
+        )
+
+    def update(self, coin_records: int, latency: float) -> int:
+        if coin_records > self.target_coin_records or latency > self.target_latency:
+            self.size = max(self.min_size, self.size // 2)
+        elif coin_records <= self.target_coin_records // 4 and latency <= self.target_latency / 4:
+            self.size = min(self.max_size, self.size * 2)
+
+        metrics.set("scan_window_size", self.size)
+        metrics.set("scan_window_coin_records", coin_records)
+        metrics.set("scan_window_latency", latency)
+        return self.size
+
+
+# end of stream marker passed down the pipeline queues
+_DONE = None
+
+
+@dataclasses.dataclass
+class ActivityScanner:
+    """Scan a height window for the activities of many tokens at once.
+
+    After one coin record query for every token, each gateway coin goes through a pipeline of
+    bounded queues:
+
+    - fetch: `fetch_workers` tasks retrieve the coin spends from the full node
+    - decode: `decode_workers` tasks parse the spends into activities with `decoder`
+    - write: a single task inserts the activities in batches of `batch_size`
+
+    Every queue holds at most `queue_size` items, so a slow stage holds back the ones before it.
+    Item counts, errors and busy time of every stage are reported as metrics. `scan` only
+    returns once every coin has gone through the pipeline, so the caller can safely advance
+    the scanned height afterwards, except for the tokens listed in `failed_asset_ids`.
+    """
+
+    db_crud: crud.DBCrud
+    blockchain: crud.BlockChainCrud
+    decoder: GatewayDecoder
+    fetch_workers: int
+    decode_workers: int
+    batch_size: int
+    queue_size: int
+
+    async def scan(
+        self,
+        tokens: list[ScanToken],
+        start_height: int,
+        end_height: int,
+        peak_height: int,
+    ) -> ScanResult:
+        # one full node call for every token in the window, dispatched by gateway puzzle hash
+        started_at = time.monotonic()
+        coin_records_by_puzzle_hash = await self.blockchain.get_gateway_coin_records(
+            wallets=[token.wallet for token in tokens],
+            start_height=start_height,
+            end_height=end_height,
+        )
+        latency = time.monotonic() - started_at
+
+        fetch_workers = max(1, self.fetch_workers)
+        decode_workers = max(1, self.decode_workers)
+        fetch_queue: asyncio.Queue[Any] = asyncio.Queue(maxsize=self.queue_size)
+        decode_queue: asyncio.Queue[Any] = asyncio.Queue(maxsize=self.queue_size)
+        write_queue: asyncio.Queue[Any] = asyncio.Queue(maxsize=self.queue_size)
+        failed_asset_ids: set[str] = set()
+
+        async def feed() -> None:
+            for token in tokens:
+                for coin_record in coin_records_by_puzzle_hash.get(token.wallet.gateway_cat_puzzle_hash, []):
+                    await fetch_queue.put((token, coin_record))
+
+            for _ in range(fetch_workers):
+                await fetch_queue.put(_DONE)
+
+        async def fetch(item: tuple[ScanToken, CoinRecord]) -> tuple[ScanToken, CoinRecord, CoinSpend]:
+            (token, coin_record) = item
+            coin_spend = await token.wallet.get_coin_spend(coin_record)
+            return (token, coin_record, coin_spend)
+
+        async def decode(item: tuple[ScanToken, CoinRecord, CoinSpend]) -> Optional[schemas.Activity]:
+            (token, coin_record, coin_spend) = item
+            (mode, metadata) = await self.decoder.decode(coin_spend)
+            activity_obj = {
+                "coin_record": coin_record,
+                "coin_spend": coin_spend,
+                "mode": mode,
+                "metadata": metadata,
+            }
+            return self.blockchain.to_activity(wallet=token.wallet, activity_obj=activity_obj, peak_height=peak_height)
+
+        write = asyncio.create_task(self._write(write_queue))
+        tasks = [
+            asyncio.create_task(feed()),
+            *self._start_workers(
+                "fetch", fetch, fetch_queue, decode_queue, fetch_workers, decode_workers, failed_asset_ids
+            ),
+            *self._start_workers("decode", decode, decode_queue, write_queue, decode_workers, 1, failed_asset_ids),
+            write,
+        ]
+        try:
+            # a failed stage, e.g. a failed write, fails the window, which must then be scanned again
+            (done, _) = await asyncio.wait(tasks, return_when=asyncio.FIRST_EXCEPTION)
+            for task in done:
+                task.result()
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+        return ScanResult(
+            written=write.result(),
+            coin_records=sum(len(coin_records) for coin_records in coin_records_by_puzzle_hash.values()),
+            latency=latency,
+            failed_asset_ids=frozenset(failed_asset_ids),
+        )
+
+    def _start_workers(
+        self,
+        stage: str,
+        process: Callable[[Any], Awaitable[Any]],
+        input_queue: asyncio.Queue[Any],
+        output_queue: asyncio.Queue[Any],
+        workers: int,
+        consumers: int,
+        failed_asset_ids: set[str],
+    ) -> list[asyncio.Task[None]]:
+        remaining = workers
+
+        async def worker() -> None:
+            nonlocal remaining
+
+            while (item := await input_queue.get()) is not _DONE:
+                started_at = time.monotonic()
+                try:
+                    result = await process(item)
+                except Exception as e:
+                    (token, *_) = item
+                    # the other coins still go through, but the token is not done with the window
+                    failed_asset_ids.add(token.asset_id)
+                    metrics.inc(f"scan_{stage}_errors")
+                    logger.error(f"An error occurred for organization {token.org_name} under key {token.key}: {e!s}")
+                    continue
+                finally:
+                    metrics.inc(f"scan_{stage}_seconds", time.monotonic() - started_at)
+
+                metrics.inc(f"scan_{stage}_items")
+                if result is not None:
+                    await output_queue.put(result)
+
+            remaining -= 1
+            if remaining == 0:
+                # the last worker out tells the next stage there is nothing more to come
+                for _ in range(consumers):
+                    await output_queue.put(_DONE)
+
+        return [asyncio.create_task(worker()) for _ in range(workers)]
+
+    async def _write(self, queue: asyncio.Queue[Any]) -> int:
+        written = 0
+        batch: list[schemas.Activity] = []
+
+        async def flush() -> None:
+            nonlocal written, batch
+
+            started_at = time.monotonic()
+            result = await self.db_crud.batch_insert_ignore_activity(batch)
+            metrics.inc("scan_write_seconds", time.monotonic() - started_at)
+            metrics.inc("scan_write_items", len(batch))
+            # activities of a window scanned again are already stored
+            metrics.inc("scan_write_ignored", result.ignored)
+
+            written += result.inserted
+            batch = []
+
+        while (activity := await queue.get()) is not _DONE:
+            batch.append(activity)
+            if len(batch) >= self.batch_size:
+                await flush()
+
+        if len(batch) > 0:
+            await flush()
+
+        return written
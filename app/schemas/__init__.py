@@ -31,6 +31,9 @@ from app.schemas.token import (  # noqa: F401
     PermissionlessRetirementTxRequest,
     PermissionlessRetirementTxResponse,
     Token,
+    TokenizationTxBatchItemResponse,
+    TokenizationTxBatchRequest,
+    TokenizationTxBatchResponse,
     TokenizationTxRequest,
     TokenizationTxResponse,
     TokenOnChain,
@@ -57,7 +57,10 @@ class ActivityWithCW(ActivityBase):
 
 class ActivitiesResponse(BaseModel):
     activities: list[ActivityWithCW] = Field(default_factory=list)
-    total: int = 0
+    # not counted when the request sets `include_total` to false
+    total: Optional[int] = 0
+    next_cursor: Optional[str] = None
+    prev_cursor: Optional[str] = None
 
 
 class ActivityRecordResponse(BaseModel):
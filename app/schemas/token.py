@@ -1,5 +1,7 @@
 from __future__ import annotations
 
+from typing import Optional
+
 from chia.util.byte_types import hexstr_to_bytes
 from pydantic import Field
 
@@ -56,6 +58,21 @@ class TokenizationTxResponse(BaseModel):
     tx: Transaction
 
 
+class TokenizationTxBatchRequest(BaseModel):
+    items: list[TokenizationTxRequest]
+
+
+class TokenizationTxBatchItemResponse(BaseModel):
+    token: Optional[TokenOnChain] = None
+    token_hexstr: Optional[str] = None
+    tx: Optional[Transaction] = None
+    error: Optional[str] = None
+
+
+class TokenizationTxBatchResponse(BaseModel):
+    items: list[TokenizationTxBatchItemResponse]
+
+
 class DetokenizationTxRequest(BaseModel):
     token: TokenOnChainBase
     content: str
@@ -24,7 +24,8 @@ a = Analysis(
     ["app/main.py"],
     binaries=bins,
     datas=datas,
-    hiddenimports=[*collect_submodules("chia")],
+    # the async database driver is only loaded by its SQLAlchemy dialect name
+    hiddenimports=[*collect_submodules("chia"), "aiosqlite", "sqlalchemy.dialects.sqlite.aiosqlite"],
     hookspath=[],
     hooksconfig={},
     runtime_hooks=[],
@@ -1,5 +1,7 @@
 from __future__ import annotations
 
+from collections.abc import AsyncIterator
+
 import pytest
 
 # import all fixtures from chia-blockchain test suite
@@ -7,9 +9,22 @@ from chia._tests.conftest import *  # noqa: F403
 from chia._tests.util.spend_sim import sim_and_client
 from chia._tests.wallet.conftest import *  # noqa: F403
 from chia._tests.wallet.rpc.test_wallet_rpc import *  # noqa: F403
+from chia.types.blockchain_format.coin import Coin
+from chia.types.blockchain_format.program import Program
+from chia.types.blockchain_format.sized_bytes import bytes32
+from chia.types.coin_spend import CoinSpend
+from chia.util.ints import uint64
+from chia_rs import G1Element
 from fastapi.testclient import TestClient
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.pool import StaticPool
 
-from app.core.types import ClimateTokenIndex
+from app.core.chialisp.tail import create_tail_program
+from app.core.climate_wallet import wallet as wallet_module
+from app.core.climate_wallet.coin_reservations import COIN_RESERVATION_TTL, CoinReservations
+from app.core.climate_wallet.wallet_utils import create_gateway_request_and_spend
+from app.core.types import ClimateTokenIndex, GatewayMode
+from app.db.base import Base
 from app.main import app
 
 
@@ -19,6 +34,15 @@ async def sim_utils():
         yield sim, client
 
 
+@pytest.fixture(scope="function", autouse=True)
+def coin_reservations(monkeypatch: pytest.MonkeyPatch) -> CoinReservations:
+    """Every test leases coins from its own table, as simulated coins repeat across tests."""
+
+    reservations = CoinReservations(ttl=COIN_RESERVATION_TTL)
+    monkeypatch.setattr(wallet_module, "coin_reservations", reservations)
+    return reservations
+
+
 @pytest.fixture(scope="function")
 def token_index() -> ClimateTokenIndex:
     return ClimateTokenIndex(
@@ -28,6 +52,34 @@ def token_index() -> ClimateTokenIndex:
     )
 
 
+@pytest.fixture(scope="function")
+def gateway_coin_spend(token_index: ClimateTokenIndex) -> CoinSpend:
+    """An unsigned permissionless retirement gateway spend, built without any node."""
+
+    (_, coin_spend) = create_gateway_request_and_spend(
+        mode=GatewayMode.PERMISSIONLESS_RETIREMENT,
+        origin_coin=Coin(bytes32(b"\x01" * 32), bytes32(b"\x02" * 32), uint64(1_000)),
+        amount=uint64(10),
+        tail_program=create_tail_program(public_key=G1Element(), index=Program.to(token_index.name())),
+        from_puzzle_hash=bytes32(b"\x03" * 32),
+        key_value_pairs=[("bn", "Beneficiary"), ("ba", "xch1address"), ("bp", b"\x04" * 4)],
+    )
+    return coin_spend
+
+
 @pytest.fixture(scope="function")
 def fastapi_client() -> TestClient:
     return TestClient(app)
+
+
+@pytest.fixture(scope="function")
+async def db_session() -> AsyncIterator[AsyncSession]:
+    # a single connection, as every connection to an in-memory database opens a new one
+    engine = create_async_engine("sqlite+aiosqlite://", poolclass=StaticPool)
+    async with engine.begin() as connection:
+        await connection.run_sync(Base.metadata.create_all)
+
+    async with AsyncSession(engine, expire_on_commit=False) as session:
+        yield session
+
+    await engine.dispose()
@@ -47,7 +47,7 @@ class TestActivities:
     ) -> None:
         test_response = schemas.activity.ActivitiesResponse()
 
-        mock_climate_warehouse_data = mock.MagicMock()
+        mock_climate_warehouse_data = mock.AsyncMock()
         mock_climate_warehouse_data.return_value = []
 
         with anyio.from_thread.start_blocking_portal() as portal, monkeypatch.context() as m:
@@ -70,14 +70,14 @@ class TestActivities:
     ) -> None:
         test_response = schemas.activity.ActivitiesResponse()
 
-        mock_db_data = mock.MagicMock()
+        mock_db_data = mock.AsyncMock()
         mock_db_data.return_value = ([], 0)
 
         with anyio.from_thread.start_blocking_portal() as portal, monkeypatch.context() as m:
             fastapi_client.portal = portal  # workaround anyio 4.0.0 incompat with TextClient
             m.setattr(crud.BlockChainCrud, "get_challenge", mock_get_challenge)
             m.setattr(crud.DBCrud, "select_activity_with_pagination", mock_db_data)
-            m.setattr(crud.ClimateWareHouseCrud, "combine_climate_units_and_metadata", mock.MagicMock(return_value={}))
+            m.setattr(crud.ClimateWareHouseCrud, "combine_climate_units_and_metadata", mock.AsyncMock(return_value={}))
 
             params = urlencode({})
             response = fastapi_client.get("v1/activities/", params=params)
@@ -191,8 +191,8 @@ class TestActivities:
             total=1,
         )
 
-        mock_db_data = mock.MagicMock()
-        mock_climate_warehouse_data = mock.MagicMock()
+        mock_db_data = mock.AsyncMock()
+        mock_climate_warehouse_data = mock.AsyncMock()
         mock_db_data.return_value = (
             [
                 test_activity_data,
@@ -400,8 +400,8 @@ class TestActivities:
             total=1,
         )
 
-        mock_db_data = mock.MagicMock()
-        mock_climate_warehouse_data = mock.MagicMock()
+        mock_db_data = mock.AsyncMock()
+        mock_climate_warehouse_data = mock.AsyncMock()
         mock_db_data.return_value = (
             [
                 test_activity_data,
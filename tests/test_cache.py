@@ -0,0 +1,97 @@
+from __future__ import annotations
+
+import asyncio
+
+import pytest
+
+from app.cache import TTLCache
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class TestTTLCache:
+    @pytest.mark.anyio
+    async def test_hit_after_miss(self) -> None:
+        cache: TTLCache[str, int] = TTLCache(name="test", ttl=10, max_size=4)
+        calls = 0
+
+        async def loader() -> int:
+            nonlocal calls
+            calls += 1
+            return 5
+
+        assert await cache.get_or_load("key", loader) == 5
+        assert await cache.get_or_load("key", loader) == 5
+        assert calls == 1
+        assert cache.stats()["hits"] == 1
+        assert cache.stats()["misses"] == 1
+
+    @pytest.mark.anyio
+    async def test_expired_entry_is_reloaded(self) -> None:
+        clock = FakeClock()
+        cache: TTLCache[str, float] = TTLCache(name="test", ttl=10, max_size=4, clock=clock)
+
+        async def loader() -> float:
+            return clock.now
+
+        assert await cache.get_or_load("key", loader) == 0
+        clock.now = 9
+        assert await cache.get_or_load("key", loader) == 0
+        clock.now = 10
+        assert await cache.get_or_load("key", loader) == 10
+
+    @pytest.mark.anyio
+    async def test_least_recently_used_is_evicted(self) -> None:
+        cache: TTLCache[str, str] = TTLCache(name="test", ttl=10, max_size=2)
+        cache.set("a", "a")
+        cache.set("b", "b")
+        cache.get("a")
+        cache.set("c", "c")
+
+        assert cache.get("a") == (True, "a")
+        assert cache.get("b") == (False, None)
+        assert cache.get("c") == (True, "c")
+
+    @pytest.mark.anyio
+    async def test_concurrent_misses_load_once(self) -> None:
+        cache: TTLCache[str, int] = TTLCache(name="test", ttl=10, max_size=4)
+        calls = 0
+
+        async def loader() -> int:
+            nonlocal calls
+            calls += 1
+            await asyncio.sleep(0.01)
+            return calls
+
+        results = await asyncio.gather(*(cache.get_or_load("key", loader) for _ in range(5)))
+
+        assert results == [1] * 5
+        assert calls == 1
+
+    @pytest.mark.anyio
+    async def test_failed_load_is_not_cached(self) -> None:
+        cache: TTLCache[str, int] = TTLCache(name="test", ttl=10, max_size=4)
+
+        async def failing_loader() -> int:
+            raise ValueError("CADT is down")
+
+        async def loader() -> int:
+            return 5
+
+        with pytest.raises(ValueError, match="CADT is down"):
+            await cache.get_or_load("key", failing_loader)
+
+        assert await cache.get_or_load("key", loader) == 5
+
+    @pytest.mark.anyio
+    async def test_zero_ttl_disables_caching(self) -> None:
+        cache: TTLCache[str, int] = TTLCache(name="test", ttl=0, max_size=4)
+        cache.set("key", 5)
+
+        assert len(cache) == 0
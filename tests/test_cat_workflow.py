@@ -7,7 +7,7 @@ from chia.rpc.wallet_rpc_client import WalletRpcClient
 from chia.wallet.wallet import Wallet
 from chia_rs import PrivateKey
 
-from app.core.climate_wallet.wallet import ClimateObserverWallet, ClimateWallet
+from app.core.climate_wallet.wallet import ClimateObserverWallet, ClimateWallet, TokenizationPayment
 from app.core.derive_keys import master_sk_to_root_sk
 from app.core.types import ClimateTokenIndex, GatewayMode
 
@@ -117,6 +117,112 @@ async def test_cat_tokenization_workflow(
     )
 
 
+@pytest.mark.parametrize(
+    "wallet_environments",
+    [
+        {
+            "num_environments": 2,
+            "blocks_needed": [1, 1],
+            "config_overrides": {"automatically_add_unknown_cats": True},
+        }
+    ],
+    indirect=True,
+)
+@pytest.mark.anyio
+async def test_cat_batch_tokenization_workflow(
+    wallet_environments: WalletTestFramework,
+    amount: int = 30,
+    fee: int = 10,
+) -> None:
+    env_1 = wallet_environments.environments[0]
+    env_2 = wallet_environments.environments[1]
+
+    env_1.wallet_aliases = {
+        "xch": 1,
+    }
+    env_2.wallet_aliases = {
+        "xch": 1,
+        "cat_1": 2,
+        "cat_2": 3,
+        "cat_3": 4,
+    }
+
+    wallet_client_1: WalletRpcClient = env_1.rpc_client
+    wallet_2: Wallet = env_2.xch_wallet
+
+    fingerprint = (await wallet_client_1.get_logged_in_fingerprint()).fingerprint
+    assert fingerprint is not None
+    result = await wallet_client_1.get_private_key(GetPrivateKey(fingerprint=fingerprint))
+    root_secret_key: PrivateKey = master_sk_to_root_sk(result.private_key.sk)
+
+    payments: list[TokenizationPayment] = []
+    for vintage_year in (2016, 2017, 2018):
+        climate_wallet = await ClimateWallet.create(
+            token_index=ClimateTokenIndex(
+                org_uid="Ivern", warehouse_project_id="Rootcaller", vintage_year=vintage_year
+            ),
+            root_secret_key=root_secret_key,
+            wallet_client=wallet_client_1,
+        )
+        payments.append(
+            TokenizationPayment(
+                wallet=climate_wallet,
+                to_puzzle_hash=await wallet_2.get_new_puzzlehash(),
+                amount=amount,
+                fee=fee,
+            )
+        )
+
+    with pytest.raises(ValueError, match="same token and amount"):
+        await ClimateWallet.send_tokenization_transactions(payments=[payments[0], payments[0]])
+
+    tx_result = await ClimateWallet.send_tokenization_transactions(payments=payments)
+    # a single spend bundle with a gateway spend for every token
+    assert len(tx_result["spend_bundle"].coin_spends) >= len(payments) + 1
+
+    total = len(payments) * (amount + fee)
+    cat_updates = {
+        "init": True,
+        "confirmed_wallet_balance": amount,
+        "unconfirmed_wallet_balance": amount,
+        "spendable_balance": amount,
+        "max_send_amount": amount,
+        "unspent_coin_count": 1,
+    }
+    await wallet_environments.process_pending_states(
+        [
+            WalletStateTransition(
+                pre_block_balance_updates={
+                    "xch": {
+                        "unconfirmed_wallet_balance": -total,
+                        "<=#spendable_balance": -total,
+                        ">=#pending_change": 1,  # any amount increase
+                        "<=#max_send_amount": -total,
+                        "pending_coin_removal_count": 1,
+                    }
+                },
+                post_block_balance_updates={
+                    "xch": {
+                        "confirmed_wallet_balance": -total,
+                        ">=#spendable_balance": 1,
+                        "<=#pending_change": -1,  # any amount increase
+                        ">=#max_send_amount": 1,
+                        "pending_coin_removal_count": -1,
+                    }
+                },
+            ),
+            WalletStateTransition(
+                pre_block_balance_updates={},
+                post_block_balance_updates={
+                    "cat_1": cat_updates,
+                    "cat_2": cat_updates,
+                    "cat_3": cat_updates,
+                },
+            ),
+        ]
+    )
+
+
 @pytest.mark.parametrize(
     "wallet_environments",
     [
@@ -0,0 +1,131 @@
+from __future__ import annotations
+
+import asyncio
+import dataclasses
+from unittest import mock
+
+import pytest
+from chia.types.blockchain_format.program import Program
+from chia.types.blockchain_format.sized_bytes import bytes32
+from chia.types.coin_record import CoinRecord
+from chia.types.coin_spend import CoinSpend
+from chia_rs import AugSchemeMPL, G1Element
+
+from app.cache import TTLCache
+from app.core.chialisp.gateway import get_gateway_cat_puzzle_hash
+from app.core.chialisp.tail import create_tail_program
+from app.core.climate_wallet import wallet as wallet_module
+from app.core.climate_wallet.wallet import (
+    ClimateObserverWallet,
+    ClimateRegistryKeys,
+    ClimateWallet,
+    create_climate_registry_keys,
+    get_climate_token_puzzles,
+)
+from app.core.derive_keys import root_sk_to_gateway_sk
+from app.core.types import ClimateTokenIndex, GatewayMode
+from app.metrics import metrics
+
+
+class TestClimateObserverWallet:
+    @pytest.mark.anyio
+    async def test_get_coin_spends_bounded_and_ordered_then_success(self, token_index: ClimateTokenIndex) -> None:
+        in_flight = 0
+        max_in_flight = 0
+
+        spends: list[CoinSpend] = [mock.MagicMock() for _ in range(20)]
+
+        async def get_puzzle_and_solution(coin_id: bytes, height: int) -> CoinSpend:
+            nonlocal in_flight, max_in_flight
+            in_flight += 1
+            max_in_flight = max(max_in_flight, in_flight)
+            # later coins resolve first
+            await asyncio.sleep(0.001 * (20 - height))
+            in_flight -= 1
+            return spends[height]
+
+        full_node_client = mock.MagicMock()
+        full_node_client.get_puzzle_and_solution = get_puzzle_and_solution
+        coin_records: list[CoinRecord] = [mock.MagicMock(spent_block_index=height) for height in range(20)]
+
+        wallet = ClimateObserverWallet(
+            token_index=token_index,
+            root_public_key=G1Element(),
+            full_node_client=full_node_client,
+            max_concurrency=4,
+        )
+        coin_spends = await wallet.get_coin_spends(coin_records)
+
+        assert coin_spends == spends
+        assert max_in_flight == 4
+
+    @pytest.mark.anyio
+    async def test_get_coin_spends_missing_spend_then_error(self, token_index: ClimateTokenIndex) -> None:
+        full_node_client = mock.MagicMock()
+        full_node_client.get_puzzle_and_solution = mock.AsyncMock(return_value=None)
+
+        wallet = ClimateObserverWallet(
+            token_index=token_index,
+            root_public_key=G1Element(),
+            full_node_client=full_node_client,
+        )
+
+        with pytest.raises(ValueError, match="No coin spend found!"):
+            await wallet.get_coin_spends([mock.MagicMock(spent_block_index=1)])
+
+
+class TestClimateTokenPuzzles:
+    def test_puzzles_memoized_then_success(self, token_index: ClimateTokenIndex) -> None:
+        get_climate_token_puzzles.cache_clear()
+        wallets = [
+            ClimateObserverWallet(
+                token_index=token_index, root_public_key=G1Element(), full_node_client=mock.MagicMock()
+            )
+            for _ in range(3)
+        ]
+
+        tail_program = create_tail_program(public_key=G1Element(), index=Program.to(token_index.name()))
+        for wallet in wallets:
+            assert wallet.tail_program == tail_program
+            assert wallet.tail_program_hash == tail_program.get_tree_hash()
+            assert wallet.gateway_cat_puzzle_hash == wallet.gateway_cat_puzzle.get_tree_hash()
+            assert wallet.gateway_cat_puzzle_hash == get_gateway_cat_puzzle_hash(wallet.tail_program_hash)
+
+        cache_info = get_climate_token_puzzles.cache_info()
+        assert (cache_info.misses, cache_info.currsize) == (1, 1)
+        assert metrics.snapshot()["climate_token_puzzles_cache"]["hit_rate"] == cache_info.hits / (cache_info.hits + 1)
+
+
+class TestClimateWallet:
+    @pytest.mark.anyio
+    async def test_create_derives_and_signs_once_per_token_then_success(self, token_index: ClimateTokenIndex) -> None:
+        cache: TTLCache[tuple[int, bytes32], ClimateRegistryKeys] = TTLCache(name="test", ttl=10, max_size=4)
+        root_secret_key = AugSchemeMPL.key_gen(bytes(32))
+        other_token_index = dataclasses.replace(token_index, sequence_num=1)
+
+        with (
+            mock.patch.object(wallet_module, "registry_keys_cache", cache),
+            mock.patch.object(wallet_module, "get_constants", mock.AsyncMock()),
+            mock.patch.object(wallet_module, "AugSchemeMPL", wraps=AugSchemeMPL) as scheme,
+            mock.patch.object(wallet_module, "root_sk_to_gateway_sk", wraps=root_sk_to_gateway_sk) as derive,
+        ):
+            wallets = await asyncio.gather(
+                *(
+                    ClimateWallet.create(
+                        token_index=index,
+                        root_secret_key=root_secret_key,
+                        wallet_client=mock.MagicMock(),
+                    )
+                    for index in [token_index] * 5 + [other_token_index] * 5
+                )
+            )
+
+        # one derivation and one signature per mode, for each of the two tokens
+        assert derive.call_count == 2
+        assert scheme.sign.call_count == 2 * len(GatewayMode)
+        assert wallets[0].mode_to_message_and_signature == wallets[4].mode_to_message_and_signature
+        assert wallets[0].mode_to_message_and_signature != wallets[5].mode_to_message_and_signature
+        assert wallets[0].mode_to_message_and_signature == (
+            create_climate_registry_keys(root_secret_key, token_index.name()).mode_to_message_and_signature
+        )
+        assert (cache.stats()["hits"], cache.stats()["misses"]) == (8, 2)
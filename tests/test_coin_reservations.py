@@ -0,0 +1,176 @@
+from __future__ import annotations
+
+import asyncio
+from typing import Optional
+from unittest import mock
+
+import pytest
+from chia.types.blockchain_format.coin import Coin
+from chia.types.blockchain_format.sized_bytes import bytes32
+from chia.types.mempool_inclusion_status import MempoolInclusionStatus
+from chia.util.errors import Err
+from chia.util.ints import uint8, uint64
+from chia.wallet.util.tx_config import CoinSelectionConfig
+
+from app.core.climate_wallet.coin_reservations import CoinReservations, is_transaction_settled
+
+COINS = [Coin(bytes32(bytes([index]) * 32), bytes32(b"\x02" * 32), uint64(10)) for index in range(8)]
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def fake_wallet_client() -> mock.MagicMock:
+    async def select_coins(amount: int, wallet_id: int, coin_selection_config: CoinSelectionConfig) -> list[Coin]:
+        # a slow wallet, so that concurrent selections overlap
+        await asyncio.sleep(0.01)
+        coins = [coin for coin in COINS if coin.name() not in coin_selection_config.excluded_coin_ids]
+        return coins[: amount // 10]
+
+    wallet_client = mock.MagicMock()
+    wallet_client.select_coins = select_coins
+    return wallet_client
+
+
+def transaction_record(
+    index: int,
+    removals: list[Coin],
+    confirmed: bool = False,
+    sent_to: Optional[list[tuple[MempoolInclusionStatus, Optional[Err]]]] = None,
+) -> mock.MagicMock:
+    record = mock.MagicMock(removals=removals, confirmed=confirmed)
+    record.name = bytes32(bytes([0xF0 + index]) * 32)
+    record.sent_to = [
+        ("peer", uint8(status.value), None if error is None else error.name) for (status, error) in sent_to or []
+    ]
+    return record
+
+
+class TestCoinReservations:
+    @pytest.mark.anyio
+    async def test_concurrent_leases_get_disjoint_coins_then_success(self) -> None:
+        reservations = CoinReservations(ttl=60)
+        wallet_client = fake_wallet_client()
+
+        async def send() -> list[Coin]:
+            async with reservations.lease() as lease:
+                async with lease.selecting():
+                    coins = await lease.select_coins(wallet_client=wallet_client, amount=20, wallet_id=1)
+                # pushing the transaction does not hold back the other selections
+                await asyncio.sleep(0.01)
+                return coins
+
+        selections = await asyncio.gather(*(send() for _ in range(4)))
+
+        coin_ids = [coin.name() for coins in selections for coin in coins]
+        assert len(coin_ids) == len(COINS)
+        assert len(set(coin_ids)) == len(COINS)
+        assert reservations.stats() == {"size": len(COINS), "reserved": len(COINS), "released": 0}
+
+    @pytest.mark.anyio
+    async def test_failed_lease_released_then_success(self) -> None:
+        reservations = CoinReservations(ttl=60)
+        wallet_client = fake_wallet_client()
+
+        with pytest.raises(ValueError, match="push failed"):
+            async with reservations.lease() as lease:
+                async with lease.selecting():
+                    await lease.select_coins(wallet_client=wallet_client, amount=20, wallet_id=1)
+                    # e.g. coins paying the fee
+                    lease.reserve([COINS[2].name(), COINS[0].name()])
+                raise ValueError("push failed")
+
+        assert reservations.excluded_coin_ids() == []
+        assert reservations.stats() == {"size": 0, "reserved": 3, "released": 3}
+
+    @pytest.mark.anyio
+    async def test_lease_expires_then_success(self) -> None:
+        clock = FakeClock()
+        reservations = CoinReservations(ttl=60, clock=clock)
+        wallet_client = fake_wallet_client()
+
+        async with reservations.lease() as lease:
+            await lease.select_coins(wallet_client=wallet_client, amount=20, wallet_id=1)
+            # the coins of a lease are not excluded from its own transaction
+            assert lease.tx_config.excluded_coin_ids == []
+
+        async with reservations.lease() as other_lease:
+            assert set(other_lease.tx_config.excluded_coin_ids) == {COINS[0].name(), COINS[1].name()}
+
+        clock.now = 60
+        assert reservations.excluded_coin_ids() == []
+
+    @pytest.mark.anyio
+    async def test_pushed_then_failed_transaction_released_before_ttl_then_success(self) -> None:
+        clock = FakeClock()
+        reservations = CoinReservations(ttl=600, clock=clock)
+        wallet_client = fake_wallet_client()
+
+        async with reservations.lease() as lease:
+            async with lease.selecting():
+                coins = await lease.select_coins(wallet_client=wallet_client, amount=20, wallet_id=1)
+            lease.track([transaction_record(0, coins)])
+
+        # accepted by the mempool
+        wallet_client.get_transaction = mock.AsyncMock(
+            return_value=transaction_record(0, coins, sent_to=[(MempoolInclusionStatus.SUCCESS, None)])
+        )
+        assert await reservations.release_settled(wallet_client) == 0
+        assert set(reservations.excluded_coin_ids()) == {coin.name() for coin in coins}
+
+        # then removed from it for a conflicting spend
+        wallet_client.get_transaction = mock.AsyncMock(
+            return_value=transaction_record(
+                0,
+                coins,
+                sent_to=[(MempoolInclusionStatus.SUCCESS, None), (MempoolInclusionStatus.FAILED, Err.MEMPOOL_CONFLICT)],
+            )
+        )
+        clock.now = 30
+        assert await reservations.release_settled(wallet_client) == 1
+        assert reservations.excluded_coin_ids() == []
+        assert reservations.transaction_ids() == []
+
+        # the coins are spendable again long before the lease would have expired
+        async with reservations.lease() as lease:
+            assert await lease.select_coins(wallet_client=wallet_client, amount=20, wallet_id=1) == coins
+
+    @pytest.mark.anyio
+    async def test_track_releases_unspent_and_unknown_transactions_then_success(self) -> None:
+        reservations = CoinReservations(ttl=600)
+        wallet_client = fake_wallet_client()
+
+        async with reservations.lease() as lease:
+            coins = await lease.select_coins(wallet_client=wallet_client, amount=30, wallet_id=1)
+            # the last coin is not spent by the pushed transaction
+            lease.track([transaction_record(0, coins[:2])])
+
+        assert set(reservations.excluded_coin_ids()) == {coins[0].name(), coins[1].name()}
+
+        wallet_client.get_transaction = mock.AsyncMock(side_effect=ValueError("Transaction not found"))
+        assert await reservations.release_settled(wallet_client) == 1
+        assert reservations.excluded_coin_ids() == []
+
+    @pytest.mark.parametrize(
+        "confirmed, sent_to, settled",
+        [
+            (False, [], False),
+            (True, [], True),
+            (False, [(MempoolInclusionStatus.PENDING, Err.INVALID_FEE_LOW_FEE)], False),
+            (False, [(MempoolInclusionStatus.FAILED, Err.INVALID_FEE_LOW_FEE)], False),
+            (False, [(MempoolInclusionStatus.FAILED, Err.DOUBLE_SPEND)], True),
+            (False, [(MempoolInclusionStatus.FAILED, Err.DOUBLE_SPEND), (MempoolInclusionStatus.SUCCESS, None)], False),
+        ],
+    )
+    def test_is_transaction_settled_then_success(
+        self,
+        confirmed: bool,
+        sent_to: list[tuple[MempoolInclusionStatus, Optional[Err]]],
+        settled: bool,
+    ) -> None:
+        assert is_transaction_settled(transaction_record(0, [], confirmed=confirmed, sent_to=sent_to)) is settled
@@ -0,0 +1,120 @@
+from __future__ import annotations
+
+from typing import Any
+from unittest import mock
+
+import pytest
+from chia.types.blockchain_format.sized_bytes import bytes32
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app import crud, models
+from app.api.v1 import cron
+from app.config import settings
+from app.scanner import AdaptiveWindow, ScanToken
+
+
+def scan_token(index: int, **attributes: Any) -> ScanToken:
+    wallet = mock.MagicMock(tail_program_hash=bytes32([index] * 32), gateway_cat_puzzle_hash=index, **attributes)
+    return ScanToken(org_name="Org", key=f"key-{index}", wallet=wallet)
+
+
+class TestScanTokenActivity:
+    @pytest.mark.anyio
+    async def test_backfill_new_token_then_forward_scan(
+        self, db_session: AsyncSession, monkeypatch: pytest.MonkeyPatch
+    ) -> None:
+        monkeypatch.setattr(settings, "BLOCK_START", 0)
+        window = AdaptiveWindow(size=500, min_size=500, max_size=500, target_coin_records=100, target_latency=1.0)
+        monkeypatch.setattr(cron, "scan_window", window)
+        monkeypatch.setattr(settings, "MIN_DEPTH", 4)
+
+        (known, new) = (scan_token(1), scan_token(2))
+        monkeypatch.setattr(cron, "_get_scan_tokens", mock.AsyncMock(return_value=[known, new]))
+
+        db_crud = crud.DBCrud(db=db_session)
+        await db_crud.create_object(models.State(id=1, current_height=0, peak_height=1100))
+        await db_crud.update_scan_cursors(
+            asset_ids=[known.asset_id], last_scanned_height=1000, last_confirmed_height=1000
+        )
+
+        blockchain = mock.MagicMock()
+        blockchain.get_gateway_coin_records = mock.AsyncMock(return_value={})
+
+        while await cron._scan_token_activity(
+            db_crud=db_crud,
+            climate_warehouse=mock.MagicMock(),
+            blockchain=blockchain,
+        ):
+            pass
+
+        windows = [
+            (call.kwargs["start_height"], call.kwargs["end_height"], len(call.kwargs["wallets"]))
+            for call in blockchain.get_gateway_coin_records.await_args_list
+        ]
+        # the new token is backfilled alone, the known one only joins once the windows reach its cursor
+        assert windows == [(0, 500, 1), (500, 1000, 1), (1000, 1101, 2)]
+
+        cursors = await db_crud.select_scan_cursors([known.asset_id, new.asset_id])
+        assert {cursor.last_confirmed_height for cursor in cursors.values()} == {1097}
+        assert (await db_crud.select_block_state_first()).current_height == 1097
+
+        # nothing to do until the peak moves
+        assert not await cron._scan_token_activity(
+            db_crud=db_crud,
+            climate_warehouse=mock.MagicMock(),
+            blockchain=blockchain,
+        )
+
+    @pytest.mark.anyio
+    async def test_failed_fetch_keeps_cursor_then_retried_next_pass(
+        self, db_session: AsyncSession, monkeypatch: pytest.MonkeyPatch
+    ) -> None:
+        monkeypatch.setattr(settings, "BLOCK_START", 0)
+        window = AdaptiveWindow(size=500, min_size=500, max_size=500, target_coin_records=100, target_latency=1.0)
+        monkeypatch.setattr(cron, "scan_window", window)
+        monkeypatch.setattr(settings, "MIN_DEPTH", 4)
+        decoder = mock.MagicMock(decode=mock.AsyncMock(return_value=("mode", {})))
+        monkeypatch.setattr(cron, "get_gateway_decoder", lambda: decoder)
+
+        get_coin_spend = mock.AsyncMock(side_effect=[ValueError("coin spend not found"), "spend"])
+        (failing, healthy) = (scan_token(1, get_coin_spend=get_coin_spend), scan_token(2))
+        monkeypatch.setattr(cron, "_get_scan_tokens", mock.AsyncMock(return_value=[failing, healthy]))
+
+        db_crud = crud.DBCrud(db=db_session)
+        await db_crud.create_object(models.State(id=1, current_height=0, peak_height=400))
+
+        blockchain = mock.MagicMock()
+        blockchain.get_gateway_coin_records = mock.AsyncMock(return_value={1: ["coin"]})
+        blockchain.to_activity = mock.MagicMock(return_value=None)
+
+        # the pass stops at the failed window instead of moving past it
+        assert not await cron._scan_token_activity(
+            db_crud=db_crud,
+            climate_warehouse=mock.MagicMock(),
+            blockchain=blockchain,
+        )
+        cursors = await db_crud.select_scan_cursors([failing.asset_id, healthy.asset_id])
+        assert {asset_id: cursor.last_confirmed_height for (asset_id, cursor) in cursors.items()} == {
+            healthy.asset_id: 397
+        }
+        assert (await db_crud.select_block_state_first()).current_height == 0
+
+        # the next pass scans the window again for the failed token only
+        while await cron._scan_token_activity(
+            db_crud=db_crud,
+            climate_warehouse=mock.MagicMock(),
+            blockchain=blockchain,
+        ):
+            pass
+
+        windows = [
+            (call.kwargs["start_height"], call.kwargs["end_height"], len(call.kwargs["wallets"]))
+            for call in blockchain.get_gateway_coin_records.await_args_list
+        ]
+        assert windows == [(0, 401, 2), (0, 401, 1)]
+        assert get_coin_spend.await_count == 2
+        blockchain.to_activity.assert_called_once()
+
+        cursors = await db_crud.select_scan_cursors([failing.asset_id, healthy.asset_id])
+        assert {cursor.last_confirmed_height for cursor in cursors.values()} == {397}
+        assert (await db_crud.select_block_state_first()).current_height == 397
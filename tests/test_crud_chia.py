@@ -4,6 +4,11 @@ from typing import Any
 from unittest import mock
 
 import pytest
+from chia.types.blockchain_format.coin import Coin
+from chia.types.blockchain_format.sized_bytes import bytes32
+from chia.util.byte_types import hexstr_to_bytes
+from chia.util.ints import uint64
+from chia_rs import G1Element
 
 from app import crud, schemas
 
@@ -16,23 +21,27 @@ sig = (
 
 
 class TestClimateWareHouseCrud:
-    def test_combine_climate_units_and_metadata_empty_units_then_success(self, monkeypatch: pytest.MonkeyPatch) -> None:
-        mock_units = mock.MagicMock()
+    @pytest.mark.anyio
+    async def test_combine_climate_units_and_metadata_empty_units_then_success(
+        self, monkeypatch: pytest.MonkeyPatch
+    ) -> None:
+        mock_units = mock.AsyncMock()
         mock_units.return_value = []
 
         monkeypatch.setattr(crud.ClimateWareHouseCrud, "get_climate_units", mock_units)
 
-        response = crud.ClimateWareHouseCrud(url=mock.MagicMock(), api_key=None).combine_climate_units_and_metadata(
-            search={}
-        )
+        response = await crud.ClimateWareHouseCrud(
+            url=mock.MagicMock(), api_key=None
+        ).combine_climate_units_and_metadata(search={})
 
         assert len(response) == 0
 
-    def test_combine_climate_units_and_metadata_empty_projects_then_success(
+    @pytest.mark.anyio
+    async def test_combine_climate_units_and_metadata_empty_projects_then_success(
         self, monkeypatch: pytest.MonkeyPatch
     ) -> None:
-        mock_units = mock.MagicMock()
-        mock_projects = mock.MagicMock()
+        mock_units = mock.AsyncMock()
+        mock_projects = mock.AsyncMock()
         mock_units.return_value = [
             {
                 "warehouseUnitId": "a9fbe47e-d308-4c4c-8eb5-c06dd09b0716",
@@ -81,13 +90,16 @@ class TestClimateWareHouseCrud:
         monkeypatch.setattr(crud.ClimateWareHouseCrud, "get_climate_projects", mock_projects)
         monkeypatch.setattr(crud.ClimateWareHouseCrud, "get_climate_units", mock_units)
 
-        response = crud.ClimateWareHouseCrud(url=mock.MagicMock(), api_key=None).combine_climate_units_and_metadata(
-            search={}
-        )
+        response = await crud.ClimateWareHouseCrud(
+            url=mock.MagicMock(), api_key=None
+        ).combine_climate_units_and_metadata(search={})
 
         assert len(response) == 0
 
-    def test_combine_climate_units_and_metadata_empty_orgs_then_success(self, monkeypatch: pytest.MonkeyPatch) -> None:
+    @pytest.mark.anyio
+    async def test_combine_climate_units_and_metadata_empty_orgs_then_success(
+        self, monkeypatch: pytest.MonkeyPatch
+    ) -> None:
         test_response: list[dict[str, Any]] = [
             {
                 "correspondingAdjustmentDeclaration": "Committed",
@@ -182,10 +194,10 @@ class TestClimateWareHouseCrud:
             }
         ]
 
-        mock_units = mock.MagicMock()
-        mock_projects = mock.MagicMock()
-        mock_orgs = mock.MagicMock()
-        mock_org_metadata = mock.MagicMock()
+        mock_units = mock.AsyncMock()
+        mock_projects = mock.AsyncMock()
+        mock_orgs = mock.AsyncMock()
+        mock_org_metadata = mock.AsyncMock()
         mock_units.return_value = [
             {
                 "warehouseUnitId": "a9fbe47e-d308-4c4c-8eb5-c06dd09b0716",
@@ -309,13 +321,67 @@ class TestClimateWareHouseCrud:
             mock_org_metadata,
         )
 
-        response = crud.ClimateWareHouseCrud(url=mock.MagicMock(), api_key=None).combine_climate_units_and_metadata(
-            search={}
-        )
+        response = await crud.ClimateWareHouseCrud(
+            url=mock.MagicMock(), api_key=None
+        ).combine_climate_units_and_metadata(search={})
 
         print(f"EMLEML: {response}")
         assert response == test_response
 
+    @pytest.mark.anyio
+    async def test_get_paginated_data_fetches_all_pages_in_order(self, monkeypatch: pytest.MonkeyPatch) -> None:
+        async def mock_get_page(
+            self: crud.ClimateWareHouseCrud, path: str, search_params: dict[str, Any], page: int, limit: int
+        ) -> Any:
+            return {"page": page, "pageCount": 4, "data": [{"page": page}]}
+
+        monkeypatch.setattr(crud.ClimateWareHouseCrud, "_get_page", mock_get_page)
+
+        response = await crud.ClimateWareHouseCrud(url="", api_key=None)._get_paginated_data("/v1/units", {})
+
+        assert response == [{"page": 1}, {"page": 2}, {"page": 3}, {"page": 4}]
+
+    @pytest.mark.anyio
+    async def test_get_paginated_data_not_paginated_then_success(self, monkeypatch: pytest.MonkeyPatch) -> None:
+        mock_get_page = mock.AsyncMock()
+        mock_get_page.return_value = {"orgUid": "ORG_UID"}
+
+        monkeypatch.setattr(crud.ClimateWareHouseCrud, "_get_page", mock_get_page)
+
+        response = await crud.ClimateWareHouseCrud(url="", api_key=None)._get_paginated_data("/v1/units", {})
+
+        assert response == [{"orgUid": "ORG_UID"}]
+        assert mock_get_page.call_count == 1
+
+    @pytest.mark.anyio
+    async def test_get_paginated_data_null_then_empty(self, monkeypatch: pytest.MonkeyPatch) -> None:
+        mock_get_page = mock.AsyncMock()
+        mock_get_page.return_value = None
+
+        monkeypatch.setattr(crud.ClimateWareHouseCrud, "_get_page", mock_get_page)
+
+        response = await crud.ClimateWareHouseCrud(url="", api_key=None)._get_paginated_data("/v1/units", {})
+
+        assert response == []
+
+    @pytest.mark.anyio
+    async def test_get_climate_organizations_metadata_bulk_with_failure_then_partial(
+        self, monkeypatch: pytest.MonkeyPatch
+    ) -> None:
+        async def mock_org_metadata(self: crud.ClimateWareHouseCrud, org_uid: str) -> Any:
+            if org_uid == "ORG_2":
+                raise ValueError("Call Climate API Failure")
+
+            return {"key": org_uid}
+
+        monkeypatch.setattr(crud.ClimateWareHouseCrud, "get_climate_organizations_metadata", mock_org_metadata)
+
+        response = await crud.ClimateWareHouseCrud(url="", api_key=None).get_climate_organizations_metadata_bulk(
+            ["ORG_1", "ORG_2", "ORG_3"]
+        )
+
+        assert response == {"ORG_1": {"key": "ORG_1"}, "ORG_3": {"key": "ORG_3"}}
+
     def test_PermissionlessRetirementTxRequest(self) -> None:
         test_data = {
             "token": {
@@ -358,3 +424,37 @@ class TestClimateWareHouseCrud:
         }
 
         schemas.DetokenizationFileRequest.parse_obj(test_data)
+
+
+class TestBlockChainCrud:
+    @pytest.mark.anyio
+    async def test_get_gateway_coin_records_single_call_then_success(self) -> None:
+        full_node_client = mock.MagicMock()
+        blockchain = crud.BlockChainCrud(full_node_client=full_node_client)
+        wallets = [
+            blockchain.get_observer_wallet(
+                org_uid="ORG_UID",
+                warehouse_project_id="PROJECT_ID",
+                vintage_year=2050,
+                sequence_num=sequence_num,
+                public_key=G1Element.from_bytes(hexstr_to_bytes(token_pub)),
+            )
+            for sequence_num in range(3)
+        ]
+        puzzle_hashes = [wallet.gateway_cat_puzzle_hash for wallet in wallets]
+        coin_records = [
+            mock.MagicMock(coin=Coin(bytes32.zeros, puzzle_hashes[0], uint64(1))),
+            mock.MagicMock(coin=Coin(bytes32.zeros, puzzle_hashes[2], uint64(2))),
+            mock.MagicMock(coin=Coin(bytes32.zeros, puzzle_hashes[0], uint64(3))),
+        ]
+        full_node_client.get_coin_records_by_puzzle_hashes = mock.AsyncMock(return_value=coin_records)
+
+        actual = await blockchain.get_gateway_coin_records(wallets=wallets, start_height=1, end_height=10)
+
+        full_node_client.get_coin_records_by_puzzle_hashes.assert_awaited_once()
+        (_, kwargs) = full_node_client.get_coin_records_by_puzzle_hashes.call_args
+        assert set(kwargs["puzzle_hashes"]) == set(puzzle_hashes)
+        assert actual == {
+            puzzle_hashes[0]: [coin_records[0], coin_records[2]],
+            puzzle_hashes[2]: [coin_records[1]],
+        }
@@ -1,17 +1,309 @@
 from __future__ import annotations
 
+import json
+from typing import Any, ClassVar, Optional
 from unittest import mock
 
-from app.crud.db import DBCrud
+import pytest
+from fastapi import HTTPException
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy import event, func, insert, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app import models, schemas
+from app.api.v1 import activities
+from app.core.types import GatewayMode
+from app.crud.db import BulkWriteResult, DBCrud, _activity_row
 
 
 class TestUpdateBlockState:
-    def test_with_block_height_then_success(self) -> None:
-        mock_db = mock.MagicMock()
-        actual = DBCrud(db=mock_db).update_block_state(peak_height=1)
+    @pytest.mark.anyio
+    async def test_with_block_height_then_success(self) -> None:
+        mock_db = mock.AsyncMock()
+        actual = await DBCrud(db=mock_db).update_block_state(peak_height=1)
         assert actual is True
 
-    def test_with_current_height_then_success(self) -> None:
-        mock_db = mock.MagicMock()
-        actual = DBCrud(db=mock_db).update_block_state(current_height=1)
+    @pytest.mark.anyio
+    async def test_with_current_height_then_success(self) -> None:
+        mock_db = mock.AsyncMock()
+        actual = await DBCrud(db=mock_db).update_block_state(current_height=1)
         assert actual is True
+
+
+def unit(warehouse_unit_id: str, marketplace_identifier: str, serial_number: str = "1") -> dict[str, Any]:
+    return {
+        "warehouseUnitId": warehouse_unit_id,
+        "orgUid": "ORG_UID",
+        "marketplaceIdentifier": marketplace_identifier,
+        "serialNumberBlock": serial_number,
+        "issuance": {"warehouseProjectId": "PROJECT_ID"},
+    }
+
+
+class TestCadtMirror:
+    @pytest.mark.anyio
+    async def test_sync_writes_only_changes_then_success(self, db_session: AsyncSession) -> None:
+        db_crud = DBCrud(db=db_session)
+
+        assert await db_crud.sync_cadt_units([unit("1", "a"), unit("2", "b")]) == 2
+        assert await db_crud.sync_cadt_units([unit("1", "a"), unit("2", "b")]) == 0
+        # one updated, one removed
+        assert await db_crud.sync_cadt_units([unit("1", "a", serial_number="2")]) == 2
+
+        (stored,) = (await db_session.scalars(select(models.CadtUnit))).all()
+        assert stored.warehouse_unit_id == "1"
+        assert stored.data["serialNumberBlock"] == "2"
+
+    @pytest.mark.anyio
+    async def test_sync_metadata_keeps_failed_organizations_then_success(self, db_session: AsyncSession) -> None:
+        db_crud = DBCrud(db=db_session)
+        await db_crud.sync_cadt_organizations_metadata({"ORG_1": {}, "ORG_2": {}}, org_uids=["ORG_1", "ORG_2"])
+
+        # ORG_2 failed to refresh, ORG_1 no longer exists
+        assert await db_crud.sync_cadt_organizations_metadata({}, org_uids=["ORG_2"]) == 1
+        assert (await db_session.scalars(select(models.CadtOrganizationMetadata.org_uid))).all() == ["ORG_2"]
+
+    @pytest.mark.anyio
+    async def test_combine_climate_units_and_metadata_then_success(self, db_session: AsyncSession) -> None:
+        db_crud = DBCrud(db=db_session)
+        await db_crud.sync_cadt_units([unit("1", "a"), unit("2", "b")])
+        await db_crud.sync_cadt_projects([{"warehouseProjectId": "PROJECT_ID", "orgUid": "ORG_UID"}])
+        await db_crud.sync_cadt_organizations({"ORG_UID": {"orgUid": "ORG_UID", "name": "Org"}})
+        await db_crud.sync_cadt_organizations_metadata(
+            {"ORG_UID": {"meta_a": json.dumps({"index": "0x01"})}},
+            org_uids=["ORG_UID"],
+        )
+
+        actual = await db_crud.combine_climate_units_and_metadata(search={"warehouseUnitId": "1"})
+        assert actual == [
+            {
+                **unit("1", "a"),
+                "organization": {"orgUid": "ORG_UID", "name": "Org"},
+                "token": {"index": "0x01"},
+                "project": {"warehouseProjectId": "PROJECT_ID", "orgUid": "ORG_UID"},
+            }
+        ]
+
+        actual = await db_crud.combine_climate_units_and_metadata(search={"search": "project_id"})
+        assert [(unit["warehouseUnitId"], unit["token"]) for unit in actual] == [("1", {"index": "0x01"}), ("2", {})]
+        assert await db_crud.combine_climate_units_and_metadata(search={"search": "missing"}) == []
+
+    @pytest.mark.anyio
+    async def test_search_matches_decoded_values_then_success(self, db_session: AsyncSession) -> None:
+        db_crud = DBCrud(db=db_session)
+        await db_crud.sync_cadt_units(
+            [
+                {**unit("1", "a"), "unitOwner": "Société Générale"},
+                {**unit("2", "b"), "unitOwner": "Owner 100%"},
+                {**unit("3", "c"), "unitOwner": "Other_Owner"},
+            ]
+        )
+        await db_crud.sync_cadt_projects([{"warehouseProjectId": "PROJECT_ID", "orgUid": "ORG_UID"}])
+        await db_crud.sync_cadt_organizations({"ORG_UID": {"orgUid": "ORG_UID", "name": "Org"}})
+        await db_crud.sync_cadt_organizations_metadata({"ORG_UID": {}}, org_uids=["ORG_UID"])
+
+        async def search(term: str) -> list[str]:
+            units = await db_crud.combine_climate_units_and_metadata(search={"search": term})
+            return sorted(unit["warehouseUnitId"] for unit in units)
+
+        assert await search("Société") == ["1"]
+        assert await search("générale") == ["1"]
+        # key names are not searched, only the values
+        assert await search("warehouseUnitId") == []
+        assert await search("unitOwner") == []
+        # LIKE wildcards in the search are plain characters
+        assert await search("100%") == ["2"]
+        assert await search("%") == ["2"]
+        assert await search("r_o") == ["3"]
+
+
+async def insert_activities(db_session: AsyncSession, count: int) -> list[tuple[int, str]]:
+    rows: list[dict[str, Any]] = [
+        {
+            "asset_id": "abc"[index % 3],
+            "mode": "PERMISSIONLESS_RETIREMENT",
+            # several activities share a height
+            "height": index // 4,
+            "coin_id": f"0x{index:064x}",
+        }
+        for index in range(count)
+    ]
+    await db_session.execute(insert(models.Activity.__table__), rows)
+    await db_session.commit()
+
+    return [(row["height"], row["coin_id"]) for row in rows]
+
+
+class TestSelectActivityWithPagination:
+    FILTERS: ClassVar[dict[str, Any]] = {"or": [], "and": []}
+
+    @pytest.mark.anyio
+    async def test_without_count_selects_row_past_page_then_success(self, db_session: AsyncSession) -> None:
+        expected = sorted(await insert_activities(db_session, 20))
+        db_crud = DBCrud(db=db_session)
+        order_by = [models.Activity.height, models.Activity.coin_id]
+
+        (rows, total) = await db_crud.select_activity_with_pagination(
+            model=models.Activity, filters=self.FILTERS, order_by=order_by, limit=7, page=2
+        )
+        assert total == 20
+        assert [(row.height, row.coin_id) for row in rows] == expected[7:14]
+
+        # the row past the page shows another page follows, but not on the last page
+        for page, page_rows in [(2, expected[7:15]), (3, expected[14:])]:
+            (rows, total) = await db_crud.select_activity_with_pagination(
+                model=models.Activity, filters=self.FILTERS, order_by=order_by, limit=7, page=page, count=False
+            )
+            assert total is None
+            assert [(row.height, row.coin_id) for row in rows] == page_rows
+
+
+class TestSelectActivityWithCursor:
+    FILTERS: ClassVar[dict[str, Any]] = {"or": [], "and": [models.Activity.asset_id.in_(["a", "b", "c"])]}
+    KEYS: ClassVar[list[Any]] = [models.Activity.height, models.Activity.coin_id]
+
+    @pytest.mark.anyio
+    @pytest.mark.parametrize("descending", [True, False])
+    async def test_forward_then_backward_then_success(self, db_session: AsyncSession, descending: bool) -> None:
+        expected = sorted(await insert_activities(db_session, 50), reverse=descending)
+        db_crud = DBCrud(db=db_session)
+
+        pages: list[list[tuple[int, str]]] = []
+        after = None
+        has_more = True
+        while has_more:
+            (rows, has_more, total) = await db_crud.select_activity_with_cursor(
+                model=models.Activity,
+                filters=self.FILTERS,
+                keys=self.KEYS,
+                descending=descending,
+                limit=7,
+                after=after,
+            )
+            assert total == 50
+            pages.append([(row.height, row.coin_id) for row in rows])
+            after = pages[-1][-1]
+
+        assert [len(page) for page in pages] == [7] * 7 + [1]
+        assert [key for page in pages for key in page] == expected
+
+        # and back to the first page from the first row of the last one
+        before = pages[-1][0]
+        for page in reversed(pages[:-1]):
+            (rows, has_more, total) = await db_crud.select_activity_with_cursor(
+                model=models.Activity,
+                filters=self.FILTERS,
+                keys=self.KEYS,
+                descending=descending,
+                limit=7,
+                before=before,
+                count=False,
+            )
+            assert total is None
+            assert [(row.height, row.coin_id) for row in rows] == page
+            before = page[0]
+
+        assert has_more is False
+
+
+def activity(index: int, beneficiary_name: Optional[str], beneficiary_puzzle_hash: Optional[str]) -> schemas.Activity:
+    return schemas.Activity(
+        org_uid="ORG_UID",
+        warehouse_project_id="PROJECT_ID",
+        vintage_year=2050,
+        sequence_num=0,
+        asset_id=b"\x0a" * 32,
+        beneficiary_name=beneficiary_name,
+        beneficiary_address=None,
+        beneficiary_puzzle_hash=beneficiary_puzzle_hash,
+        coin_id=bytes([index]) * 32,
+        height=index,
+        amount=10,
+        mode=GatewayMode.PERMISSIONLESS_RETIREMENT,
+        metadata={},
+        timestamp=0,
+    )
+
+
+class TestActivitySearch:
+    @pytest.mark.anyio
+    @pytest.mark.parametrize(
+        "search, expected_heights",
+        [
+            ("jane", [1, 2]),
+            ("Jane Do", [1]),
+            ("doe", [1]),
+            ("Rivers-Jane", [2]),
+            ("0xe1227", [3]),
+            ("e1227", [3]),
+            ("0x", []),
+            ("%", [1, 2, 3, 4]),
+        ],
+    )
+    async def test_search_beneficiary_then_success(
+        self, db_session: AsyncSession, search: str, expected_heights: list[int]
+    ) -> None:
+        db_crud = DBCrud(db=db_session)
+        await db_crud.batch_insert_ignore_activity(
+            [
+                activity(1, "Jane Doe", None),
+                activity(2, "Jane Rivers", None),
+                activity(3, None, "0xe122763ec4076d3fa356fbff8bb63d1f9d78b52c3c577a01140cd4559ee32966"),
+                activity(4, "", None),
+            ]
+        )
+        # already indexed activities are not indexed again
+        await db_crud.batch_insert_ignore_activity([activity(1, "Jane Doe", None)])
+        assert await db_crud.index_activity_search() == 0
+
+        actual = await db_session.scalars(
+            select(models.Activity.height)
+            .where(activities._search_beneficiary_filter(search))
+            .order_by(models.Activity.height)
+        )
+
+        assert actual.all() == expected_heights
+
+
+class TestBulkInsertActivity:
+    def test_activity_row_then_success(self) -> None:
+        assert _activity_row(activity(1, "Jane Doe", "0xe1227")) == jsonable_encoder(activity(1, "Jane Doe", "0xe1227"))
+
+    @pytest.mark.anyio
+    async def test_chunks_report_inserted_and_ignored_then_success(self, db_session: AsyncSession) -> None:
+        db_crud = DBCrud(db=db_session)
+        await db_crud.batch_insert_ignore_activity([activity(1, None, None), activity(2, None, None)])
+
+        statements: list[str] = []
+        engine = db_session.bind.sync_engine
+
+        def before_cursor_execute(conn: Any, cursor: Any, statement: str, *args: Any) -> None:
+            if statement.startswith("INSERT OR IGNORE INTO activity "):
+                statements.append(statement)
+
+        event.listen(engine, "before_cursor_execute", before_cursor_execute)
+        result = await db_crud.bulk_insert_ignore_db(
+            table=models.Activity.__table__,
+            # 1 and 2 are already stored, 3 is repeated
+            rows=[_activity_row(activity(index, None, None)) for index in [1, 2, 3, 3, 4, 5, 6]],
+            chunk_size=3,
+        )
+        event.remove(engine, "before_cursor_execute", before_cursor_execute)
+
+        assert result == BulkWriteResult(inserted=4, ignored=3)
+        # one statement per chunk, whatever the number of rows
+        assert len(statements) == 3
+        assert len(set(statements)) == 1
+        assert await db_session.scalar(select(func.count(models.Activity.id))) == 6
+
+    @pytest.mark.anyio
+    async def test_failed_chunk_rolls_back_then_error(self, db_session: AsyncSession) -> None:
+        db_crud = DBCrud(db=db_session)
+        rows = [_activity_row(activity(index, None, None)) for index in range(1, 5)]
+        # not an integer primary key
+        rows[3]["id"] = "id"
+
+        with pytest.raises(HTTPException):
+            await db_crud.bulk_insert_ignore_db(table=models.Activity.__table__, rows=rows, chunk_size=1)
+
+        assert await db_session.scalar(select(func.count(models.Activity.id))) == 0
@@ -0,0 +1,224 @@
+from __future__ import annotations
+
+import asyncio
+import sqlite3
+import time
+from collections.abc import AsyncIterator
+from pathlib import Path
+from typing import Any
+
+import pytest
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, create_async_engine
+
+from app import crud, models
+from app.config import settings
+from app.db import session
+from app.db.base import Base
+
+CHALLENGE_LATENCY = 0.01
+LOCK_DURATION = 0.2
+
+
+@pytest.fixture(scope="function")
+async def challenge_calls(monkeypatch: pytest.MonkeyPatch) -> AsyncIterator[list[str]]:
+    calls: list[str] = []
+
+    async def mock_get_challenge(x: crud.BlockChainCrud) -> str:
+        # stands in for the full node round trip
+        await asyncio.sleep(CHALLENGE_LATENCY)
+        calls.append("testnet")
+        return "testnet"
+
+    monkeypatch.setattr(crud.BlockChainCrud, "get_challenge", mock_get_challenge)
+    monkeypatch.setattr(session, "_engine", None)
+    monkeypatch.setattr(session, "_async_engine", None)
+    monkeypatch.setattr(session, "_session_local", None)
+    yield calls
+    await session.dispose_engine()
+
+
+class TestSessionLocal:
+    @pytest.mark.anyio
+    async def test_engine_is_reused_then_success(self, challenge_calls: list[str]) -> None:
+        # the first calls of the startup tasks and requests all come at once
+        (engines, async_engines, session_locals) = await asyncio.gather(
+            asyncio.gather(*(session.get_engine_cls() for _ in range(5))),
+            asyncio.gather(*(session.get_async_engine_cls() for _ in range(5))),
+            asyncio.gather(*(session.get_session_local_cls() for _ in range(5))),
+        )
+
+        assert len(challenge_calls) == 1
+        assert all(engine is engines[0] for engine in engines)
+        assert all(async_engine is async_engines[0] for async_engine in async_engines)
+        assert all(session_local is session_locals[0] for session_local in session_locals)
+        assert session_locals[0].kw["bind"] is async_engines[0]
+        assert async_engines[0].sync_engine.url.database == engines[0].url.database
+
+    @pytest.mark.anyio
+    async def test_session_local_created_once_then_success(self, challenge_calls: list[str]) -> None:
+        session_local = await session.get_session_local_cls()
+        for _ in range(100):
+            assert await session.get_session_local_cls() is session_local
+
+        # only the first request pays for the challenge round trip and the engine creation
+        assert len(challenge_calls) == 1
+
+
+class TestAsyncSession:
+    @pytest.mark.anyio
+    async def test_locked_database_does_not_block_loop_then_success(self, tmp_path: Path) -> None:
+        db_path = tmp_path / "explorer.sqlite"
+        engine = create_async_engine(f"sqlite+aiosqlite:///{db_path}", connect_args={"timeout": 15})
+        async with engine.begin() as connection:
+            await connection.run_sync(Base.metadata.create_all)
+
+        # e.g. the scanner committing a large batch
+        writer = sqlite3.connect(db_path)
+        writer.execute("BEGIN IMMEDIATE")
+
+        async def commit_later() -> None:
+            await asyncio.sleep(LOCK_DURATION)
+            writer.commit()
+
+        ticks = 0
+
+        async def tick() -> None:
+            nonlocal ticks
+            while True:
+                await asyncio.sleep(LOCK_DURATION / 20)
+                ticks += 1
+
+        ticker = asyncio.create_task(tick())
+        start = time.perf_counter()
+        async with AsyncSession(engine) as db:
+            await asyncio.gather(
+                commit_later(),
+                crud.DBCrud(db=db).update_scan_cursors(["asset"], last_scanned_height=1, last_confirmed_height=1),
+            )
+        elapsed = time.perf_counter() - start
+        ticker.cancel()
+        writer.close()
+        await engine.dispose()
+
+        # the loop kept serving other tasks while the update waited for the lock
+        assert elapsed >= LOCK_DURATION
+        assert ticks >= 10
+
+
+async def create_test_engine(db_path: Path, pragmas: dict[str, Any]) -> AsyncEngine:
+    engine = create_async_engine(f"sqlite+aiosqlite:///{db_path}")
+    session.set_sqlite_pragmas(engine.sync_engine, pragmas)
+    async with engine.begin() as connection:
+        await connection.run_sync(Base.metadata.create_all)
+    return engine
+
+
+def activity_rows(batch: int, batch_size: int) -> list[dict[str, Any]]:
+    return [
+        {"asset_id": "a", "height": batch, "coin_id": f"0x{batch:032x}{index:032x}", "beneficiary_name": "x" * 64}
+        for index in range(batch_size)
+    ]
+
+
+async def read_totals_during_backfill(
+    writer_engine: AsyncEngine, reader_engine: AsyncEngine, batches: int, batch_size: int
+) -> list[list[int]]:
+    """Activity counts read by two readers while activities are backfilled in batches.
+
+    Each read is its own transaction, and every reader reads once more after the backfill.
+    """
+
+    done = asyncio.Event()
+    totals_by_reader: list[list[int]] = [[], []]
+
+    async def write() -> None:
+        async with AsyncSession(writer_engine) as db:
+            for batch in range(batches):
+                await crud.DBCrud(db=db).bulk_insert_ignore_db(
+                    models.Activity.__table__, activity_rows(batch, batch_size)
+                )
+        done.set()
+
+    async def read(totals: list[int]) -> None:
+        # a connection kept open like the pool of the service does, each read in its own transaction
+        async with reader_engine.connect() as connection:
+            while True:
+                last = done.is_set()
+                async with AsyncSession(bind=connection) as db:
+                    (_, total) = await crud.DBCrud(db=db).select_activity_with_pagination(
+                        model=models.Activity,
+                        filters={"or": [], "and": [models.Activity.asset_id == "a"]},
+                        order_by=[models.Activity.height.desc(), models.Activity.coin_id.desc()],
+                        limit=10,
+                        page=1,
+                    )
+                totals.append(total or 0)
+                if last:
+                    break
+
+    await asyncio.gather(write(), *(read(totals) for totals in totals_by_reader))
+    return totals_by_reader
+
+
+class TestSqlitePragmas:
+    @pytest.mark.anyio
+    async def test_pragmas_applied_then_success(self, tmp_path: Path) -> None:
+        engine = await create_test_engine(tmp_path / "explorer.sqlite", session.get_sqlite_pragmas())
+
+        async with engine.connect() as connection:
+            for name, expected in [
+                ("journal_mode", "wal"),
+                # NORMAL
+                ("synchronous", 1),
+                ("busy_timeout", settings.DB_BUSY_TIMEOUT),
+                ("cache_size", settings.DB_CACHE_SIZE),
+                # MEMORY
+                ("temp_store", 2),
+            ]:
+                assert await connection.scalar(text(f"PRAGMA {name}")) == expected
+        await engine.dispose()
+
+    @pytest.mark.anyio
+    async def test_read_during_write_transaction_then_success(self, tmp_path: Path) -> None:
+        db_path = tmp_path / "explorer.sqlite"
+        # a reader kept out by the writer fails right away instead of waiting for it
+        engine = await create_test_engine(db_path, {**session.get_sqlite_pragmas(), "busy_timeout": 0})
+
+        # a writer in the middle of committing, which keeps readers out of a rollback journal database
+        writer = sqlite3.connect(db_path)
+        writer.execute("BEGIN EXCLUSIVE")
+        writer.executemany(
+            "INSERT INTO activity (asset_id, height, coin_id) VALUES (?, ?, ?)",
+            [(row["asset_id"], row["height"], row["coin_id"]) for row in activity_rows(0, 100)],
+        )
+
+        async with AsyncSession(engine) as db:
+            (activities, total) = await crud.DBCrud(db=db).select_activity_with_pagination(
+                model=models.Activity, filters={"or": [], "and": []}, order_by=[models.Activity.id]
+            )
+        writer_in_transaction = writer.in_transaction
+
+        writer.rollback()
+        writer.close()
+        await engine.dispose()
+
+        # the last commit is read while the writer still holds its transaction
+        assert writer_in_transaction
+        assert (activities, total) == ([], 0)
+
+    @pytest.mark.anyio
+    async def test_reads_during_backfill_see_whole_batches_then_success(self, tmp_path: Path) -> None:
+        db_path = tmp_path / "explorer.sqlite"
+        writer_engine = await create_test_engine(db_path, session.get_sqlite_pragmas())
+        # a reader kept out by the writer fails right away instead of waiting for it
+        reader_engine = await create_test_engine(db_path, {**session.get_sqlite_pragmas(), "busy_timeout": 0})
+        totals_by_reader = await read_totals_during_backfill(writer_engine, reader_engine, batches=5, batch_size=50)
+        await writer_engine.dispose()
+        await reader_engine.dispose()
+
+        # every read went through while batches were written, and only saw committed batches
+        for totals in totals_by_reader:
+            assert all(total % 50 == 0 for total in totals)
+            assert totals == sorted(totals)
+            assert totals[-1] == 250
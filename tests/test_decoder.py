@@ -0,0 +1,52 @@
+from __future__ import annotations
+
+from collections.abc import Callable
+from concurrent.futures import Executor, Future
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any
+
+import pytest
+from chia.types.coin_spend import CoinSpend
+
+from app.core.types import GatewayMode
+from app.decoder import GatewayDecoder
+
+EXPECTED = (
+    GatewayMode.PERMISSIONLESS_RETIREMENT,
+    {"bn": "Beneficiary", "ba": "xch1address", "bp": "0x04040404"},
+)
+
+
+class BrokenExecutor(Executor):
+    def submit(self, fn: Callable[..., Any], /, *args: Any, **kwargs: Any) -> Future[Any]:
+        future: Future[Any] = Future()
+        future.set_exception(BrokenProcessPool("worker died"))
+        return future
+
+
+class TestGatewayDecoder:
+    @pytest.mark.anyio
+    async def test_decode_inline_then_success(self, gateway_coin_spend: CoinSpend) -> None:
+        decoder = GatewayDecoder(workers=0)
+
+        assert await decoder.decode(gateway_coin_spend) == EXPECTED
+        assert decoder.executor is None
+
+    @pytest.mark.anyio
+    async def test_decode_process_pool_then_success(self, gateway_coin_spend: CoinSpend) -> None:
+        decoder = GatewayDecoder(workers=1)
+        try:
+            assert await decoder.decode(gateway_coin_spend) == EXPECTED
+            assert decoder.executor is not None
+        finally:
+            decoder.close()
+
+    @pytest.mark.anyio
+    async def test_decode_broken_pool_then_inline(self, gateway_coin_spend: CoinSpend) -> None:
+        decoder = GatewayDecoder(workers=1)
+        decoder._executor = BrokenExecutor()  # type: ignore[assignment]
+
+        assert await decoder.decode(gateway_coin_spend) == EXPECTED
+        # the pool is not started again after breaking
+        assert decoder.executor is None
+        assert await decoder.decode(gateway_coin_spend) == EXPECTED
@@ -0,0 +1,55 @@
+from __future__ import annotations
+
+from pathlib import Path
+from unittest import mock
+
+import pytest
+from chia.rpc.full_node_rpc_client import FullNodeRpcClient
+
+from app.api import dependencies as deps
+
+
+@pytest.fixture(scope="function")
+def created_clients(monkeypatch: pytest.MonkeyPatch) -> list[mock.MagicMock]:
+    clients: list[mock.MagicMock] = []
+
+    def new_client(**kwargs: object) -> mock.MagicMock:
+        client = mock.MagicMock()
+        client.healthz = mock.AsyncMock(return_value={"success": True})
+        client.await_closed = mock.AsyncMock()
+        clients.append(client)
+        return client
+
+    monkeypatch.setattr(FullNodeRpcClient, "create", mock.AsyncMock(side_effect=new_client))
+    monkeypatch.setattr(deps, "load_config", mock.MagicMock(return_value={}))
+    return clients
+
+
+class TestRpcClientPool:
+    @pytest.mark.anyio
+    async def test_client_is_reused_then_success(self, created_clients: list[mock.MagicMock]) -> None:
+        pool = deps.RpcClientPool(root_path=Path("root"), health_check_interval=60)
+
+        first = await pool.get(deps.NodeType.FULL_NODE, self_hostname="localhost", rpc_port=8555)
+        second = await pool.get(deps.NodeType.FULL_NODE, self_hostname="localhost", rpc_port=8555)
+
+        assert first is second
+        assert len(created_clients) == 1
+        created_clients[0].healthz.assert_not_awaited()
+
+        await pool.close()
+        created_clients[0].close.assert_called_once()
+
+    @pytest.mark.anyio
+    async def test_unhealthy_client_is_recreated_then_success(self, created_clients: list[mock.MagicMock]) -> None:
+        pool = deps.RpcClientPool(root_path=Path("root"), health_check_interval=60)
+
+        first = await pool.get(deps.NodeType.FULL_NODE, self_hostname="localhost", rpc_port=8555)
+        created_clients[0].healthz.side_effect = ConnectionError("full node restarted")
+        pool.mark_unhealthy(deps.NodeType.FULL_NODE)
+
+        second = await pool.get(deps.NodeType.FULL_NODE, self_hostname="localhost", rpc_port=8555)
+
+        assert second is not first
+        assert len(created_clients) == 2
+        created_clients[0].close.assert_called_once()
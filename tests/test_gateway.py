@@ -0,0 +1,147 @@
+from __future__ import annotations
+
+from typing import Any, Optional
+from unittest import mock
+
+import pytest
+from chia.types.blockchain_format.coin import Coin
+from chia.types.blockchain_format.program import Program
+from chia.types.blockchain_format.sized_bytes import bytes32
+from chia.types.coin_spend import CoinSpend, make_spend
+from chia.types.condition_opcodes import ConditionOpcode
+from chia.util.ints import uint64
+from chia.wallet.cat_wallet.cat_utils import CAT_MOD, construct_cat_puzzle
+from chia_rs import G1Element
+
+from app.core.chialisp.gateway import (
+    extract_gateway_activity,
+    extract_gateway_spend,
+    parse_gateway_metadata,
+    parse_gateway_spend,
+)
+from app.core.chialisp.tail import create_tail_program
+from app.core.climate_wallet.wallet_utils import create_gateway_request_and_spend
+from app.core.types import ClimateTokenIndex, GatewayMode
+
+ORIGIN_COIN = Coin(bytes32(b"\x01" * 32), bytes32(b"\x02" * 32), uint64(1_000))
+PUZZLE_HASH = bytes32(b"\x03" * 32)
+KEY_VALUE_PAIRS = [("bn", "Beneficiary"), ("ba", "xch1address"), ("bp", b"\x04" * 4)]
+
+
+def gateway_spend(
+    token_index: ClimateTokenIndex,
+    mode: GatewayMode,
+    key_value_pairs: Optional[list[tuple[Any, Any]]] = None,
+) -> CoinSpend:
+    (_, coin_spend) = create_gateway_request_and_spend(
+        mode=mode,
+        origin_coin=ORIGIN_COIN,
+        amount=uint64(10),
+        tail_program=create_tail_program(public_key=G1Element(), index=Program.to(token_index.name())),
+        public_key=G1Element(),
+        from_puzzle_hash=None if mode == GatewayMode.TOKENIZATION else PUZZLE_HASH,
+        to_puzzle_hash=PUZZLE_HASH if mode == GatewayMode.TOKENIZATION else None,
+        key_value_pairs=key_value_pairs,
+    )
+    return coin_spend
+
+
+def inner_spend(coin_spend: CoinSpend) -> CoinSpend:
+    (_, puzzle_args) = coin_spend.puzzle_reveal.to_program().uncurry()
+    return make_spend(
+        coin=coin_spend.coin,
+        puzzle_reveal=puzzle_args.at("rrf"),
+        solution=coin_spend.solution.to_program().at("f"),
+    )
+
+
+def replace_inner_puzzle(coin_spend: CoinSpend, inner_puzzle: Program, inner_solution: Program) -> CoinSpend:
+    (_, puzzle_args) = coin_spend.puzzle_reveal.to_program().uncurry()
+    puzzle = construct_cat_puzzle(CAT_MOD, bytes32(puzzle_args.at("rf").as_atom()), inner_puzzle)
+    solution = coin_spend.solution.to_program()
+    return make_spend(
+        coin=Coin(coin_spend.coin.parent_coin_info, puzzle.get_tree_hash(), uint64(coin_spend.coin.amount)),
+        puzzle_reveal=puzzle,
+        solution=Program.to([inner_solution, *list(solution.as_iter())[1:]]),
+    )
+
+
+class TestExtractGatewaySpend:
+    @pytest.mark.parametrize(
+        "mode, key_value_pairs",
+        [
+            (GatewayMode.TOKENIZATION, None),
+            (GatewayMode.TOKENIZATION, KEY_VALUE_PAIRS),
+            (GatewayMode.DETOKENIZATION, None),
+            (GatewayMode.PERMISSIONLESS_RETIREMENT, KEY_VALUE_PAIRS),
+            (GatewayMode.PERMISSIONLESS_RETIREMENT, [("bn", "")]),
+        ],
+    )
+    def test_cat_spend_matches_puzzle_run_then_success(
+        self,
+        token_index: ClimateTokenIndex,
+        mode: GatewayMode,
+        key_value_pairs: Optional[list[tuple[Any, Any]]],
+    ) -> None:
+        coin_spend = gateway_spend(token_index=token_index, mode=mode, key_value_pairs=key_value_pairs)
+
+        result = extract_gateway_spend(coin_spend=coin_spend, is_cat=True)
+
+        assert result == parse_gateway_spend(coin_spend=coin_spend, is_cat=True)
+        assert result[0] == mode
+        assert extract_gateway_activity(coin_spend=coin_spend) == (mode, parse_gateway_metadata(tail_spend=result[1]))
+
+    @pytest.mark.parametrize("mode", list(GatewayMode))
+    def test_inner_spend_matches_puzzle_run_then_success(
+        self, token_index: ClimateTokenIndex, mode: GatewayMode
+    ) -> None:
+        coin_spend = inner_spend(gateway_spend(token_index=token_index, mode=mode, key_value_pairs=KEY_VALUE_PAIRS))
+
+        result = extract_gateway_spend(coin_spend=coin_spend, is_cat=False)
+
+        assert result == parse_gateway_spend(coin_spend=coin_spend, is_cat=False)
+        assert result[0] == mode
+
+    def test_other_inner_puzzle_runs_puzzle_then_success(self, gateway_coin_spend: CoinSpend) -> None:
+        inner_solution = inner_spend(gateway_coin_spend).solution.to_program()
+        # `1` returns its solution as conditions, so it is not the gateway but yields the same tail
+        coin_spend = replace_inner_puzzle(gateway_coin_spend, Program.to(1), inner_solution.at("f"))
+
+        result = extract_gateway_spend(coin_spend=coin_spend, is_cat=True)
+
+        assert result == parse_gateway_spend(coin_spend=coin_spend, is_cat=True)
+        assert result[0] == GatewayMode.PERMISSIONLESS_RETIREMENT
+
+    def test_other_tail_then_error(self, gateway_coin_spend: CoinSpend) -> None:
+        inner_solution = inner_spend(gateway_coin_spend).solution.to_program()
+        (tail_condition, *conditions) = inner_solution.at("f").as_iter()
+        # `1` is not the delegated tail
+        other_tail = Program.to(1)
+        coin_spend = replace_inner_puzzle(
+            gateway_coin_spend,
+            inner_spend(gateway_coin_spend).puzzle_reveal.to_program(),
+            Program.to([[[*list(tail_condition.as_iter())[:3], other_tail, tail_condition.at("rrrrf")], *conditions]]),
+        )
+
+        for parse in (extract_gateway_spend, parse_gateway_spend):
+            with pytest.raises(ValueError, match="invalid!"):
+                parse(coin_spend=coin_spend, is_cat=True)
+
+    def test_no_tail_then_error(self, gateway_coin_spend: CoinSpend) -> None:
+        conditions = Program.to([[ConditionOpcode.CREATE_COIN, PUZZLE_HASH, 10]])
+        coin_spend = replace_inner_puzzle(
+            gateway_coin_spend,
+            inner_spend(gateway_coin_spend).puzzle_reveal.to_program(),
+            Program.to([conditions]),
+        )
+
+        for parse in (extract_gateway_spend, parse_gateway_spend):
+            with pytest.raises(ValueError, match="No TAIL found!"):
+                parse(coin_spend=coin_spend, is_cat=True)
+
+    def test_extract_skips_puzzle_run_then_success(self, gateway_coin_spend: CoinSpend) -> None:
+        # the saving is mostly the serialization of the whole tail to run the gateway puzzle, which is skipped
+        with mock.patch.object(Program, "run", autospec=True, side_effect=Program.run) as program_run:
+            extract_gateway_activity(coin_spend=gateway_coin_spend)
+
+        program_run.assert_not_called()
@@ -0,0 +1,28 @@
+from __future__ import annotations
+
+import fastapi
+from fastapi.testclient import TestClient
+
+from app.metrics import Metrics
+
+
+class TestMetrics:
+    def test_snapshot_then_success(self) -> None:
+        metrics = Metrics()
+        metrics.set("gauge", 5)
+        metrics.inc("counter")
+        metrics.inc("counter", 2)
+        metrics.register("collected", lambda: {"size": 1})
+
+        assert metrics.snapshot() == {"gauge": 5, "counter": 3, "collected": {"size": 1}}
+
+    def test_metrics_endpoint_then_success(self, fastapi_client: TestClient) -> None:
+        response = fastapi_client.get("v1/metrics")
+
+        assert response.status_code == fastapi.status.HTTP_200_OK
+        assert set(response.json()["cadt_caches"]) == {
+            "cadt_units",
+            "cadt_projects",
+            "cadt_organizations",
+            "cadt_organizations_metadata",
+        }
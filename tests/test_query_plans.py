@@ -0,0 +1,282 @@
+from __future__ import annotations
+
+import re
+from collections.abc import Iterator
+from typing import Any, Optional
+from unittest import mock
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import create_engine, event, func, insert, inspect, select, text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app import models, schemas
+from app.api.v1 import activities
+from app.core.types import GatewayMode
+from app.crud.db import DBCrud
+from app.db.base import Base
+from app.db.migrations import ensure_activity_search, ensure_indexes, update_statistics
+
+ACTIVITY_INDEXES = {"ix_activity_asset_id_mode_height", "ix_activity_height_coin_id"}
+# a plan step reading every row of the activity table, rather than searching an index
+TABLE_SCAN = re.compile(r"SCAN (TABLE )?activity( AS \w+)?")
+
+
+@pytest.fixture(scope="function")
+def statements(db_session: AsyncSession) -> Iterator[list[tuple[str, Any]]]:
+    statements: list[tuple[str, Any]] = []
+
+    def before_cursor_execute(conn: Any, cursor: Any, statement: str, parameters: Any, *args: Any) -> None:
+        if statement.lstrip().upper().startswith("SELECT"):
+            statements.append((statement, parameters))
+
+    engine = db_session.bind.sync_engine
+    event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    yield statements
+    event.remove(engine, "before_cursor_execute", before_cursor_execute)
+
+
+async def query_plan(db_session: AsyncSession, statement: str, parameters: Any) -> list[str]:
+    connection = await db_session.connection()
+    return [row[3] for row in await connection.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters)]
+
+
+async def assert_no_table_scan(db_session: AsyncSession, statements: list[tuple[str, Any]]) -> None:
+    activity_statements = [(statement, parameters) for (statement, parameters) in statements if "activity" in statement]
+    assert len(activity_statements) > 0
+
+    for statement, parameters in activity_statements:
+        plan = await query_plan(db_session, statement, parameters)
+        assert not any(TABLE_SCAN.fullmatch(step) for step in plan), (statement, plan)
+
+
+def climate_data(asset_ids: list[str]) -> list[dict[str, Any]]:
+    return [{"marketplaceIdentifier": asset_id, "warehouseUnitId": asset_id} for asset_id in asset_ids]
+
+
+class TestActivityQueryPlans:
+    @pytest.mark.anyio
+    @pytest.mark.parametrize(
+        "search_by, search, min_height, mode, sort",
+        [
+            (None, None, None, None, "desc"),
+            (None, None, None, None, "asc"),
+            (None, None, 100, None, "desc"),
+            (None, None, None, GatewayMode.PERMISSIONLESS_RETIREMENT, "desc"),
+            (None, None, 100, GatewayMode.TOKENIZATION, "asc"),
+            (schemas.ActivitySearchBy.ONCHAIN_METADATA, "name", None, None, "desc"),
+        ],
+    )
+    async def test_get_activity_uses_indexes_then_success(
+        self,
+        db_session: AsyncSession,
+        statements: list[tuple[str, Any]],
+        monkeypatch: pytest.MonkeyPatch,
+        search_by: Optional[schemas.ActivitySearchBy],
+        search: Optional[str],
+        min_height: Optional[int],
+        mode: Optional[GatewayMode],
+        sort: str,
+    ) -> None:
+        combine = mock.AsyncMock(return_value=climate_data(["a", "b", "c"]))
+        monkeypatch.setattr(activities, "_combine_climate_units_and_metadata", combine)
+
+        await activities.get_activity(
+            search=search,
+            search_by=search_by,
+            min_height=min_height,
+            mode=mode,
+            page=3,
+            limit=10,
+            org_uid=None,
+            sort=sort,
+            db=db_session,
+        )
+
+        await assert_no_table_scan(db_session, statements)
+
+    @pytest.mark.anyio
+    async def test_get_activity_page_without_total_skips_count_then_success(
+        self,
+        db_session: AsyncSession,
+        statements: list[tuple[str, Any]],
+        monkeypatch: pytest.MonkeyPatch,
+    ) -> None:
+        combine = mock.AsyncMock(return_value=climate_data(["a", "b", "c"]))
+        monkeypatch.setattr(activities, "_combine_climate_units_and_metadata", combine)
+
+        response = await activities.get_activity(
+            search=None,
+            search_by=None,
+            min_height=None,
+            mode=None,
+            page=3,
+            limit=10,
+            org_uid=None,
+            sort="desc",
+            cursor=None,
+            include_total=False,
+            db=db_session,
+        )
+
+        assert response.total is None
+        assert not any("count(" in statement.lower() for (statement, _) in statements), statements
+
+    @pytest.mark.anyio
+    @pytest.mark.parametrize("direction", [activities._CURSOR_NEXT, activities._CURSOR_PREV])
+    @pytest.mark.parametrize("sort", ["desc", "asc"])
+    async def test_get_activity_with_cursor_uses_indexes_then_success(
+        self,
+        db_session: AsyncSession,
+        statements: list[tuple[str, Any]],
+        monkeypatch: pytest.MonkeyPatch,
+        direction: str,
+        sort: str,
+    ) -> None:
+        combine = mock.AsyncMock(return_value=climate_data(["a", "b", "c"]))
+        monkeypatch.setattr(activities, "_combine_climate_units_and_metadata", combine)
+        cursor = activities._encode_cursor(direction, models.Activity(height=100, coin_id="0x" + "01" * 32))
+
+        await activities.get_activity(
+            search=None,
+            search_by=None,
+            min_height=None,
+            mode=None,
+            page=1,
+            limit=10,
+            org_uid=None,
+            sort=sort,
+            cursor=cursor,
+            include_total=False,
+            db=db_session,
+        )
+
+        await assert_no_table_scan(db_session, statements)
+
+    @pytest.mark.anyio
+    async def test_cursor_page_walks_listing_order_then_success(
+        self,
+        db_session: AsyncSession,
+        statements: list[tuple[str, Any]],
+    ) -> None:
+        await db_session.execute(
+            insert(models.Activity.__table__),
+            [
+                {"asset_id": "abc"[index % 3], "height": index // 4, "coin_id": f"0x{index:064x}"}
+                for index in range(3_000)
+            ],
+        )
+        await db_session.commit()
+        await db_session.run_sync(lambda session: update_statistics(session.get_bind()))
+        statements.clear()
+
+        await DBCrud(db=db_session).select_activity_with_cursor(
+            model=models.Activity,
+            filters={"or": [], "and": [models.Activity.asset_id.in_(["a", "b", "c"])]},
+            keys=[models.Activity.height, models.Activity.coin_id],
+            descending=True,
+            limit=10,
+            after=(500, f"0x{2_000:064x}"),
+            count=False,
+        )
+
+        ((statement, parameters),) = statements
+        plan = await query_plan(db_session, statement, parameters)
+        # the page is read in order from the cursor on, so deep pages cost the same as the first
+        assert any("ix_activity_height_coin_id" in step for step in plan), plan
+        assert not any("TEMP B-TREE" in step for step in plan), plan
+
+    @pytest.mark.anyio
+    @pytest.mark.parametrize("cursor", ["", "not a cursor", "WzEsMiwzXQ"])
+    async def test_get_activity_invalid_cursor_then_error(
+        self,
+        db_session: AsyncSession,
+        monkeypatch: pytest.MonkeyPatch,
+        cursor: str,
+    ) -> None:
+        combine = mock.AsyncMock(return_value=climate_data(["a"]))
+        monkeypatch.setattr(activities, "_combine_climate_units_and_metadata", combine)
+
+        with pytest.raises(HTTPException) as e:
+            await activities.get_activity(
+                search=None,
+                search_by=None,
+                min_height=None,
+                mode=None,
+                page=1,
+                limit=10,
+                org_uid=None,
+                sort="desc",
+                cursor=cursor,
+                db=db_session,
+            )
+
+        assert e.value.status_code == 400
+
+    @pytest.mark.anyio
+    async def test_get_activity_by_cw_unit_id_uses_indexes_then_success(
+        self,
+        db_session: AsyncSession,
+        statements: list[tuple[str, Any]],
+        monkeypatch: pytest.MonkeyPatch,
+    ) -> None:
+        combine = mock.AsyncMock(return_value=climate_data(["a"]))
+        monkeypatch.setattr(activities, "_combine_climate_units_and_metadata", combine)
+
+        await activities.get_activity_by_cw_unit_id(
+            cw_unit_id="a",
+            coin_id="coin",
+            action_mode=GatewayMode.PERMISSIONLESS_RETIREMENT.name,
+            db=db_session,
+        )
+
+        await assert_no_table_scan(db_session, statements)
+
+    @pytest.mark.anyio
+    async def test_mode_filter_matches_stored_mode_then_success(self, db_session: AsyncSession) -> None:
+        activity = schemas.Activity(
+            org_uid="ORG_UID",
+            warehouse_project_id="PROJECT_ID",
+            vintage_year=2050,
+            sequence_num=0,
+            asset_id=b"\x0a" * 32,
+            beneficiary_name=None,
+            beneficiary_address=None,
+            beneficiary_puzzle_hash=None,
+            coin_id=b"\x0c" * 32,
+            height=1,
+            amount=10,
+            mode=GatewayMode.PERMISSIONLESS_RETIREMENT,
+            metadata={},
+            timestamp=0,
+        )
+        await DBCrud(db=db_session).create_activity(activity)
+
+        count = await db_session.scalar(
+            select(func.count()).where(models.Activity.mode == GatewayMode.PERMISSIONLESS_RETIREMENT.name)
+        )
+        assert count == 1
+
+
+class TestEnsureIndexes:
+    def test_missing_indexes_created_then_success(self) -> None:
+        engine = create_engine("sqlite://")
+        Base.metadata.create_all(engine)
+        with engine.begin() as connection:
+            for name in ACTIVITY_INDEXES:
+                connection.execute(text(f"DROP INDEX {name}"))
+
+        assert set(ensure_indexes(engine)) == ACTIVITY_INDEXES
+        assert ACTIVITY_INDEXES <= {index["name"] for index in inspect(engine).get_indexes("activity")}
+        assert ensure_indexes(engine) == []
+
+    def test_missing_activity_search_created_then_success(self) -> None:
+        engine = create_engine("sqlite://")
+        Base.metadata.create_all(engine)
+        with engine.begin() as connection:
+            connection.execute(text("DROP TABLE activity_search"))
+
+        ensure_activity_search(engine)
+        ensure_activity_search(engine)
+
+        assert "activity_search" in inspect(engine).get_table_names()
@@ -0,0 +1,137 @@
+from __future__ import annotations
+
+import asyncio
+from typing import Any, Optional
+from unittest import mock
+
+import pytest
+
+from app.crud.db import BulkWriteResult
+from app.metrics import metrics
+from app.scanner import ActivityScanner, AdaptiveWindow, ScanToken
+
+
+def scan_token(index: int, wallet: Any = None) -> ScanToken:
+    wallet = wallet or mock.MagicMock()
+    wallet.gateway_cat_puzzle_hash = index
+    return ScanToken(org_name="Org", key=f"key-{index}", wallet=wallet)
+
+
+def blockchain_mock(coin_records_by_puzzle_hash: dict[int, list[str]]) -> mock.MagicMock:
+    blockchain = mock.MagicMock()
+    blockchain.get_gateway_coin_records = mock.AsyncMock(return_value=coin_records_by_puzzle_hash)
+    blockchain.to_activity = to_activity
+    return blockchain
+
+
+def to_activity(wallet: Any, activity_obj: dict[str, Any], peak_height: int) -> Optional[str]:
+    coin_spend: str = activity_obj["coin_spend"]
+    # spends of token 5 are not deep enough yet
+    return None if coin_spend.startswith("spend-5") else f"activity-{coin_spend}"
+
+
+def decoder_mock() -> mock.MagicMock:
+    return mock.MagicMock(decode=mock.AsyncMock(return_value=("mode", {})))
+
+
+class TestActivityScanner:
+    @pytest.mark.anyio
+    async def test_scan_pipeline_bounded_fetches_batched_writes_then_success(self) -> None:
+        in_flight = 0
+        max_in_flight = 0
+
+        async def get_coin_spend(coin_record: str) -> str:
+            nonlocal in_flight, max_in_flight
+            in_flight += 1
+            max_in_flight = max(max_in_flight, in_flight)
+            await asyncio.sleep(0.001)
+            in_flight -= 1
+            if coin_record == "coin-3-0":
+                raise ValueError("coin spend not found")
+            return coin_record.replace("coin", "spend")
+
+        tokens = [scan_token(index, mock.MagicMock(get_coin_spend=get_coin_spend)) for index in range(10)]
+        # token 9 has no coin records in the window
+        blockchain = blockchain_mock({index: [f"coin-{index}-0", f"coin-{index}-1"] for index in range(9)})
+        batches: list[list[str]] = []
+
+        async def batch_insert_ignore_activity(batch: list[str]) -> BulkWriteResult:
+            batches.append(batch)
+            # an activity of the first batch is already stored
+            ignored = 1 if len(batches) == 1 else 0
+            return BulkWriteResult(inserted=len(batch) - ignored, ignored=ignored)
+
+        db_crud = mock.MagicMock(batch_insert_ignore_activity=batch_insert_ignore_activity)
+        fetch_errors = metrics.get("scan_fetch_errors") or 0
+        fetch_items = metrics.get("scan_fetch_items") or 0
+        write_ignored = metrics.get("scan_write_ignored") or 0
+
+        scanner = ActivityScanner(
+            db_crud=db_crud,
+            blockchain=blockchain,
+            decoder=decoder_mock(),
+            fetch_workers=3,
+            decode_workers=2,
+            batch_size=5,
+            queue_size=2,
+        )
+        result = await scanner.scan(tokens=tokens, start_height=1, end_height=10, peak_height=20)
+
+        blockchain.get_gateway_coin_records.assert_awaited_once()
+        assert max_in_flight == 3
+        assert result.coin_records == 18
+        assert result.written == 14
+        assert [len(batch) for batch in batches] == [5, 5, 5]
+        assert sorted(activity for batch in batches for activity in batch) == sorted(
+            f"activity-spend-{index}-{n}" for index in range(9) for n in range(2) if index != 5 and (index, n) != (3, 0)
+        )
+        # the token whose coin spend was not found has to scan the window again
+        assert result.failed_asset_ids == {tokens[3].asset_id}
+        assert metrics.get("scan_fetch_errors") == fetch_errors + 1
+        assert metrics.get("scan_fetch_items") == fetch_items + 17
+        assert metrics.get("scan_write_ignored") == write_ignored + 1
+
+    @pytest.mark.anyio
+    async def test_scan_write_failure_then_error(self) -> None:
+        wallet = mock.MagicMock(get_coin_spend=mock.AsyncMock(return_value="spend"))
+        blockchain = blockchain_mock({0: ["coin"] * 10, 1: ["coin"] * 10})
+        db_crud = mock.MagicMock(
+            batch_insert_ignore_activity=mock.AsyncMock(side_effect=RuntimeError("database is locked"))
+        )
+
+        scanner = ActivityScanner(
+            db_crud=db_crud,
+            blockchain=blockchain,
+            decoder=decoder_mock(),
+            fetch_workers=2,
+            decode_workers=2,
+            batch_size=1,
+            queue_size=1,
+        )
+
+        with pytest.raises(RuntimeError, match="database is locked"):
+            await scanner.scan(
+                tokens=[scan_token(0, wallet), scan_token(1, wallet)],
+                start_height=1,
+                end_height=10,
+                peak_height=20,
+            )
+
+
+class TestAdaptiveWindow:
+    def test_window_grows_when_sparse_and_shrinks_when_dense(self) -> None:
+        window = AdaptiveWindow(size=1_000, min_size=500, max_size=4_000, target_coin_records=100, target_latency=1.0)
+
+        assert window.update(coin_records=0, latency=0.1) == 2_000
+        assert window.update(coin_records=10, latency=0.1) == 4_000
+        # bounded by `max_size`
+        assert window.update(coin_records=10, latency=0.1) == 4_000
+        # neither sparse nor dense
+        assert window.update(coin_records=50, latency=0.1) == 4_000
+        assert window.update(coin_records=500, latency=0.1) == 2_000
+        assert window.update(coin_records=10, latency=2.0) == 1_000
+        # bounded by `min_size`
+        assert window.update(coin_records=500, latency=2.0) == 500
+        assert window.update(coin_records=500, latency=2.0) == 500
+
+        assert metrics.get("scan_window_size") == 500
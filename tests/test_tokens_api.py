@@ -0,0 +1,95 @@
+from __future__ import annotations
+
+from typing import Any, Optional
+from unittest import mock
+
+import pytest
+from chia.consensus.default_constants import DEFAULT_CONSTANTS
+from chia.types.blockchain_format.sized_bytes import bytes32
+from chia.util.bech32m import encode_puzzle_hash
+from chia_rs import AugSchemeMPL
+
+from app import schemas
+from app.api.v1 import tokens
+from app.core import utils
+from app.core.climate_wallet.wallet import ClimateWallet, TokenizationPayment
+
+TO_ADDRESS = encode_puzzle_hash(bytes32(b"\x03" * 32), "txch")
+
+
+def tokenization_item(vintage_year: int, amount: int, to_address: Optional[str] = TO_ADDRESS) -> dict[str, Any]:
+    return {
+        "token": {
+            "org_uid": "Ivern",
+            "warehouse_project_id": "Rootcaller",
+            "vintage_year": vintage_year,
+            "sequence_num": 0,
+        },
+        "payment": {
+            "to_address": to_address,
+            "amount": amount,
+            "fee": 10,
+        },
+    }
+
+
+class TestTokenizationBatch:
+    @pytest.mark.anyio
+    async def test_batch_grouped_into_bundles_then_success(self, monkeypatch: pytest.MonkeyPatch) -> None:
+        sent: list[list[TokenizationPayment]] = []
+
+        async def send_tokenization_transactions(payments: list[TokenizationPayment]) -> dict[str, Any]:
+            sent.append(payments)
+            if len(sent) == 2:
+                raise ValueError("Insufficient balance!")
+
+            record = mock.MagicMock()
+            record.name = bytes32(bytes([len(sent)]) * 32)
+            record.to_json_dict.return_value = {}
+            return {"transaction_records": [record]}
+
+        # the second item repeats the first, so it goes to another bundle
+        request = schemas.TokenizationTxBatchRequest.parse_obj(
+            {
+                "items": [
+                    tokenization_item(2016, 10),
+                    tokenization_item(2016, 10),
+                    tokenization_item(2017, 10),
+                    tokenization_item(2018, 10, to_address=None),
+                ]
+            }
+        )
+
+        get_constants = mock.AsyncMock(return_value=DEFAULT_CONSTANTS)
+        with monkeypatch.context() as m:
+            m.setattr(utils, "get_climate_secret_key", mock.AsyncMock(return_value=AugSchemeMPL.key_gen(b"1" * 32)))
+            m.setattr(utils, "get_constants", get_constants)
+            m.setattr(ClimateWallet, "send_tokenization_transactions", send_tokenization_transactions)
+
+            # called directly, as CLVM programs cannot be used from the thread of a test client
+            response = await tokens.create_tokenization_txs(request=request, wallet_rpc_client=mock.MagicMock())
+
+        get_constants.assert_awaited_once()
+        assert [len(payments) for payments in sent] == [2, 1]
+
+        (first, second, third, fourth) = response.items
+        assert first.tx is not None
+        assert third.tx is not None
+        assert first.tx.id == third.tx.id
+        assert first.token is not None
+        assert third.token is not None
+        assert first.token.asset_id != third.token.asset_id
+        assert first.error is None
+        assert second.tx is None
+        assert second.error == "Insufficient balance!"
+        assert fourth.tx is None
+        assert fourth.error == "to_address is not set"
+
+    def test_bundle_size_then_success(self) -> None:
+        wallets = [mock.MagicMock(tail_program_hash=bytes32(bytes([index]) * 32)) for index in range(5)]
+        payments = {
+            index: TokenizationPayment(wallet=wallet, to_puzzle_hash=bytes32(b"\x03" * 32), amount=10)
+            for index, wallet in enumerate(wallets)
+        }
+
+        assert tokens._group_tokenization_payments(payments, bundle_size=2) == [[0, 1], [2, 3], [4]]